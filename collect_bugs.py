@@ -8,10 +8,11 @@ import subprocess
 import sys
 import tempfile
 import threading
+import time
 import traceback
 import uuid
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List, Optional, Set, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
 
 import dateutil.parser
 import fire
@@ -29,18 +30,36 @@ from nltk.tokenize import wordpunct_tokenize
 from unidiff import PatchSet
 
 from gitbugactions.actions.action import Action
+from gitbugactions.actions.admission import AdmissionController
+from gitbugactions.actions.cache_server import ActionsCacheServer
+from gitbugactions.actions.run_cache import ActRunCache
+from gitbugactions.actions.run_store import RunStore
+from gitbugactions.actions.test_selection import TestSelection
+from gitbugactions.actions.timeouts import TimeoutEstimator
 from gitbugactions.actions.actions import Act, ActCacheDirManager, ActTestsRun
 from gitbugactions.actions.workflow import GitHubWorkflow
 from gitbugactions.actions.workflow_factory import GitHubWorkflowFactory
 from gitbugactions.collect_bugs.bug_patch import BugPatch
 from gitbugactions.collect_bugs.collection_strategies import *
+from gitbugactions.collect_bugs.fingerprint_index import FingerprintIndex
+from gitbugactions.collect_bugs.phase_planner import PhasePlanner
+from gitbugactions.collect_bugs.pipeline import Pipeline, PipelineStage
+from gitbugactions.collect_bugs.scheduler import CandidateScheduler
 from gitbugactions.collect_bugs.test_config import TestConfig
+from gitbugactions.docker.runner_images import RunnerImageBuilder
+from gitbugactions.docker.volumes import DependencyVolumeManager
+from gitbugactions.docker.snapshots import RunnerSnapshotManager
 from gitbugactions.github_api import GithubAPI
 from gitbugactions.test_executor import TestExecutor
+from gitbugactions.utils.blob_store import BlobStore
 from gitbugactions.utils.actions_utils import get_default_github_actions
 from gitbugactions.utils.file_reader import GitShowFileReader
-from gitbugactions.utils.file_utils import FileType, get_file_type
-from gitbugactions.utils.repo_utils import clone_repo, delete_repo_clone
+from gitbugactions.utils.file_utils import FileClassifier
+from gitbugactions.utils.repo_utils import (
+    clone_repo,
+    delete_repo_clone,
+    normalize_repo_url,
+)
 from gitbugactions.utils.repo_state_manager import RepoStateManager
 from gitbugactions.actions.templates.template_workflows import TemplateWorkflowManager
 
@@ -61,6 +80,28 @@ class PatchCollector:
         self.filter_on_commit_time_end = kwargs.get("filter_on_commit_time_end", None)
         self.pull_requests = kwargs.get("pull_requests", False)
         self.filter_linked_to_pr = kwargs.get("filter_linked_to_pr", None)
+        self.workflows_since = None
+        self.run_cache: Optional[ActRunCache] = kwargs.get("run_cache", None)
+        self.run_store: Optional[RunStore] = kwargs.get("run_store", None)
+        self.warm_containers = kwargs.get("warm_containers", False)
+        self.dependency_volumes = kwargs.get("dependency_volumes", False)
+        self.cache_server: Optional[ActionsCacheServer] = kwargs.get(
+            "cache_server", None
+        )
+        self.select_tests = kwargs.get("select_tests", False)
+        self.admission_controller: Optional[AdmissionController] = kwargs.get(
+            "admission_controller", None
+        )
+        self.snapshot_manager: Optional[RunnerSnapshotManager] = kwargs.get(
+            "snapshot_manager", None
+        )
+        self.parallel_workflows = kwargs.get("parallel_workflows", 1)
+        self.timeout_estimator: Optional[TimeoutEstimator] = kwargs.get(
+            "timeout_estimator", None
+        )
+        self.idle_timeout: Optional[float] = kwargs.get("idle_timeout", None)
+        self.build_cache = kwargs.get("build_cache", False)
+        self.toolchain_images = kwargs.get("toolchain_images", False)
 
     def __clone_repo(self):
         # Too many repos cloning at the same time lead to errors
@@ -87,6 +128,8 @@ class PatchCollector:
                 self.first_commit = self.repo_clone.revparse_single(
                     str(self.repo_clone.head.target)
                 )
+                # The test paths depend on the build tools used by the repo
+                self.file_classifier = FileClassifier.for_repo(self.language, repo_path)
                 self.cloned = True
 
     def __is_bug_fix(self, commit: pygit2.Commit):
@@ -99,26 +142,7 @@ class PatchCollector:
     def __get_patches(self, repo_clone, commit, previous_commit):
         diff = repo_clone.diff(str(previous_commit.id), str(commit.id))
         patch: PatchSet = PatchSet(diff.patch)
-        bug_patch: PatchSet = PatchSet("")
-        test_patch: PatchSet = PatchSet("")
-        non_code_patch: PatchSet = PatchSet("")
-
-        # FIXME change keywords according to build tool
-        for p in patch:
-            if (
-                get_file_type(self.language, p.source_file) == FileType.TESTS
-                or get_file_type(self.language, p.target_file) == FileType.TESTS
-            ):
-                test_patch.append(p)
-            elif (
-                get_file_type(self.language, p.source_file) == FileType.SOURCE
-                or get_file_type(self.language, p.target_file) == FileType.SOURCE
-            ):
-                bug_patch.append(p)
-            else:
-                non_code_patch.append(p)
-
-        return bug_patch, test_patch, non_code_patch
+        return self.file_classifier.classify_patch(patch)
 
     def __test_patch(
         self,
@@ -132,36 +156,53 @@ class PatchCollector:
         shutil.copytree(self.repo_clone.workdir, new_repo_path, symlinks=True)
         repo_clone = pygit2.Repository(os.path.join(new_repo_path, ".git"))
 
+        if self.select_tests and len(bug.test_patch) > 0:
+            bug.test_selection = TestSelection.from_patch(bug.test_patch)
+
+        executor = None
         try:
             executor = TestExecutor(
                 repo_clone,
                 self.language,
                 act_cache_dir,
                 self.default_github_actions,
+                run_cache=self.run_cache,
+                run_store=self.run_store,
+                # Reuses the runs stored by previous collections
+                execution=0,
+                warm_containers=self.warm_containers,
+                dependency_volumes=self.dependency_volumes,
+                cache_server=self.cache_server,
+                admission_controller=self.admission_controller,
+                snapshot_manager=self.snapshot_manager,
+                parallel_workflows=self.parallel_workflows,
+                timeout_estimator=self.timeout_estimator,
+                idle_timeout=self.idle_timeout,
+                build_cache=self.build_cache,
+                toolchain_images=self.toolchain_images,
             )
 
-            def all_runs_crashed(x):
-                return x is None or all(map(lambda act_run: act_run.failed, x))
-
-            # Previous commit
-            act_runs = bug.test_previous_commit(executor)
-            if all_runs_crashed(act_runs):
-                return test_patch_runs
-            test_patch_runs[0] = act_runs
-
-            # Previous commit with diff
-            if len(bug.test_patch) > 0:
-                act_runs = bug.test_previous_commit_with_diff(executor)
-                if all_runs_crashed(act_runs):
-                    return test_patch_runs
-                test_patch_runs[1] = act_runs
-
-            # Current commit
-            act_runs = bug.test_current_commit(executor)
-            if all_runs_crashed(act_runs):
-                return test_patch_runs
-            test_patch_runs[2] = act_runs
+            # Only the phases that can change the strategy used are run
+            planner = PhasePlanner(bug, TestConfig.strategies)
+            phase = planner.next_phase()
+            while phase is not None:
+                if phase == Phase.PREVIOUS_COMMIT:
+                    act_runs = bug.test_previous_commit(executor)
+                elif phase == Phase.PREVIOUS_COMMIT_WITH_DIFF:
+                    act_runs = bug.test_previous_commit_with_diff(executor)
+                else:
+                    act_runs = bug.test_current_commit(executor)
+                planner.add_runs(phase, act_runs)
+                phase = planner.next_phase()
+
+            if len(planner.skipped_phases) > 0:
+                logging.debug(
+                    f"Skipped phases {[phase.name for phase in planner.skipped_phases]} of {bug.repo.full_name}@{bug.commit}"
+                )
+            test_patch_runs = bug.actions_runs
         finally:
+            if executor is not None:
+                executor.remove_warm_containers()
             delete_repo_clone(repo_clone)
 
         return test_patch_runs
@@ -385,6 +426,33 @@ class PatchCollector:
         patches.sort(key=lambda x: x.commit_timestamp)
         return patches
 
+    def get_workflows_since(self) -> Optional[str]:
+        """
+        Get the timestamp of the first commit that added a workflow to the repo.
+        The timestamp has the same format as ``BugPatch.commit_timestamp``.
+        """
+        if self.workflows_since is not None:
+            return self.workflows_since
+
+        self.__clone_repo()
+        run = subprocess.run(
+            f"git log --reverse --diff-filter=A --format=%ct -- .github/workflows",
+            cwd=self.repo_clone.workdir,
+            capture_output=True,
+            shell=True,
+        )
+        timestamps = run.stdout.decode("utf-8").split()
+        if len(timestamps) == 0:
+            return None
+
+        self.workflows_since = (
+            datetime.datetime.fromtimestamp(
+                int(timestamps[0]), datetime.UTC
+            ).isoformat()
+            + "Z"
+        )
+        return self.workflows_since
+
     def set_default_github_actions(self):
         if not self.cloned:
             self.__clone_repo()
@@ -544,6 +612,34 @@ def collect_bugs(
     base_image: str | None = None,
     use_default_actions: bool = False,
     commit_list_file: str = None,
+    fingerprint_index_path: str = None,
+    max_candidates_per_repo: int = None,
+    max_minutes_per_repo: float = None,
+    n_scan_workers: int = None,
+    n_download_workers: int = None,
+    reuse_act_runs: bool = True,
+    run_store_path: str = None,
+    warm_containers: bool = False,
+    dependency_volumes: bool = False,
+    max_dependency_volumes_gb: float = 50,
+    cache_server_path: str = None,
+    max_cache_server_gb: float = 10,
+    cache_server_host: str = None,
+    select_tests: bool = False,
+    act_logs_path: str = None,
+    blob_store_path: str = None,
+    admission_control: bool = False,
+    max_load: float = 1.0,
+    runner_snapshots: bool = False,
+    action_store_path: str = None,
+    parallel_workflows: int = 1,
+    adaptive_timeouts: bool = False,
+    timeout_percentile: float = 95,
+    timeout_margin: float = 1.5,
+    idle_timeout: float = None,
+    build_cache: bool = False,
+    toolchain_images: bool = False,
+    slim_base_image: str = None,
 ):
     """Collects bug-fixes from the repos listed in `data_path`. The result is saved
     on `results_path`. A file `data.json` is also created with information about
@@ -567,16 +663,92 @@ def collect_bugs(
         base_image (str, optional): Base image to use for building the runner image. If None, uses default.
         use_default_actions (bool, optional): Whether to use and collect default GitHub actions from repositories. Defaults to False.
         commit_list_file (str, optional): Path to a JSON file containing a list of commit URLs to analyze. If provided, data_path is ignored. Defaults to None.
+        fingerprint_index_path (str, optional): Path to a JSONL file with the fingerprints of the patches already tested. The index is shared across repositories and runs,
+                                                so identical fixes (e.g. from forks and mirrors) are only tested once. If None, patches are only deduplicated within each repository. Defaults to None.
+        max_candidates_per_repo (int, optional): Maximum number of candidate bug-fixes tested per repository. Candidates are tested by expected yield. If None, all the candidates are tested. Defaults to None.
+        max_minutes_per_repo (float, optional): Maximum time in minutes spent testing the candidate bug-fixes of each repository. If None, all the candidates are tested. Defaults to None.
+        n_scan_workers (int, optional): Number of repositories scanned for candidate bug-fixes in parallel. If None, uses n_workers. Defaults to None.
+        n_download_workers (int, optional): Number of actions downloaded in parallel. If None, uses n_workers. Defaults to None.
+        reuse_act_runs (bool, optional): If True, executions with the same working tree, workflows and runner image (e.g. the current commit of a bug-fix
+                                         and the previous commit of the next one) are only run once. Defaults to True.
+        run_store_path (str, optional): Directory of the run store shared with export_bugs and filter_bugs. The runs are recorded in the store
+                                        and runs already stored for identical executions are reused. If None, the runs are not stored. Defaults to None.
+        warm_containers (bool, optional): If True, the three phases of each bug-fix run in the same containers, so the setup of the toolchains
+                                          and dependencies is reused between phases. Defaults to False.
+        dependency_volumes (bool, optional): If True, the dependencies downloaded by the runs (e.g. ~/.m2 or the pip cache) are kept in docker volumes
+                                             shared by the runs of the same repository with the same lockfiles. Defaults to False.
+        max_dependency_volumes_gb (float, optional): Size budget of the dependency volumes in GB. The least recently used volumes are removed
+                                                     when the budget is exceeded. Defaults to 50.
+        cache_server_path (str, optional): Directory of a local actions/cache server. If set, the cache steps of the workflows are kept and
+                                           their caches are saved and restored across the runs of each repository. If None, the cache steps
+                                           are removed. Defaults to None.
+        max_cache_server_gb (float, optional): Size budget of the cache server in GB. Defaults to 10.
+        cache_server_host (str, optional): Address on which the cache server listens. The server is not authenticated, so it must only be
+                                           reachable by the runs. If None, the gateway of the docker bridge network is used. Defaults to None.
+        select_tests (bool, optional): If True, the previous commit with the test patch and the current commit only run the tests in the files
+                                       changed by the test patch, when the test runner supports filters. The previous commit still runs the
+                                       full suite. Defaults to False.
+        act_logs_path (str, optional): Directory where the full output of each act run is written. Only the start and the end of the
+                                       output are kept in the results. If None, the output is not written. Defaults to None.
+        blob_store_path (str, optional): Directory of a blob store where the outputs of the runs and of the tests are written compressed and
+                                         deduplicated. The results keep references with a preview of each output (see BlobStore.resolve).
+                                         If None, the outputs are kept in the results. Defaults to None.
+        admission_control (bool, optional): If True, each act run waits until the host has enough free memory and CPU for it. The memory of each run is
+                                            estimated from the peak memory of the previous runs of its repository (also read from the run store), so
+                                            n_workers becomes an upper bound and can be set higher than the host could run with the memory limit. Defaults to False.
+        max_load (float, optional): Maximum load average per CPU for new act runs to start when admission_control is True. Defaults to 1.0.
+        runner_snapshots (bool, optional): If True, the first run of each repository whose tests execute is snapshotted into a runner image with the
+                                           toolchains and dependencies it installed. Later runs with the same lockfiles and setup steps use the snapshot
+                                           as their runner image. Defaults to False.
+        action_store_path (str, optional): Directory of the store where the actions are downloaded, by commit. The store can be reused by
+                                           later collections and copied to other machines (see ActionStore.export_archive). If None, the
+                                           store is in the temporary directory. Defaults to None.
+        parallel_workflows (int, optional): Maximum number of test workflows of each execution run at the same time. Each workflow after the first runs
+                                            in a copy of the repository with its own act cache dir. Defaults to 1.
+        adaptive_timeouts (bool, optional): If True, the timeout of the runs of each repository is estimated from the duration of its previous runs
+                                            (from collect_repos, the run store and the runs of this collection) instead of 10 minutes. Defaults to False.
+        timeout_percentile (float, optional): Percentile of the durations of the previous runs used by the adaptive timeouts. Defaults to 95.
+        timeout_margin (float, optional): Multiplier of the percentile used by the adaptive timeouts. Defaults to 1.5.
+        idle_timeout (float, optional): Minutes without output after which a run is stopped as if it timed out (e.g. hanging tests).
+                                        If None, only the timeout applies. Defaults to None.
+        build_cache (bool, optional): If True, the compiled objects of CMake (ccache/sccache), Cargo (target dir and sccache), Gradle (build cache)
+                                      and Go (GOCACHE) builds are kept in a docker volume per repository, so the builds of neighbouring commits reuse them.
+                                      The volumes count towards max_dependency_volumes_gb. Defaults to False.
+        toolchain_images (bool, optional): If True, the runs of repositories whose workflows use a single toolchain (e.g. Maven or Cargo) use a slim runner image
+                                           with only that toolchain, built once and cached by the hash of its Dockerfile. Other runs use the runner image. Defaults to False.
+        slim_base_image (str, optional): Base of the toolchain images. It must be an Ubuntu image with node. If None, uses catthehacker/ubuntu:act-22.04. Defaults to None.
     """
     set_test_config(normalize_non_code_patch, strategies)
 
     Act.set_memory_limit(memory_limit)
+    Act.set_log_dir(act_logs_path)
+    if action_store_path is not None:
+        ActCacheDirManager.set_action_store(action_store_path)
+    if slim_base_image is not None:
+        RunnerImageBuilder.set_slim_base_image(slim_base_image)
     Act(base_image=base_image)  # Initialize Act with base_image
     github: GithubAPI = GithubAPI(
         per_page=100,
         pool_size=n_workers,
     )
-    ActCacheDirManager.init_act_cache_dirs(n_dirs=n_workers)
+    DependencyVolumeManager.set_max_size(max_dependency_volumes_gb)
+    cache_server = None
+    if cache_server_path is not None:
+        cache_server = ActionsCacheServer(
+            cache_server_path,
+            max_size_gb=max_cache_server_gb,
+            host=cache_server_host,
+        )
+        cache_server.start()
+    n_scan_workers = n_scan_workers if n_scan_workers is not None else n_workers
+    n_download_workers = (
+        n_download_workers if n_download_workers is not None else n_workers
+    )
+    # The default actions are collected while other repos are being tested
+    n_dirs = n_workers * max(parallel_workflows, 1)
+    ActCacheDirManager.init_act_cache_dirs(
+        n_dirs=n_dirs * 2 if use_default_actions else n_dirs
+    )
 
     kwargs = {
         "filter_on_commit_message": filter_on_commit_message,
@@ -592,193 +764,299 @@ def collect_bugs(
         ),
         "pull_requests": pull_requests,
         "filter_linked_to_pr": filter_linked_to_pr,
+        "run_cache": ActRunCache() if reuse_act_runs else None,
+        "warm_containers": warm_containers,
+        "dependency_volumes": dependency_volumes,
+        "cache_server": cache_server,
+        "select_tests": select_tests,
+        "parallel_workflows": parallel_workflows,
+        "idle_timeout": idle_timeout,
+        "build_cache": build_cache,
+        "toolchain_images": toolchain_images,
+        "snapshot_manager": RunnerSnapshotManager() if runner_snapshots else None,
+        "run_store": (
+            RunStore(run_store_path, "collect") if run_store_path is not None else None
+        ),
     }
 
-    patch_collectors: List[Tuple[PatchCollector, Any]] = []
+    if admission_control:
+        admission_controller = AdmissionController(
+            AdmissionController.parse_memory(memory_limit), max_load=max_load
+        )
+        if kwargs["run_store"] is not None:
+            admission_controller.load_history(kwargs["run_store"].query())
+        kwargs["admission_controller"] = admission_controller
+
+    timeout_estimator = None
+    if adaptive_timeouts:
+        timeout_estimator = TimeoutEstimator(
+            percentile=timeout_percentile, margin=timeout_margin
+        )
+        if kwargs["run_store"] is not None:
+            timeout_estimator.load_history(kwargs["run_store"].query())
+        kwargs["timeout_estimator"] = timeout_estimator
+
+    fingerprint_index = (
+        FingerprintIndex(fingerprint_index_path)
+        if fingerprint_index_path is not None
+        else None
+    )
+    blob_store = BlobStore(blob_store_path) if blob_store_path is not None else None
+    scheduler = CandidateScheduler(
+        max_candidates_per_repo=max_candidates_per_repo,
+        max_minutes_per_repo=max_minutes_per_repo,
+    )
+    # Repos scanned and the number of possible bug patches found in each one
+    patch_collectors: List[Tuple[PatchCollector, int]] = []
+    patch_collectors_lock = threading.Lock()
 
     # Create the results directory if it doesn't exist
     if not os.path.exists(results_path):
         os.makedirs(results_path)
 
-    # Mode: analyze specific commits from a file
-    if commit_list_file is not None and os.path.exists(commit_list_file):
-        # Read and parse the commit list file
-        with open(commit_list_file, "r") as f:
-            commit_urls = json.load(f)
-
-        # Group commits by repository to minimize cloning operations
-        commits_by_repo = {}
-        for commit_url in commit_urls:
-            try:
-                repo_name, commit_sha = parse_commit_url(commit_url)
-                if repo_name not in commits_by_repo:
-                    commits_by_repo[repo_name] = []
-                commits_by_repo[repo_name].append(commit_sha)
-            except ValueError as e:
-                logging.error(f"Error parsing commit URL: {e}")
-                continue
-
-        logging.info(
-            f"Found {len(commits_by_repo)} repositories with {len(commit_urls)} commits to analyze"
-        )
+    def get_repos_to_scan():
+        """
+        Yields the repos to scan and the commits to analyze in each one
+        (None if all the commits must be analyzed).
+        """
+        # Mode: analyze specific commits from a file
+        if commit_list_file is not None and os.path.exists(commit_list_file):
+            # Read and parse the commit list file
+            with open(commit_list_file, "r") as f:
+                commit_urls = json.load(f)
+
+            # Group commits by repository to minimize cloning operations
+            commits_by_repo = {}
+            for commit_url in commit_urls:
+                try:
+                    repo_name, commit_sha = parse_commit_url(commit_url)
+                    if repo_name not in commits_by_repo:
+                        commits_by_repo[repo_name] = []
+                    commits_by_repo[repo_name].append(commit_sha)
+                except ValueError as e:
+                    logging.error(f"Error parsing commit URL: {e}")
+                    continue
 
-        # Process each repository and its commits
-        with ThreadPoolExecutor(max_workers=n_workers) as executor:
-            future_to_collector: Dict[Future, Tuple[PatchCollector, List[str]]] = {}
+            logging.info(
+                f"Found {len(commits_by_repo)} repositories with {len(commit_urls)} commits to analyze"
+            )
 
             for repo_name, commit_shas in commits_by_repo.items():
                 try:
                     repo = github.get_repo(repo_name)
-                    patch_collector = PatchCollector(repo, **kwargs)
-                    future_to_collector[
-                        executor.submit(
-                            patch_collector.analyze_specific_commits, commit_shas
-                        )
-                    ] = (patch_collector, commit_shas)
                 except Exception as e:
                     logging.error(f"Error getting repository {repo_name}: {e}")
                     continue
+                yield PatchCollector(repo, **kwargs), commit_shas
 
-            for future in tqdm.tqdm(
-                as_completed(future_to_collector), total=len(future_to_collector)
-            ):
-                try:
-                    patch_collector, _ = future_to_collector[future]
-                    result = future.result()
-                except Exception:
-                    logging.error(
-                        f"Error while collecting commits from {patch_collector.repo}: {traceback.format_exc()}"
-                    )
-                else:
-                    patch_collectors.append((patch_collector, result))
+        # Default mode: analyze repositories based on data_path
+        else:
+            for file in os.listdir(data_path):
+                if not file.endswith(".json"):
+                    continue
+                with open(os.path.join(data_path, file), "r") as f:
+                    run = json.loads(f.read())
 
-    # Default mode: analyze repositories based on data_path
-    else:
-        with ThreadPoolExecutor(max_workers=n_workers) as executor:
-            future_to_collector: Dict[Future, PatchCollector] = {}
-
-            dir_list = os.listdir(data_path)
-            for file in dir_list:
-                if file.endswith(".json"):
-                    with open(os.path.join(data_path, file), "r") as f:
-                        run = json.loads(f.read())
-
-                        if (
-                            (
-                                run["number_of_test_actions"] == 1
-                                or run["using_template_workflow"]
-                            )
-                            and "actions_run" in run
-                            and len(run["actions_run"]["tests"]) > 0
-                        ):
-                            repo = github.get_repo(run["repository"])
-                            patch_collector = PatchCollector(repo, **kwargs)
-                            future_to_collector[
-                                executor.submit(patch_collector.get_possible_patches)
-                            ] = patch_collector
-
-            for future in tqdm.tqdm(
-                as_completed(future_to_collector), total=len(future_to_collector)
-            ):
-                try:
-                    patch_collector = future_to_collector[future]
-                    result = future.result()
-                except Exception:
-                    logging.error(
-                        f"Error while collecting commits from {patch_collector.repo}: {traceback.format_exc()}"
+                if (
+                    (
+                        run["number_of_test_actions"] == 1
+                        or run["using_template_workflow"]
                     )
-                else:
-                    patch_collectors.append((patch_collector, result))
-
-    data_path = os.path.join(results_path, "data.json")
-    repos = {}
-    with open(data_path, "w") as fp:
-        for patch_collector, bug_patches in patch_collectors:
-            repos[patch_collector.repo.full_name] = {
-                "clone_url": patch_collector.repo.clone_url,
-                "commits": patch_collector.repo.get_commits().totalCount,
-                "possible_bug_patches": len(bug_patches),
-                "stars": patch_collector.repo.stargazers_count,
-                "size": patch_collector.repo.size,
-            }
-        fp.write(json.dumps(repos))
+                    and "actions_run" in run
+                    and len(run["actions_run"]["tests"]) > 0
+                ):
+                    repo = github.get_repo(run["repository"])
+                    # 124 is the return code for the timeout
+                    if (
+                        timeout_estimator is not None
+                        and run["actions_run"].get("return_code") != 124
+                    ):
+                        timeout_estimator.record(
+                            normalize_repo_url(repo.clone_url),
+                            run["actions_run"].get("elapsed_time"),
+                        )
+                    yield PatchCollector(repo, **kwargs), None
 
-    # Populate the base cache dir with required actions
-    with ThreadPoolExecutor(max_workers=n_workers) as executor:
-        futures_to_actions: Dict[Future, Action] = {}
-        actions_to_download: Set[Action] = set()
-        for patch_collector, bug_patches in patch_collectors:
-            for bug_patch in bug_patches:
-                actions_to_download.update(bug_patch.actions)
+    def scan_repo(item: Tuple[PatchCollector, Optional[List[str]]]):
+        patch_collector, commit_shas = item
+        try:
+            if commit_shas is not None:
+                bug_patches = patch_collector.analyze_specific_commits(commit_shas)
+            else:
+                bug_patches = patch_collector.get_possible_patches()
+        except Exception:
+            logging.error(
+                f"Error while collecting commits from {patch_collector.repo}: {traceback.format_exc()}"
+            )
+            return None
+        bug_patches = bug_patches if bug_patches is not None else []
 
-        for action in actions_to_download:
-            futures_to_actions[
-                executor.submit(ActCacheDirManager.cache_action, action)
-            ] = action
+        with patch_collectors_lock:
+            patch_collectors.append((patch_collector, len(bug_patches)))
 
-        for future in tqdm.tqdm(
-            as_completed(futures_to_actions), total=len(futures_to_actions)
-        ):
-            try:
-                future.result()
-            except Exception:
-                logging.error(
-                    f"Error while downloading action: {traceback.format_exc()}"
+        # Skip the patches that were already tested in other repos or previous
+        # runs, or that are tested by other repos of this run
+        if fingerprint_index is not None:
+            new_bug_patches = []
+            for bug_patch in bug_patches:
+                if fingerprint_index.claim(bug_patch):
+                    new_bug_patches.append(bug_patch)
+                    continue
+                duplicate = fingerprint_index.get(bug_patch)
+                logging.info(
+                    f"Skipping commit {bug_patch.repo.full_name} {bug_patch.commit}: "
+                    f"same patch as {duplicate['repository']}@{duplicate['commit_hash']}"
                 )
-                continue
+            bug_patches = new_bug_patches
+
+        if len(bug_patches) == 0:
+            return None
+        return [(patch_collector, bug_patches)]
+
+    # Actions are shared between repos, so each action is only downloaded once
+    download_executor = ThreadPoolExecutor(max_workers=n_download_workers)
+    # The actions are identified by their declaration, because actions of the
+    # same repository and ref can have different paths
+    action_futures: Dict[str, Future] = {}
+    action_futures_lock = threading.Lock()
+
+    def download_actions(item: Tuple[PatchCollector, List[BugPatch]]):
+        _, bug_patches = item
+        actions: Dict[str, Action] = {}
+        for bug_patch in bug_patches:
+            for action in bug_patch.actions:
+                actions[action.declaration] = action
+
+        # The actions referenced by composite actions and reusable workflows are
+        # also downloaded, so that act does not download them during the runs
+        seen = set(actions)
+        while len(actions) > 0:
+            futures: Dict[str, Future] = {}
+            with action_futures_lock:
+                for declaration, action in actions.items():
+                    if declaration not in action_futures:
+                        action_futures[declaration] = download_executor.submit(
+                            ActCacheDirManager.cache_action, action
+                        )
+                    futures[declaration] = action_futures[declaration]
 
-    # Only collect default GitHub actions if specified
-    if use_default_actions:
-        with ThreadPoolExecutor(max_workers=n_workers) as executor:
-            future_to_collector: Dict[Future, PatchCollector] = {}
-            for patch_collector, _ in patch_collectors:
-                future_to_collector[
-                    executor.submit(patch_collector.set_default_github_actions)
-                ] = patch_collector
-
-            for future in tqdm.tqdm(
-                as_completed(future_to_collector), total=len(future_to_collector)
-            ):
+            actions = {}
+            for future in futures.values():
                 try:
-                    patch_collector = future_to_collector[future]
-                    future.result()
+                    dependencies = future.result()
                 except Exception:
                     logging.error(
-                        f"Error while setting default github actions from {patch_collector.repo}: {traceback.format_exc()}"
+                        f"Error while downloading action: {traceback.format_exc()}"
                     )
                     continue
+                for dependency in dependencies:
+                    if dependency.declaration not in seen:
+                        seen.add(dependency.declaration)
+                        actions[dependency.declaration] = dependency
+        return [item]
+
+    def set_default_actions(item: Tuple[PatchCollector, List[BugPatch]]):
+        patch_collector, _ = item
+        try:
+            patch_collector.set_default_github_actions()
+        except Exception:
+            logging.error(
+                f"Error while setting default github actions from {patch_collector.repo}: {traceback.format_exc()}"
+            )
+        return [item]
+
+    progress = tqdm.tqdm(total=0)
+    progress_lock = threading.Lock()
+    # The patches of a repo are tested concurrently, so the results are
+    # appended to the repo's file one line at a time
+    results_lock = threading.Lock()
+
+    def schedule_patches(item: Tuple[PatchCollector, List[BugPatch]]):
+        patch_collector, bug_patches = item
+        try:
+            workflows_since = patch_collector.get_workflows_since()
+        except Exception:
+            workflows_since = None
+        with progress_lock:
+            progress.total += len(bug_patches)
+            progress.refresh()
+        for bug_patch in bug_patches:
+            scheduler.put((patch_collector, bug_patch), bug_patch, workflows_since)
+        return None
+
+    def test_patch(candidate: Tuple[PatchCollector, BugPatch]):
+        patch_collector, bug_patch = candidate
+        start_time = time.time()
+        is_patch, tested = False, False
+        try:
+            is_patch = patch_collector.test_patch(bug_patch)
+            # The patch is tested if any phase has runs that did not crash
+            tested = any(runs is not None for runs in bug_patch.actions_runs)
+        except Exception:
+            logging.error(
+                f"Error while collecting patches from {bug_patch.repo}: {traceback.format_exc()}"
+            )
+        finally:
+            if fingerprint_index is not None:
+                if tested:
+                    fingerprint_index.add(bug_patch)
+                else:
+                    fingerprint_index.release(bug_patch)
+            scheduler.done(bug_patch, is_patch, time.time() - start_time)
+            with progress_lock:
+                progress.update(1)
+
+        if is_patch:
+            data_path = os.path.join(
+                results_path,
+                bug_patch.repo.full_name.replace("/", "-") + ".json",
+            )
+            line = json.dumps(bug_patch.get_data(blob_store)) + "\n"
+            with results_lock:
+                with open(data_path, "a") as fp:
+                    fp.write(line)
+
+    # The stages are connected by queues, so the patches of a repo start being
+    # tested as soon as the repo is scanned and its actions are downloaded.
+    # The scheduler is the queue of the test stage, so the candidates are
+    # ranked by expected yield.
+    stages = [
+        PipelineStage("scan", scan_repo, n_workers=n_scan_workers),
+        PipelineStage("actions", download_actions, n_workers=n_download_workers),
+    ]
+    if use_default_actions:
+        stages.append(
+            PipelineStage("default-actions", set_default_actions, n_workers=n_workers)
+        )
     else:
         logging.info(
             "Skipping collection of default GitHub actions as requested by use_default_actions=False"
         )
+    stages.append(PipelineStage("schedule", schedule_patches, n_workers=1))
+    stages.append(
+        PipelineStage("test", test_patch, n_workers=n_workers, queue=scheduler)
+    )
 
-    with ThreadPoolExecutor(max_workers=n_workers) as executor:
-        future_to_patches: Dict[Future, Tuple[BugPatch]] = {}
-        for patch_collector, bug_patches in patch_collectors:
-            for bug_patch in bug_patches:
-                future_to_patches[
-                    executor.submit(patch_collector.test_patch, bug_patch)
-                ] = bug_patch
+    try:
+        Pipeline(stages).run(get_repos_to_scan())
+    finally:
+        download_executor.shutdown()
+        progress.close()
+        if cache_server is not None:
+            cache_server.stop()
 
-        for future in tqdm.tqdm(
-            as_completed(future_to_patches), total=len(future_to_patches)
-        ):
-            try:
-                bug_patch = future_to_patches[future]
-                is_patch = future.result()
-            except Exception:
-                logging.error(
-                    f"Error while collecting patches from {bug_patch.repo}: {traceback.format_exc()}"
-                )
-            else:
-                if is_patch:
-                    data_path = os.path.join(
-                        results_path,
-                        bug_patch.repo.full_name.replace("/", "-") + ".json",
-                    )
-                    with open(data_path, "a") as fp:
-                        data = bug_patch.get_data()
-                        fp.write((json.dumps(data) + "\n"))
+    data_path = os.path.join(results_path, "data.json")
+    repos = {}
+    with open(data_path, "w") as fp:
+        for patch_collector, possible_bug_patches in patch_collectors:
+            repos[patch_collector.repo.full_name] = {
+                "clone_url": patch_collector.repo.clone_url,
+                "commits": patch_collector.repo.get_commits().totalCount,
+                "possible_bug_patches": possible_bug_patches,
+                "stars": patch_collector.repo.stargazers_count,
+                "size": patch_collector.repo.size,
+            }
+        fp.write(json.dumps(repos))
 
     for patch_collector, _ in patch_collectors:
         patch_collector.delete_repo()
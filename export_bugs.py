@@ -7,7 +7,7 @@ import threading
 import traceback
 import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import fire
 import tqdm
@@ -16,6 +16,7 @@ from docker.models.containers import Container
 
 from collect_bugs import BugPatch
 from gitbugactions.actions.actions import Act, ActCacheDirManager, ActTestsRun
+from gitbugactions.actions.run_store import RunStore
 from gitbugactions.docker.client import DockerClient
 from gitbugactions.docker.export import extract_diff
 from gitbugactions.test_executor import TestExecutor
@@ -87,6 +88,7 @@ def export_bug_containers(
     export_path: str,
     base_image: str | None = None,
     use_default_actions: bool = False,
+    run_store: Optional[RunStore] = None,
 ):
     TestExecutor.toggle_cleanup(False)
     repo_full_name = bug["repository"]
@@ -110,6 +112,8 @@ def export_bug_containers(
             act_cache_dir,
             default_actions,
             base_image=base_image,
+            # The containers of the stored runs are gone, so the runs are only recorded
+            run_store=run_store,
         )
         runs = bug_patch.test_current_commit(executor, keep_containers=True)
         create_exported_containers(
@@ -125,6 +129,7 @@ def export_bugs(
     output_folder_path: str,
     base_image: str | None = None,
     use_default_actions: bool = False,
+    run_store_path: str | None = None,
 ):
     """Export the containers (reproducible environment) for the bug-fixes collected by collect_bugs.
 
@@ -133,6 +138,7 @@ def export_bugs(
         output_folder_path (str): Folder on which the results will be saved.
         base_image (str, optional): Base image to use for building the runner image. If None, uses default.
         use_default_actions (bool, optional): Whether to use and collect default GitHub actions from repositories. Defaults to False.
+        run_store_path (str, optional): Directory of the run store where the runs are recorded. If None, the runs are not stored.
     """
     # FIXME: export_bugs is not working with multiple workers
     n_workers = 1
@@ -142,6 +148,9 @@ def export_bugs(
     futures_to_bug = {}
 
     Act(base_image=base_image)
+    run_store = (
+        RunStore(run_store_path, "export") if run_store_path is not None else None
+    )
 
     for jsonl_path in os.listdir(dataset_path):
         if jsonl_path == "log.out" or jsonl_path == "data.json":
@@ -158,6 +167,7 @@ def export_bugs(
                         output_folder_path,
                         base_image,
                         use_default_actions,
+                        run_store,
                     )
                 )
                 futures_to_bug[futures[-1]] = bug
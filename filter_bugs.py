@@ -17,6 +17,8 @@ from pathlib import Path
 
 from collect_bugs import BugPatch
 from gitbugactions.actions.actions import Act, ActCacheDirManager, ActTestsRun
+from gitbugactions.actions.run_store import RunStore
+from gitbugactions.collect_bugs.collection_strategies import Phase
 from gitbugactions.docker.client import DockerClient
 from gitbugactions.docker.export import create_diff_image
 from gitbugactions.test_executor import TestExecutor
@@ -33,6 +35,8 @@ def run_commit(
     test_fn: Callable[[], Optional[List[ActTestsRun]]],
     offline: bool,
     use_default_actions: bool = False,
+    run_store: Optional[RunStore] = None,
+    execution: Optional[int] = None,
 ) -> Optional[List[ActTestsRun]]:
     act_cache_dir = ActCacheDirManager.acquire_act_cache_dir()
     try:
@@ -51,6 +55,8 @@ def run_commit(
             act_cache_dir,
             default_actions,
             runner_image=image_name,
+            run_store=run_store,
+            execution=execution,
         )
 
         return test_fn(executor, offline)
@@ -105,6 +111,7 @@ def filter_bug(
     n_executions: int,
     base_image: str | None = None,
     use_default_actions: bool = False,
+    run_store: Optional[RunStore] = None,
 ) -> str:
     try:
         repo_name = bug["repository"].replace("/", "-")
@@ -118,83 +125,61 @@ def filter_bug(
             "gitbugactions:latest", image_name, get_diff_path(diff_folder_path)
         )
 
-        previous_commit_runs = []
-        previous_commit_with_diff_runs = []
-        current_commit_runs = []
-
-        for _ in range(n_executions):
-            run = run_commit(
-                bug_patch,
-                repo_clone,
-                diff_folder_path,
-                image_name,
-                bug_patch.test_previous_commit,
-                offline=offline,
-                use_default_actions=use_default_actions,
+        # The phases skipped by the collection (see PhasePlanner) have no runs
+        # to compare with, so they are not run
+        phases = [
+            (phase, test_fn)
+            for phase, test_fn in (
+                (Phase.PREVIOUS_COMMIT, bug_patch.test_previous_commit),
+                (
+                    Phase.PREVIOUS_COMMIT_WITH_DIFF,
+                    bug_patch.test_previous_commit_with_diff,
+                ),
+                (Phase.CURRENT_COMMIT, bug_patch.test_current_commit),
             )
-            previous_commit_runs.append(run)
+            if bug["actions_runs"][phase] is not None
+            and (
+                phase != Phase.PREVIOUS_COMMIT_WITH_DIFF
+                or len(bug_patch.test_patch) > 0
+            )
+        ]
+        phase_runs: Dict[Phase, List[List[ActTestsRun]]] = {
+            phase: [] for phase, _ in phases
+        }
 
-            if len(bug_patch.test_patch) > 0:
+        for execution in range(n_executions):
+            for phase, test_fn in phases:
                 run = run_commit(
                     bug_patch,
                     repo_clone,
                     diff_folder_path,
                     image_name,
-                    bug_patch.test_previous_commit_with_diff,
+                    test_fn,
                     offline=offline,
                     use_default_actions=use_default_actions,
+                    run_store=run_store,
+                    execution=execution,
                 )
-                previous_commit_with_diff_runs.append(run)
+                phase_runs[phase].append(run)
 
-            run = run_commit(
-                bug_patch,
-                repo_clone,
-                diff_folder_path,
-                image_name,
-                bug_patch.test_current_commit,
-                offline=offline,
-                use_default_actions=use_default_actions,
-            )
-            current_commit_runs.append(run)
+        def is_empty(run: List[ActTestsRun]) -> bool:
+            return run[0].tests is None or len(run[0].tests) == 0
 
         # It is a fail if all runs are empty
-        if (
-            all(
-                run[0].tests is None or len(run[0].tests) == 0
-                for run in previous_commit_runs
-            )
-            or (
-                len(bug_patch.test_patch) != 0
-                and any(
-                    run[0].tests is None or len(run[0].tests) == 0
-                    for run in previous_commit_with_diff_runs
-                )
-            )
-            or all(
-                run[0].tests is None or len(run[0].tests) == 0
-                for run in current_commit_runs
+        if len(phases) == 0 or any(
+            (
+                any(is_empty(run) for run in runs)
+                if phase == Phase.PREVIOUS_COMMIT_WITH_DIFF
+                else all(is_empty(run) for run in runs)
             )
+            for phase, runs in phase_runs.items()
         ):
             return "FAIL"
         # It is flaky if at least one is different
-        elif (
-            any(
-                not equal_test_results(bug["actions_runs"][0][0]["tests"], run[0].tests)
-                for run in previous_commit_runs
-            )
-            or (
-                len(bug_patch.test_patch) != 0
-                and any(
-                    not equal_test_results(
-                        bug["actions_runs"][1][0]["tests"], run[0].tests
-                    )
-                    for run in previous_commit_with_diff_runs
-                )
-            )
-            or any(
-                not equal_test_results(bug["actions_runs"][2][0]["tests"], run[0].tests)
-                for run in current_commit_runs
-            )
+        elif any(
+            not equal_test_results(bug["actions_runs"][phase][0]["tests"], run[0].tests)
+            for phase, runs in phase_runs.items()
+            for run in runs
         ):
             return "FLAKY"
         # It is non-flaky if not all runs are empty and all are equal
@@ -214,6 +199,7 @@ def filter_bugs(
     n_executions: int = 5,
     base_image: str | None = None,
     use_default_actions: bool = False,
+    run_store_path: str | None = None,
 ):
     """Creates the list of non-flaky bug-fixes that are able to be reproduced.
 
@@ -226,8 +212,13 @@ def filter_bugs(
         n_executions (int, optional): Number of times to execute each test. Defaults to 5.
         base_image (str, optional): Base image to use for building the runner image. If None, uses default.
         use_default_actions (bool, optional): Whether to use and collect default GitHub actions from repositories. Defaults to False.
+        run_store_path (str, optional): Directory of the run store. The executions already stored for the same working tree and workflows (e.g. the runs of
+                                        collect_bugs and export_bugs) are reused and the new ones are recorded. If None, uses no store.
     """
     ActCacheDirManager.init_act_cache_dirs(n_dirs=n_workers)
+    run_store = (
+        RunStore(run_store_path, "filter") if run_store_path is not None else None
+    )
     executor = ThreadPoolExecutor(max_workers=n_workers)
 
     with ThreadPoolExecutor(max_workers=n_workers) as executor:
@@ -265,6 +256,7 @@ def filter_bugs(
                         n_executions,
                         base_image,
                         use_default_actions,
+                        run_store,
                     )
                     future_to_bug[future] = bug
             finally:
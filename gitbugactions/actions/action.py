@@ -5,6 +5,9 @@ import shutil
 import subprocess
 import threading
 import traceback
+from typing import Any, Dict, List, Optional
+
+import yaml
 
 
 class Action:
@@ -21,12 +24,125 @@ class Action:
         self.path = match.group(4)
         self.ref = match.group(6)
 
-    def download(self, action_dir: str):
+    @property
+    def url(self) -> str:
+        return f"https://github.com/{self.org}/{self.repo}.git"
+
+    def is_reusable_workflow(self) -> bool:
+        return self.path is not None and re.search(r"\.ya?ml$", self.path) is not None
+
+    def get_cache_names(self) -> List[str]:
+        """
+        Returns the names of the directories of the action in act's action cache.
         """
-        Download the action to the action dir
+        names = [f"{self.org}-{self.repo}@{self.ref}"]
+        if self.is_reusable_workflow():
+            # act names the directories of reusable workflows after the full reference
+            names.append(re.sub(r'[<>:"/\\|?*]', "-", self.declaration))
+        return names
+
+    @staticmethod
+    def get_uses(doc: Any) -> List[str]:
         """
-        from gitbugactions.utils.repo_utils import clone_repo
+        Returns the remote actions and reusable workflows referenced by a
+        workflow, a reusable workflow or a composite action. Local (./) and
+        docker (docker://) references are ignored.
+        """
+        steps, uses = [], []
+        if not isinstance(doc, dict):
+            return uses
+        runs = doc.get("runs")
+        if isinstance(runs, dict) and isinstance(runs.get("steps"), list):
+            steps.extend(runs["steps"])
+        jobs = doc.get("jobs")
+        if isinstance(jobs, dict):
+            for job in jobs.values():
+                if not isinstance(job, dict):
+                    continue
+                # Jobs that call reusable workflows
+                if isinstance(job.get("uses"), str):
+                    uses.append(job["uses"])
+                if isinstance(job.get("steps"), list):
+                    steps.extend(job["steps"])
+        for step in steps:
+            if isinstance(step, dict) and isinstance(step.get("uses"), str):
+                uses.append(step["uses"])
+        return [
+            declaration
+            for declaration in uses
+            if not declaration.startswith("./")
+            and not declaration.startswith("docker://")
+        ]
+
+    def get_dependencies(self, action_dir: str) -> List["Action"]:
+        """
+        Returns the actions and reusable workflows referenced by the action
+        (e.g. by the steps of a composite action), read from its download.
+        """
+        base_path = os.path.join(action_dir, self.path) if self.path else action_dir
+        if self.is_reusable_workflow():
+            paths = [base_path]
+        else:
+            paths = [
+                os.path.join(base_path, "action.yml"),
+                os.path.join(base_path, "action.yaml"),
+            ]
+
+        dependencies: Dict[str, Action] = {}
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            try:
+                with open(path, "r") as f:
+                    doc = yaml.safe_load(f)
+            except yaml.YAMLError:
+                logging.warning(f"Failed to parse {path} of {self.declaration}")
+                break
+            for declaration in Action.get_uses(doc):
+                try:
+                    dependencies[declaration] = Action(declaration)
+                except Exception:
+                    logging.warning(f"Failed to parse action {declaration}")
+            break
+        return list(dependencies.values())
 
+    def is_commit_ref(self) -> bool:
+        return re.fullmatch(r"[0-9a-f]{40}", self.ref) is not None
+
+    def resolve_ref(self) -> Optional[str]:
+        """
+        Returns the SHA of the commit of the ref without downloading the action,
+        or None if the ref can not be resolved.
+        """
+        if self.is_commit_ref():
+            return self.ref
+        run = subprocess.run(
+            ["git", "ls-remote", self.url, self.ref, f"{self.ref}^{{}}"],
+            capture_output=True,
+            text=True,
+        )
+        if run.returncode != 0:
+            return None
+        refs = {}
+        for line in run.stdout.splitlines():
+            sha, _, name = line.partition("\t")
+            refs[name] = sha
+        # Annotated tags point to tag objects, the peeled refs (^{}) to commits
+        for name in (
+            f"refs/tags/{self.ref}^{{}}",
+            f"refs/tags/{self.ref}",
+            f"refs/heads/{self.ref}",
+        ):
+            if name in refs:
+                return refs[name]
+        return None
+
+    def download(self, action_dir: str):
+        """
+        Download the action to the action dir. Only the commit of the ref is
+        fetched (depth 1), and the ref is created as a tag so that act can
+        check it out.
+        """
         logging.info(f"Downloading action {self.declaration} to {action_dir}")
 
         # If the action is already in the cache, raise an exception
@@ -34,19 +150,27 @@ class Action:
             logging.warning(f"Action directory already exists: {action_dir}")
             return
 
+        def git(*args: str):
+            run = subprocess.run(
+                ["git", *args], cwd=action_dir, capture_output=True, text=True
+            )
+            assert run.returncode == 0, run.stderr
+
         try:
             with Action.CLONE_SEM:
-                # Clone the action to the action dir using pygit2
-                clone_repo(f"https://github.com/{self.org}/{self.repo}.git", action_dir)
-
-                # Checkout the action version
-                run = subprocess.run(
-                    f"git checkout {self.ref}",
-                    cwd=action_dir,
-                    shell=True,
-                    capture_output=True,
-                )
-                assert run.returncode == 0
+                os.makedirs(action_dir)
+                git("init", "-q")
+                git("remote", "add", "origin", self.url)
+                for r in range(3):
+                    try:
+                        git("fetch", "-q", "--depth", "1", "origin", self.ref)
+                        break
+                    except AssertionError:
+                        if r == 2:
+                            raise
+                git("checkout", "-q", "--detach", "FETCH_HEAD")
+                if not self.is_commit_ref():
+                    git("tag", "-f", self.ref, "FETCH_HEAD")
 
                 # Remove gitignore so that act doesn't have to
                 gitignore_path = os.path.join(action_dir, ".gitignore")
@@ -55,7 +179,6 @@ class Action:
         except Exception:
             # If something goes wrong, delete the action dir
             shutil.rmtree(action_dir, ignore_errors=True)
-            print(traceback.format_exc())
             raise Exception(
                 f"Error while downloading action {self.declaration}: {traceback.format_exc()}"
             )
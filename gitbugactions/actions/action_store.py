@@ -0,0 +1,153 @@
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+import uuid
+from typing import Optional
+from urllib.parse import quote
+
+from gitbugactions.actions.action import Action
+
+
+class ActionStore:
+    """
+    Content-addressed store of the actions used by the workflows. Each action
+    is stored once per commit, so refs that point to the same commit (e.g. v4
+    and v4.1.0) share the same download.
+
+    The store is a directory with:
+        - ``commits/<org>/<repo>/<sha>``: shallow git repository with the
+          commit checked out and a tag for each ref that resolved to it.
+        - ``refs/<org>/<repo>/<ref>``: the commit that the ref resolved to
+          when it was first downloaded. The refs are not resolved again, so
+          moving refs (e.g. v4) keep the commit of their first download.
+
+    A store can be moved between machines with ``export_archive`` and
+    ``import_archive``.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Directory of the store.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(path, "commits"), exist_ok=True)
+        os.makedirs(os.path.join(path, "refs"), exist_ok=True)
+
+    def __get_commit_path(self, action: Action, sha: str) -> str:
+        return os.path.join(self.path, "commits", action.org, action.repo, sha)
+
+    def __get_ref_path(self, action: Action) -> str:
+        return os.path.join(
+            self.path, "refs", action.org, action.repo, quote(action.ref, safe="")
+        )
+
+    def __read_ref(self, action: Action) -> Optional[str]:
+        ref_path = self.__get_ref_path(action)
+        if not os.path.exists(ref_path):
+            return None
+        with open(ref_path, "r") as f:
+            return f.read().strip()
+
+    def __write_ref(self, action: Action, sha: str):
+        ref_path = self.__get_ref_path(action)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        temp_path = f"{ref_path}.{uuid.uuid4().hex}"
+        with open(temp_path, "w") as f:
+            f.write(sha)
+        os.replace(temp_path, ref_path)
+
+    def __add_tag(self, action: Action, commit_path: str):
+        if action.is_commit_ref():
+            return
+        # The ref may not be a tag of the commit yet (e.g. v4 after v4.1.0)
+        with self.lock:
+            subprocess.run(
+                ["git", "tag", "-f", action.ref, "HEAD"],
+                cwd=commit_path,
+                capture_output=True,
+            )
+
+    def get(self, action: Action) -> str:
+        """
+        Returns the directory of the action, downloading it if it is not in
+        the store.
+        """
+        sha = self.__read_ref(action)
+        if sha is None:
+            sha = action.resolve_ref()
+        if sha is not None and os.path.exists(self.__get_commit_path(action, sha)):
+            self.__write_ref(action, sha)
+            commit_path = self.__get_commit_path(action, sha)
+            self.__add_tag(action, commit_path)
+            return commit_path
+
+        temp_path = os.path.join(self.path, "commits", f".{uuid.uuid4().hex}")
+        try:
+            action.download(temp_path)
+            run = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=temp_path,
+                capture_output=True,
+                text=True,
+            )
+            assert run.returncode == 0, run.stderr
+            # The ref may have moved since it was resolved
+            sha = run.stdout.strip()
+            commit_path = self.__get_commit_path(action, sha)
+            os.makedirs(os.path.dirname(commit_path), exist_ok=True)
+            try:
+                os.rename(temp_path, commit_path)
+            except OSError:
+                # Downloaded at the same time through another ref
+                if not os.path.exists(commit_path):
+                    raise
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        self.__add_tag(action, commit_path)
+        self.__write_ref(action, sha)
+        return commit_path
+
+    def export_archive(self, archive_path: str):
+        """
+        Writes the store to a tar.gz archive.
+        """
+        with tarfile.open(archive_path, "w:gz") as tar:
+            for directory in ("commits", "refs"):
+                tar.add(os.path.join(self.path, directory), arcname=directory)
+
+    def import_archive(self, archive_path: str):
+        """
+        Adds the actions of an archive created by ``export_archive`` to the
+        store. The actions and refs already in the store are kept.
+        """
+        temp_path = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+        try:
+            with tarfile.open(archive_path, "r:gz") as tar:
+                tar.extractall(temp_path, filter="tar")
+
+            imported = 0
+            # commits/<org>/<repo>/<sha> and refs/<org>/<repo>/<ref>
+            for directory in ("commits", "refs"):
+                root = os.path.join(temp_path, directory)
+                if not os.path.exists(root):
+                    continue
+                for org in os.listdir(root):
+                    for repo in os.listdir(os.path.join(root, org)):
+                        target_dir = os.path.join(self.path, directory, org, repo)
+                        os.makedirs(target_dir, exist_ok=True)
+                        for name in os.listdir(os.path.join(root, org, repo)):
+                            target = os.path.join(target_dir, name)
+                            if name.startswith(".") or os.path.exists(target):
+                                continue
+                            shutil.move(os.path.join(root, org, repo, name), target)
+                            imported += directory == "commits"
+            logging.info(f"Imported {imported} actions from {archive_path}")
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
@@ -1,6 +1,6 @@
-import grp
 import logging
 import os
+import re
 import shutil
 import subprocess
 import tempfile
@@ -9,114 +9,239 @@ import time
 import traceback
 import uuid
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict, List, Set
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
 
-from junitparser import Error, TestCase
+from junitparser import Error, Failure, Skipped, TestCase
 
 from gitbugactions.actions.action import Action
+from gitbugactions.actions.action_store import ActionStore
+from gitbugactions.actions.output_capture import OutputCapture
+from gitbugactions.actions.step_timer import StepTimer
+from gitbugactions.actions.test_selection import TestSelection
+from gitbugactions.actions.timeouts import IdleWatchdog
 from gitbugactions.actions.workflow import GitHubWorkflow
 from gitbugactions.actions.workflow_factory import GitHubWorkflowFactory
 from gitbugactions.docker.client import DockerClient
+from gitbugactions.docker.runner_images import RunnerImageBuilder
+from gitbugactions.docker.stats import ContainerStatsSampler, ImagePullTimer
 from gitbugactions.github_api import GithubToken
+from gitbugactions.utils.blob_store import BlobStore
 from gitbugactions.utils.repo_state_manager import RepoStateManager
 
 
 class ActCacheDirManager:
     # We need to set a different cache dir for each worker to avoid conflicts
     # See https://github.com/nektos/act/issues/1885 -> "act's git actions download cache isn't process / thread safe"
-
-    __ACT_CACHE_DIR_LOCK: threading.Lock = threading.Lock()
-    __ACT_CACHE_DIRS: Dict[str, bool] = dict()
+    #
+    # The dirs are handed out from a pool in FIFO order. The actions are
+    # downloaded once to the default cache dir (the shared action store) and
+    # linked into each dir when it is handed out, so act never downloads them.
+
+    __ACT_CACHE_DIR_LOCK: threading.Condition = threading.Condition()
+    # Managed dirs and the free ones, in the order they were returned
+    __ACT_CACHE_DIRS: Set[str] = set()
+    __FREE_DIRS: Deque[str] = deque()
+    # Threads waiting for a dir, in the order they arrived
+    __WAITING: Deque[int] = deque()
+    __NEXT_TICKET = 0
+    __POOL_SIZE = 0
+    # Seconds to wait for a free dir. If None, waits until a dir is returned
+    __ACQUIRE_TIMEOUT: Optional[float] = None
+    # Store where the actions are downloaded, by commit
+    __ACTION_STORE: Optional[ActionStore] = None
+    # Names of the actions in the shared action store
+    __ACTIONS: Set[str] = set()
     __DEFAULT_CACHE_DIR: str = os.path.join(
         tempfile.gettempdir(), "act-cache", "default"
     )
 
+    @classmethod
+    def __new_act_cache_dir(cls) -> str:
+        cache_dir = os.path.join(tempfile.gettempdir(), "act-cache", str(uuid.uuid4()))
+        os.makedirs(os.path.join(cache_dir, "act"))
+        return cache_dir
+
     @classmethod
     def init_act_cache_dirs(cls, n_dirs: int):
         with cls.__ACT_CACHE_DIR_LOCK:
-            # Generate the directories
-            cls.__ACT_CACHE_DIRS = {
-                os.path.join(
-                    tempfile.gettempdir(), "act-cache", str(uuid.uuid4())
-                ): True
-                for _ in range(n_dirs)
-            }
-
-            # Create the directories
-            for cache_dir in cls.__ACT_CACHE_DIRS:
-                if not os.path.exists(cache_dir):
-                    os.makedirs(os.path.join(cache_dir, "act"))
             if not os.path.exists(cls.__DEFAULT_CACHE_DIR):
                 os.makedirs(cls.__DEFAULT_CACHE_DIR)
+            # Actions downloaded by previous executions
+            cls.__ACTIONS.update(os.listdir(cls.__DEFAULT_CACHE_DIR))
+
+            cls.__ACT_CACHE_DIRS = set()
+            cls.__FREE_DIRS = deque()
+            cls.__POOL_SIZE = 0
+        cls.set_pool_size(n_dirs)
 
     @classmethod
-    def acquire_act_cache_dir(cls) -> str:
+    def set_pool_size(cls, n_dirs: int):
         """
-        A thread calls this method to acquire a free act cache dir from the queue
+        Sets the number of act cache dirs. If the pool shrinks, the dirs in use
+        are deleted when they are returned.
         """
-        cls.__ACT_CACHE_DIR_LOCK.acquire()
+        with cls.__ACT_CACHE_DIR_LOCK:
+            cls.__POOL_SIZE = n_dirs
+            while len(cls.__ACT_CACHE_DIRS) < n_dirs:
+                cache_dir = cls.__new_act_cache_dir()
+                cls.__ACT_CACHE_DIRS.add(cache_dir)
+                cls.__FREE_DIRS.append(cache_dir)
+            while len(cls.__ACT_CACHE_DIRS) > n_dirs and len(cls.__FREE_DIRS) > 0:
+                cache_dir = cls.__FREE_DIRS.pop()
+                cls.__ACT_CACHE_DIRS.remove(cache_dir)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            cls.__ACT_CACHE_DIR_LOCK.notify_all()
 
-        try:
-            if len(cls.__ACT_CACHE_DIRS) == 0:
-                logging.warning(
-                    f"Using a default act cache dir. If running multiple threads you must use different act caches for each thread."
+    @classmethod
+    def set_action_store(cls, path: str):
+        """
+        Sets the directory of the store where the actions are downloaded (see
+        ``ActionStore``). By default, the store is in the temporary directory.
+        """
+        with cls.__ACT_CACHE_DIR_LOCK:
+            cls.__ACTION_STORE = ActionStore(path)
+
+    @classmethod
+    def get_action_store(cls) -> ActionStore:
+        with cls.__ACT_CACHE_DIR_LOCK:
+            if cls.__ACTION_STORE is None:
+                cls.__ACTION_STORE = ActionStore(
+                    os.path.join(tempfile.gettempdir(), "act-cache", "store")
                 )
-                return cls.__DEFAULT_CACHE_DIR
+            return cls.__ACTION_STORE
 
-            for cache_dir in cls.__ACT_CACHE_DIRS:
-                if cls.__ACT_CACHE_DIRS[cache_dir]:
-                    cls.__ACT_CACHE_DIRS[cache_dir] = False
-                    return cache_dir
+    @classmethod
+    def set_acquire_timeout(cls, timeout: Optional[float]):
+        cls.__ACQUIRE_TIMEOUT = timeout
 
-            logging.warning(f"No act cache dir is available. Using a random one...")
+    @classmethod
+    def __link_action(cls, cache_dir: str, action_dir_name: str):
+        link = os.path.join(cache_dir, "act", action_dir_name)
+        if not os.path.lexists(link):
+            os.symlink(os.path.join(cls.__DEFAULT_CACHE_DIR, action_dir_name), link)
 
-            return os.path.join(tempfile.gettempdir(), "act-cache", str(uuid.uuid4()))
-        finally:
-            cls.__ACT_CACHE_DIR_LOCK.release()
+    @classmethod
+    def __populate(cls, cache_dir: str):
+        """
+        Links every action of the shared action store into the cache dir.
+        """
+        os.makedirs(os.path.join(cache_dir, "act"), exist_ok=True)
+        for action_dir_name in list(cls.__ACTIONS):
+            cls.__link_action(cache_dir, action_dir_name)
+
+    @classmethod
+    def acquire_act_cache_dir(cls, timeout: Optional[float] = None) -> str:
+        """
+        A thread calls this method to acquire a free act cache dir from the queue.
+        If no dir is free, the thread waits for one to be returned. The threads
+        get the dirs in the order they called this method.
+
+        Args:
+            timeout (float): Seconds to wait for a free dir. If None, uses the
+                timeout set with ``set_acquire_timeout``. If no dir is returned
+                in time, a temporary dir is used.
+        """
+        if timeout is None:
+            timeout = cls.__ACQUIRE_TIMEOUT
+        with cls.__ACT_CACHE_DIR_LOCK:
+            if cls.__POOL_SIZE == 0:
+                logging.warning(
+                    "The act cache dirs were not initialized. Creating a single one. "
+                    "If running multiple threads you must use different act caches for each thread."
+                )
+                cls.set_pool_size(1)
+
+            ticket = cls.__NEXT_TICKET
+            cls.__NEXT_TICKET += 1
+            cls.__WAITING.append(ticket)
+            try:
+                acquired = cls.__ACT_CACHE_DIR_LOCK.wait_for(
+                    lambda: cls.__WAITING[0] == ticket and len(cls.__FREE_DIRS) > 0,
+                    timeout=timeout,
+                )
+                cache_dir = cls.__FREE_DIRS.popleft() if acquired else None
+            finally:
+                cls.__WAITING.remove(ticket)
+                # The next thread may be able to acquire a dir
+                cls.__ACT_CACHE_DIR_LOCK.notify_all()
+
+        if cache_dir is None:
+            logging.warning(
+                f"No act cache dir was returned in {timeout}s. Using a temporary one..."
+            )
+            cache_dir = cls.__new_act_cache_dir()
+        cls.__populate(cache_dir)
+        return cache_dir
 
     @classmethod
     def return_act_cache_dir(cls, act_cache_dir: str):
         """
         A thread calls this method to return and free up the acquired act cache dir
         """
-        cls.__ACT_CACHE_DIR_LOCK.acquire()
-
-        try:
-            # If the default cache dir, do nothing
-            if act_cache_dir == cls.__DEFAULT_CACHE_DIR:
-                return
+        with cls.__ACT_CACHE_DIR_LOCK:
             # If a managed one, make it free
-            elif act_cache_dir in cls.__ACT_CACHE_DIRS:
-                cls.__ACT_CACHE_DIRS[act_cache_dir] = True
+            if act_cache_dir in cls.__ACT_CACHE_DIRS:
+                if len(cls.__ACT_CACHE_DIRS) > cls.__POOL_SIZE:
+                    # The pool was shrunk while the dir was in use
+                    cls.__ACT_CACHE_DIRS.remove(act_cache_dir)
+                    shutil.rmtree(act_cache_dir, ignore_errors=True)
+                    return
+                cls.__FREE_DIRS.append(act_cache_dir)
+                cls.__ACT_CACHE_DIR_LOCK.notify_all()
                 return
-            # If a random one delete it
-            elif os.path.exists(act_cache_dir):
-                shutil.rmtree(act_cache_dir, ignore_errors=True)
-                return
-        finally:
-            cls.__ACT_CACHE_DIR_LOCK.release()
+        # If a temporary one delete it
+        if os.path.exists(act_cache_dir):
+            shutil.rmtree(act_cache_dir, ignore_errors=True)
 
     @classmethod
-    def cache_action(cls, action: Action):
+    def cache_action(cls, action: Action) -> List[Action]:
         """
-        Downloads an action to the base cache dir and creates a symlink to it in every act cache dir
+        Downloads an action to the shared action store and creates a symlink to
+        it in every act cache dir. The dirs handed out later are linked when
+        they are acquired.
         Note: because every action is unique, we do not need locks here
+
+        Returns:
+            List[Action]: Actions referenced by the action (e.g. by the steps of
+                a composite action or the jobs of a reusable workflow), which
+                must also be cached.
         """
         try:
             # Download the action to the base cache dir
             # The name of the diretory is in the format <org>-<repo>@<ref>
-            action_dir_name = f"{action.org}-{action.repo}@{action.ref}"
-            action_dir = os.path.join(cls.__DEFAULT_CACHE_DIR, action_dir_name)
-            action.download(action_dir)
+            action_dir_names = action.get_cache_names()
+            action_dir = os.path.join(cls.__DEFAULT_CACHE_DIR, action_dir_names[0])
+            if not os.path.lexists(action_dir):
+                # Refs of the same commit are downloaded once
+                commit_dir = cls.get_action_store().get(action)
+                try:
+                    os.symlink(commit_dir, action_dir)
+                except FileExistsError:
+                    pass
+            for action_dir_name in action_dir_names[1:]:
+                try:
+                    os.symlink(
+                        os.path.realpath(action_dir),
+                        os.path.join(cls.__DEFAULT_CACHE_DIR, action_dir_name),
+                    )
+                except FileExistsError:
+                    pass
 
+            with cls.__ACT_CACHE_DIR_LOCK:
+                cls.__ACTIONS.update(action_dir_names)
+                cache_dirs = list(cls.__ACT_CACHE_DIRS)
             # Create a symlink to the action in every act cache dir
-            for cache_dir in cls.__ACT_CACHE_DIRS:
-                os.symlink(action_dir, os.path.join(cache_dir, "act", action_dir_name))
+            for cache_dir in cache_dirs:
+                for action_dir_name in action_dir_names:
+                    cls.__link_action(cache_dir, action_dir_name)
+            return action.get_dependencies(action_dir)
         except Exception:
             logging.error(
                 f"Error while caching action {action.declaration}: {traceback.format_exc()}"
             )
+            return []
 
 
 @dataclass
@@ -131,6 +256,32 @@ class ActTestsRun:
     elapsed_time: int
     default_actions: bool
     return_code: int
+    # Files with the full output of the run (stdout and stderr may be truncated)
+    stdout_log: Optional[str] = None
+    stderr_log: Optional[str] = None
+    # Resources used by the containers of the run (see ContainerStatsSampler)
+    peak_memory: Optional[int] = None
+    cpu_seconds: Optional[float] = None
+    block_io_bytes: Optional[int] = None
+    network_bytes: Optional[int] = None
+    image_pull_time: Optional[float] = None
+    # Value of the label of the containers of the run (see Act.RUN_LABEL)
+    run_id: Optional[str] = None
+    # Time of each step and job of the run (see StepTimer)
+    step_timings: Optional[List[Dict[str, Any]]] = None
+    job_timings: Optional[Dict[str, float]] = None
+
+    def get_category_timings(self) -> Dict[str, float]:
+        """
+        Returns the time spent in each category of steps (e.g. dependencies or
+        test), summed over the jobs of the run.
+        """
+        timings: Dict[str, float] = {}
+        for step in self.step_timings or []:
+            timings[step["category"]] = (
+                timings.get(step["category"], 0) + step["elapsed_time"]
+            )
+        return timings
 
     @property
     def failed_tests(self) -> List[TestCase]:
@@ -154,7 +305,16 @@ class ActTestsRun:
                 erroring_tests.append(test)
         return erroring_tests
 
-    def asdict(self) -> Dict:
+    def asdict(self, blob_store: Optional[BlobStore] = None) -> Dict:
+        """
+        Args:
+            blob_store (BlobStore): If set, the outputs of the run and of the
+                tests are written to the store and replaced by references.
+        """
+
+        def to_ref(text):
+            return blob_store.to_ref(text) if blob_store is not None else text
+
         res = {}
 
         for k, v in self.__dict__.items():
@@ -179,8 +339,8 @@ class ActTestsRun:
                             "name": test.name,
                             "time": test.time,
                             "results": results,
-                            "stdout": test.system_out,
-                            "stderr": test.system_err,
+                            "stdout": to_ref(test.system_out),
+                            "stderr": to_ref(test.system_err),
                         }
                     )
             elif k == "workflow":
@@ -188,11 +348,70 @@ class ActTestsRun:
                     "path": self.workflow.path,
                     "type": self.workflow.get_build_tool(),
                 }
+            elif k in ("stdout", "stderr"):
+                res[k] = to_ref(v)
             else:
                 res[k] = v
 
         return res
 
+    @staticmethod
+    def from_dict(
+        data: Dict[str, Any],
+        workflow: GitHubWorkflow,
+        blob_store: Optional[BlobStore] = None,
+    ) -> "ActTestsRun":
+        """
+        Creates a run from the output of ``asdict``.
+
+        Args:
+            data (Dict[str, Any]): Output of ``asdict``.
+            workflow (GitHubWorkflow): Workflow that was run. Only the path and
+                the build tool of the workflow are kept by ``asdict``.
+            blob_store (BlobStore): Store used by ``asdict``, if any.
+        """
+
+        def resolve(value):
+            return blob_store.resolve(value) if blob_store is not None else value
+
+        result_types = {"Failure": Failure, "Error": Error, "Skipped": Skipped}
+        tests = []
+        for test_data in data["tests"]:
+            test = TestCase(
+                test_data["name"], test_data["classname"], test_data["time"]
+            )
+            test.result = [
+                result_types[result["result"]](result["message"], result["type"])
+                for result in test_data["results"]
+                if result["result"] in result_types
+            ]
+            test.system_out = resolve(test_data["stdout"])
+            test.system_err = resolve(test_data["stderr"])
+            tests.append(test)
+
+        return ActTestsRun(
+            failed=data["failed"],
+            tests=tests,
+            stdout=resolve(data["stdout"]),
+            stderr=resolve(data["stderr"]),
+            workflow=workflow,
+            workflow_name=data["workflow_name"],
+            build_tool=data["build_tool"],
+            elapsed_time=data["elapsed_time"],
+            default_actions=data["default_actions"],
+            return_code=data["return_code"],
+            stdout_log=data.get("stdout_log"),
+            stderr_log=data.get("stderr_log"),
+            peak_memory=data.get("peak_memory"),
+            cpu_seconds=data.get("cpu_seconds"),
+            block_io_bytes=data.get("block_io_bytes"),
+            network_bytes=data.get("network_bytes"),
+            image_pull_time=data.get("image_pull_time"),
+            run_id=data.get("run_id"),
+            step_timings=data.get("step_timings"),
+            job_timings=data.get("job_timings"),
+        )
+
 
 class ActFailureStrategy(ABC):
     @abstractmethod
@@ -225,7 +444,13 @@ class ActCheckCodeFailureStrategy(ActFailureStrategy):
         return run.return_code != 0
 
 
+# Called with the workflow being run, the name of the stream and each line of output
+ActLineHook = Callable[[GitHubWorkflow, str, str], None]
+
+
 class Act:
+    # Label of the containers of each run, whose value is the id of the run
+    RUN_LABEL = "gitbugactions.run"
     __ACT_PATH = "act"
     __ACT_CHECK = False
     __IMAGE_SETUP = False
@@ -236,6 +461,14 @@ class Act:
     __DEFAULT_BASE_IMAGE = "nunosaavedra/gitbug-actions:setup"
     # Image that is built locally with correct permissions set
     __DEFAULT_IMAGE = "gitbugactions:latest"
+    # Characters kept in memory from the start and the end of the output of each run
+    __OUTPUT_HEAD_SIZE = 256 * 1024
+    __OUTPUT_TAIL_SIZE = 1024 * 1024
+    # Directory where the full output of each run is written
+    __LOG_DIR: Optional[str] = None
+    __LINE_HOOKS: List[ActLineHook] = []
+    # Seconds between the samples of the resources used by the containers
+    __STATS_INTERVAL: Optional[float] = 2
 
     def __init__(
         self,
@@ -245,6 +478,10 @@ class Act:
         offline: bool = False,
         fail_strategy: ActFailureStrategy = ActTestsFailureStrategy(),
         base_image: str | None = None,
+        volumes: Optional[List[str]] = None,
+        env: Optional[Dict[str, str]] = None,
+        idle_timeout: Optional[float] = None,
+        run_id: Optional[str] = None,
     ):
         """
         Args:
@@ -253,6 +490,13 @@ class Act:
             offline (bool): Whether to run in offline mode
             fail_strategy (ActFailureStrategy): Strategy to determine test failures
             base_image (str): Base image to use for building the runner image. If None, uses default.
+            volumes (List[str]): Volumes mounted in the containers, in the format name:path
+            env (Dict[str, str]): Environment variables of the runs
+            idle_timeout (float): Minutes without output after which a run is
+                stopped as if it timed out. If None, only the timeout applies.
+            run_id (str): Value of the ``RUN_LABEL`` label of the containers of
+                the run. Containers that are reused keep the id of the run that
+                created them. If None, a random id is used.
         """
         Act.__check_act()
         Act.__setup_image(runner_image, base_image)
@@ -262,13 +506,20 @@ class Act:
             self.flags = "--rm"
         # The flag -u allows files to be created with the current user
         self.flags += f" --container-options '-u {os.getuid()}:{os.getgid()}"
+        self.run_id = run_id if run_id is not None else uuid.uuid4().hex
+        self.flags += f" --label {Act.RUN_LABEL}={self.run_id}"
         if offline:
             self.flags += " --network none"
         self.flags += f" --memory={Act.__MEMORY_LIMIT}"
+        for volume in volumes or []:
+            self.flags += f" -v {volume}"
         self.flags += "'"
+        for key, value in (env or {}).items():
+            self.flags += f" --env {key}={value}"
 
         self.__DEFAULT_RUNNERS = f"-P ubuntu-latest={runner_image}"
         self.timeout = timeout
+        self.idle_timeout = idle_timeout
         self.fail_strategy = fail_strategy
 
     @staticmethod
@@ -302,45 +553,153 @@ class Act:
                 client.images.remove(image="gitbugactions")
 
             base = base_image if base_image else Act.__DEFAULT_BASE_IMAGE
-            with open("Dockerfile", "w") as f:
-                client = DockerClient.getInstance()
-                dockerfile = f"FROM {base}\n"
-                dockerfile += f"RUN sudo usermod -u 4000000 runneradmin\n"
-                dockerfile += f"RUN sudo groupadd -o -g {os.getgid()} {grp.getgrgid(os.getgid()).gr_name}\n"
-                dockerfile += f"RUN sudo usermod -G {os.getgid()} runner\n"
-                dockerfile += f"RUN sudo usermod -o -u {os.getuid()} runner\n"
-                # Avoids problems with Rust projects in certain hosts
-                dockerfile += f'ENV RUSTUP_HOME="/usr/share/rust/.rustup"\n'
-                f.write(dockerfile)
-
-            client.images.build(path="./", tag="gitbugactions", forcerm=True)
-            os.remove("Dockerfile")
+            image = RunnerImageBuilder.build(RunnerImageBuilder.get_dockerfile(base))
+            client.images.get(image).tag("gitbugactions", "latest")
             Act.__IMAGE_SETUP = True
 
     @staticmethod
     def set_memory_limit(limit: str):
         Act.__MEMORY_LIMIT = limit
 
+    @staticmethod
+    def set_output_limits(head_size: int, tail_size: int):
+        """
+        Sets the number of characters of the output of each run kept in memory
+        (and in the results) from its start and its end.
+        """
+        Act.__OUTPUT_HEAD_SIZE = head_size
+        Act.__OUTPUT_TAIL_SIZE = tail_size
+
+    @staticmethod
+    def set_log_dir(log_dir: Optional[str]):
+        """
+        Sets the directory where the full output of each run is written. If None,
+        the output is only kept in memory.
+        """
+        if log_dir is not None:
+            os.makedirs(log_dir, exist_ok=True)
+        Act.__LOG_DIR = log_dir
+
+    @staticmethod
+    def set_stats_interval(interval: Optional[float]):
+        """
+        Sets the seconds between the samples of the resources used by the
+        containers of each run. If None, the resources are not sampled.
+        """
+        Act.__STATS_INTERVAL = interval
+
+    @staticmethod
+    def get_run_filters(run_id: str) -> Dict[str, str]:
+        """
+        Returns the docker filters of the containers of a run. The names of the
+        containers can not be used, because act changes and truncates them.
+        """
+        return {"label": f"{Act.RUN_LABEL}={run_id}"}
+
+    @staticmethod
+    def add_line_hook(hook: ActLineHook):
+        """
+        Subscribes a function to the output of every run. The function is called
+        with each line while the run is executing.
+        """
+        Act.__LINE_HOOKS.append(hook)
+
+    @staticmethod
+    def remove_line_hook(hook: ActLineHook):
+        if hook in Act.__LINE_HOOKS:
+            Act.__LINE_HOOKS.remove(hook)
+
+    @staticmethod
+    def __get_log_paths(workflow: GitHubWorkflow) -> Dict[str, Optional[str]]:
+        if Act.__LOG_DIR is None:
+            return {"stdout": None, "stderr": None}
+        # The names of the workflows are reused by warm containers
+        name = re.sub(r"[^\w.-]", "_", str(workflow.doc["name"]))
+        name += f"-{uuid.uuid4().hex[:8]}"
+        return {
+            stream: os.path.join(Act.__LOG_DIR, f"{name}.{stream}.log")
+            for stream in ("stdout", "stderr")
+        }
+
     def run_act(
-        self, repo_path, workflow: GitHubWorkflow, act_cache_dir: str
+        self,
+        repo_path,
+        workflow: GitHubWorkflow,
+        act_cache_dir: str,
+        line_hooks: Optional[List[ActLineHook]] = None,
     ) -> ActTestsRun:
+        """
+        Args:
+            line_hooks (List[ActLineHook]): Functions called with each line of the
+                output of the run, in addition to the hooks added with
+                ``add_line_hook``.
+        """
         # Clean up before running
         RepoStateManager.clean_act_result_dir(repo_path)
 
         command = f"cd {repo_path}; "
-        command += f"ACT_DISABLE_VERSION_CHECK=1 XDG_CACHE_HOME='{act_cache_dir}' timeout {self.timeout * 60} {Act.__ACT_PATH} {self.__DEFAULT_RUNNERS} {Act.__FLAGS} {self.flags}"
+        # exec replaces the shell with timeout, which the idle watchdog signals
+        command += f"ACT_DISABLE_VERSION_CHECK=1 XDG_CACHE_HOME='{act_cache_dir}' exec timeout {self.timeout * 60} {Act.__ACT_PATH} {self.__DEFAULT_RUNNERS} {Act.__FLAGS} {self.flags}"
         if GithubToken.has_tokens():
             token: GithubToken = GithubToken.get_token()
             command += f" -s GITHUB_TOKEN={token.token}"
         command += f" -W {workflow.path}"
 
         logging.debug(f"Running command: {command}")
+        pull_timer = ImagePullTimer()
+        step_timer = StepTimer(workflow)
+        hooks = [pull_timer.hook, step_timer.hook] + [
+            lambda stream, line, hook=hook: hook(workflow, stream, line)
+            for hook in Act.__LINE_HOOKS + (line_hooks or [])
+        ]
+        watchdog = None
+        if self.idle_timeout is not None:
+            # timeout forwards the signal to act, which stops the containers
+            watchdog = IdleWatchdog(self.idle_timeout * 60, lambda: process.terminate())
+            hooks.append(watchdog.hook)
+        captures = [
+            OutputCapture(
+                stream,
+                Act.__OUTPUT_HEAD_SIZE,
+                Act.__OUTPUT_TAIL_SIZE,
+                log_path=log_path,
+                hooks=hooks,
+            )
+            for stream, log_path in Act.__get_log_paths(workflow).items()
+        ]
+        sampler = None
+        if Act.__STATS_INTERVAL is not None:
+            sampler = ContainerStatsSampler(
+                Act.get_run_filters(self.run_id), Act.__STATS_INTERVAL
+            )
+            sampler.start()
+
         start_time = time.time()
-        run = subprocess.run(command, shell=True, capture_output=True)
+        # The output is streamed so that the memory used does not depend on its size
+        process = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        if watchdog is not None:
+            watchdog.start()
+        threads = [
+            captures[0].start(process.stdout),
+            captures[1].start(process.stderr),
+        ]
+        return_code = process.wait()
+        for thread in threads:
+            thread.join()
         end_time = time.time()
-
-        stdout = run.stdout.decode("utf-8")
-        stderr = run.stderr.decode("utf-8")
+        step_timer.finish()
+        if sampler is not None:
+            sampler.stop()
+        if watchdog is not None:
+            watchdog.stop()
+            if watchdog.idle:
+                # Idle runs are handled as timed out runs
+                return_code = 124
+
+        stdout = captures[0].get_text()
+        stderr = captures[1].get_text()
 
         tests = workflow.get_test_results(
             os.path.join(
@@ -358,12 +717,23 @@ class Act:
             build_tool=workflow.get_build_tool(),
             elapsed_time=end_time - start_time,
             default_actions=False,
-            return_code=run.returncode,
+            return_code=return_code,
+            stdout_log=captures[0].log_path,
+            stderr_log=captures[1].log_path,
+            image_pull_time=pull_timer.pull_time,
+            run_id=self.run_id,
+            step_timings=step_timer.steps,
+            job_timings=step_timer.jobs,
         )
+        if sampler is not None:
+            tests_run.peak_memory = sampler.peak_memory
+            tests_run.cpu_seconds = sampler.cpu_seconds
+            tests_run.block_io_bytes = sampler.block_io_bytes
+            tests_run.network_bytes = sampler.network_bytes
 
         if self.fail_strategy.failed(tests_run):
             tests_run.failed = True
-            logging.debug(f"RETURN CODE: {run.returncode}")
+            logging.debug(f"RETURN CODE: {return_code}")
             logging.debug(f"STDOUT: {stdout}")
             logging.debug(f"STDERR: {stderr}")
 
@@ -392,7 +762,16 @@ class GitHubActions:
         offline: bool = False,
         base_image: str | None = None,
         instrument_workflows: bool = True,
+        keep_cache_steps: bool = False,
+        test_selection: Optional[TestSelection] = None,
     ):
+        """
+        Args:
+            keep_cache_steps (bool): If True, the cache steps are kept. Only
+                useful if the runs have access to a cache server.
+            test_selection (TestSelection): If set, the test commands of the
+                workflows that support filters only run the selected tests.
+        """
         self.repo_path = repo_path
         self.keep_containers = keep_containers
         self.language: str = language.strip().lower() if language else ""
@@ -435,9 +814,12 @@ class GitHubActions:
                 workflow.instrument_os()
                 workflow.instrument_on_events()
                 workflow.instrument_strategy()
-                workflow.instrument_cache_steps()
+                if not keep_cache_steps:
+                    workflow.instrument_cache_steps()
                 workflow.instrument_setup_steps()
                 workflow.instrument_test_steps(repo_clone=self.repo_path)
+                if test_selection is not None:
+                    workflow.instrument_test_selection(test_selection, self.repo_path)
                 if offline:
                     workflow.instrument_offline_execution()
                 else:
@@ -488,7 +870,17 @@ class GitHubActions:
         act_cache_dir: str,
         act_fail_strategy: ActFailureStrategy = ActTestsFailureStrategy(),
         timeout: int = 10,
+        volumes: Optional[List[str]] = None,
+        env: Optional[Dict[str, str]] = None,
+        line_hooks: Optional[List[ActLineHook]] = None,
+        idle_timeout: Optional[float] = None,
+        run_id: Optional[str] = None,
     ) -> ActTestsRun:
+        """
+        Args:
+            run_id (str): Id of the run in the labels of its containers (see
+                ``Act.RUN_LABEL``). If None, a random id is used.
+        """
         # Clean up before running
         RepoStateManager.clean_act_result_dir(self.repo_path)
 
@@ -499,8 +891,17 @@ class GitHubActions:
             offline=self.offline,
             fail_strategy=act_fail_strategy,
             base_image=self.base_image,
+            volumes=volumes,
+            env=env,
+            idle_timeout=idle_timeout,
+            run_id=run_id,
+        )
+        return act.run_act(
+            self.repo_path,
+            workflow,
+            act_cache_dir=act_cache_dir,
+            line_hooks=line_hooks,
         )
-        return act.run_act(self.repo_path, workflow, act_cache_dir=act_cache_dir)
 
     def remove_containers(self):
         client = DockerClient.getInstance()
@@ -0,0 +1,202 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class AdmissionController:
+    """
+    Decides when an act run can start, based on the resources of the host
+    instead of a fixed number of workers. A run is admitted when:
+        - The memory reserved by the running runs plus the estimate of the new
+          run fits in the memory of the host (minus ``reserved_memory``).
+        - The memory available in the host (MemAvailable) is larger than the
+          estimate of the new run (plus ``reserved_memory``). This accounts for
+          the memory used by other processes.
+        - The load average per CPU is lower than ``max_load``.
+
+    The estimate of a run is the highest peak memory of the previous runs of
+    its repository (see ``ActTestsRun.peak_memory``) with a margin, limited by
+    the memory limit of the containers. Repositories without previous runs
+    are estimated with the memory limit. Small repositories therefore run with
+    more parallelism than heavy ones.
+
+    A run is always admitted when no other run is executing. Runs that wait
+    longer than ``max_wait`` block the admission of newer runs, so heavy runs
+    are not starved by small ones.
+    """
+
+    __UNITS = {"b": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+    def __init__(
+        self,
+        memory_limit: int,
+        reserved_memory: int = 2 * 1024**3,
+        max_load: float = 1.0,
+        margin: float = 1.25,
+        min_memory: int = 512 * 1024**2,
+        max_wait: float = 600,
+        poll_interval: float = 5,
+    ):
+        """
+        Args:
+            memory_limit (int): Memory limit of the containers in bytes.
+            reserved_memory (int): Memory in bytes kept free for the host.
+            max_load (float): Maximum load average (of the last minute) per CPU
+                for new runs to start.
+            margin (float): Multiplier of the peak memory of the previous runs.
+            min_memory (int): Minimum estimate of a run in bytes.
+            max_wait (float): Seconds after which a waiting run blocks the
+                admission of newer runs.
+            poll_interval (float): Seconds between the checks of the resources
+                of the host while a run is waiting.
+        """
+        self.memory_limit = memory_limit
+        self.reserved_memory = reserved_memory
+        self.max_load = max_load
+        self.margin = margin
+        self.min_memory = min_memory
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.__condition = threading.Condition()
+        self.__peak_memory: Dict[str, int] = {}
+        self.__reservations: Dict[int, int] = {}
+        # Start time of the waiting runs, by ticket
+        self.__waiting: Dict[int, float] = {}
+        self.__next_ticket = 0
+
+    @staticmethod
+    def parse_memory(memory: str) -> int:
+        """
+        Returns the number of bytes of a memory limit in the docker format
+        (e.g. "7g" or "512m").
+        """
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([bkmg]?)b?\s*", memory.lower())
+        if match is None:
+            raise ValueError(f"Invalid memory limit: {memory}")
+        unit = AdmissionController.__UNITS[match.group(2) or "b"]
+        return int(float(match.group(1)) * unit)
+
+    @staticmethod
+    def get_host_memory() -> Dict[str, int]:
+        """
+        Returns the total and the available memory of the host in bytes.
+        """
+        memory = {}
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    key, value = line.split(":", 1)
+                    if key in ("MemTotal", "MemAvailable"):
+                        memory[key] = int(value.split()[0]) * 1024
+        except OSError:
+            pass
+        if "MemTotal" not in memory:
+            memory["MemTotal"] = os.sysconf("SC_PAGE_SIZE") * os.sysconf(
+                "SC_PHYS_PAGES"
+            )
+        if "MemAvailable" not in memory:
+            memory["MemAvailable"] = os.sysconf("SC_PAGE_SIZE") * os.sysconf(
+                "SC_AVPHYS_PAGES"
+            )
+        return {"total": memory["MemTotal"], "available": memory["MemAvailable"]}
+
+    @staticmethod
+    def get_load() -> float:
+        """
+        Returns the load average of the last minute per CPU.
+        """
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+
+    def record(self, repo: str, peak_memory: Optional[int]):
+        """
+        Records the peak memory (in bytes) of a run of the repository.
+        """
+        if not peak_memory:
+            return
+        with self.__condition:
+            self.__peak_memory[repo] = max(self.__peak_memory.get(repo, 0), peak_memory)
+
+    def load_history(self, entries: List[Dict]):
+        """
+        Records the peak memory of previous runs, e.g. the entries of the
+        ledger of a run store (``RunStore.query()``).
+        """
+        for entry in entries:
+            if "repo" in entry:
+                self.record(entry["repo"], entry.get("peak_memory"))
+
+    def get_estimate(self, repo: str) -> int:
+        """
+        Returns the memory in bytes reserved for a run of the repository.
+        """
+        with self.__condition:
+            peak_memory = self.__peak_memory.get(repo)
+        if peak_memory is None:
+            return self.memory_limit
+        return min(
+            max(int(peak_memory * self.margin), self.min_memory), self.memory_limit
+        )
+
+    def __can_admit(self, ticket: int, estimate: int) -> bool:
+        if len(self.__reservations) == 0:
+            return True
+
+        now = time.time()
+        oldest = min(self.__waiting, key=self.__waiting.get)
+        if oldest != ticket and now - self.__waiting[oldest] > self.max_wait:
+            return False
+
+        memory = AdmissionController.get_host_memory()
+        reserved = sum(self.__reservations.values())
+        if reserved + estimate > memory["total"] - self.reserved_memory:
+            return False
+        if estimate > memory["available"] - self.reserved_memory:
+            return False
+        return AdmissionController.get_load() < self.max_load
+
+    def acquire(self, repo: str) -> int:
+        """
+        Waits until a run of the repository can start and reserves its memory.
+        ``release`` must be called after the run.
+
+        Returns:
+            int: Ticket of the run, passed to ``release``.
+        """
+        estimate = self.get_estimate(repo)
+        with self.__condition:
+            ticket = self.__next_ticket
+            self.__next_ticket += 1
+            self.__waiting[ticket] = time.time()
+            try:
+                while not self.__can_admit(ticket, estimate):
+                    self.__condition.wait(self.poll_interval)
+            finally:
+                waited = time.time() - self.__waiting.pop(ticket)
+            self.__reservations[ticket] = estimate
+
+        if waited > self.poll_interval:
+            logging.info(
+                f"Run of {repo} waited {waited:.0f}s for {estimate // 1024**2}MB of memory"
+            )
+        return ticket
+
+    def release(self, ticket: int):
+        with self.__condition:
+            self.__reservations.pop(ticket, None)
+            self.__condition.notify_all()
+
+    @contextmanager
+    def admit(self, repo: str) -> Iterator[None]:
+        """
+        Context manager that runs its body once a run of the repository is
+        admitted.
+        """
+        ticket = self.acquire(repo)
+        try:
+            yield
+        finally:
+            self.release(ticket)
@@ -0,0 +1,388 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from gitbugactions.docker.client import DockerClient
+
+
+class CacheEntry:
+    def __init__(self, id: int, scope: str, key: str, version: str):
+        self.id = id
+        self.scope = scope
+        self.key = key
+        self.version = version
+        self.size = 0
+        self.committed = False
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+    def asdict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "CacheEntry":
+        entry = CacheEntry(data["id"], data["scope"], data["key"], data["version"])
+        entry.__dict__.update(data)
+        return entry
+
+
+class ActionsCacheServer:
+    """
+    Local server that implements the API used by actions/cache (and by the
+    ``cache`` input of the setup actions) to save and restore caches. act is
+    run with ``--no-cache-server``, so the runs are pointed to this server
+    through the ``ACTIONS_CACHE_URL`` variable.
+
+    The caches are kept on disk and scoped by repository: each repository uses
+    a different url. The least recently used caches are removed once the caches
+    use more space than the size budget. Caches being downloaded are only
+    removed from disk once their downloads finish. Caches that are reserved but
+    not committed (e.g. the run was stopped during the upload) expire after the
+    upload timeout, so their keys can be saved again.
+
+    The server is not authenticated, so by default it only listens on the
+    gateway of the docker bridge network, which is the address given to the
+    runs.
+    """
+
+    __API_PATH = "_apis/artifactcache"
+
+    def __init__(
+        self,
+        path: str,
+        max_size_gb: float = 10,
+        host: Optional[str] = None,
+        port: int = 0,
+        upload_timeout: float = 30 * 60,
+    ):
+        """
+        Args:
+            path (str): Directory where the caches are kept.
+            max_size_gb (float): Size budget of the caches in GB.
+            host (str): Address on which the server listens. If None, the
+                gateway of the docker bridge network is used.
+            port (int): Port on which the server listens. If 0, a free port is used.
+            upload_timeout (float): Seconds without uploads after which a
+                reserved cache that is not committed expires.
+        """
+        self.path = path
+        self.max_size = int(max_size_gb * 1024**3)
+        self.upload_timeout = upload_timeout
+        self.lock = threading.Lock()
+        self.entries: Dict[int, CacheEntry] = {}
+        # Number of downloads in progress of each cache
+        self.readers: Dict[int, int] = {}
+        self.next_id = 1
+        os.makedirs(os.path.join(path, "caches"), exist_ok=True)
+        self.__load_index()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def do_POST(self):
+                server._handle(self, "POST")
+
+            def do_PATCH(self):
+                server._handle(self, "PATCH")
+
+            def log_message(self, format, *args):
+                logging.debug(f"Cache server: {format % args}")
+
+        if host is None:
+            host = ActionsCacheServer.get_docker_host()
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def get_url(self, scope: str, host: Optional[str] = None) -> str:
+        """
+        Returns the url that the runs of a scope (e.g. a repository) must use.
+
+        Args:
+            scope (str): Scope of the caches. Only alphanumeric characters, '-'
+                and '_' are kept.
+            host (str): Address of the server as seen by the runs. If None, the
+                gateway of the docker bridge network is used.
+        """
+        if host is None:
+            host = ActionsCacheServer.get_docker_host()
+        scope = re.sub(r"[^A-Za-z0-9_-]", "_", scope)
+        return f"http://{host}:{self.port}/{scope}/"
+
+    @staticmethod
+    def get_docker_host() -> str:
+        """
+        Returns the address of the host in the docker bridge network.
+        """
+        network = DockerClient.getInstance().networks.get("bridge")
+        return network.attrs["IPAM"]["Config"][0]["Gateway"]
+
+    def __get_cache_path(self, id: int) -> str:
+        return os.path.join(self.path, "caches", str(id))
+
+    def __load_index(self):
+        index_path = os.path.join(self.path, "index.json")
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "r") as f:
+            for data in json.load(f):
+                entry = CacheEntry.from_dict(data)
+                if entry.committed and os.path.exists(self.__get_cache_path(entry.id)):
+                    self.entries[entry.id] = entry
+        self.next_id = max(self.entries.keys(), default=0) + 1
+
+    def __save_index(self):
+        index_path = os.path.join(self.path, "index.json")
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(
+                [entry.asdict() for entry in self.entries.values() if entry.committed],
+                f,
+            )
+        os.replace(index_path + ".tmp", index_path)
+
+    def __find(self, scope: str, keys: List[str], version: str) -> Optional[CacheEntry]:
+        entries = [
+            entry
+            for entry in self.entries.values()
+            if entry.committed and entry.scope == scope and entry.version == version
+        ]
+        # Same semantics as GitHub: the first key must match exactly and the
+        # other keys (restore-keys) match the most recent cache with the prefix
+        for i, key in enumerate(keys):
+            for entry in sorted(entries, key=lambda e: e.created_at, reverse=True):
+                if entry.key == key or (i > 0 and entry.key.startswith(key)):
+                    return entry
+        return None
+
+    def __remove(self, entry: CacheEntry):
+        """
+        Removes a cache. Its file is kept until its downloads finish (see
+        ``__download``). Must be called with the lock held.
+        """
+        del self.entries[entry.id]
+        if self.readers.get(entry.id, 0) > 0:
+            return
+        try:
+            os.remove(self.__get_cache_path(entry.id))
+        except FileNotFoundError:
+            pass
+
+    def __evict(self):
+        total_size = sum(entry.size for entry in self.entries.values())
+        for entry in sorted(self.entries.values(), key=lambda e: e.last_used):
+            if total_size <= self.max_size:
+                break
+            if not entry.committed:
+                continue
+            self.__remove(entry)
+            total_size -= entry.size
+
+    def __expire_uploads(self):
+        """
+        Removes the reserved caches whose uploads stopped before they were
+        committed. Must be called with the lock held.
+        """
+        now = time.time()
+        for entry in list(self.entries.values()):
+            if not entry.committed and now - entry.last_used > self.upload_timeout:
+                logging.debug(f"Cache server: upload of {entry.key} expired")
+                self.__remove(entry)
+
+    def _handle(self, request: BaseHTTPRequestHandler, method: str):
+        try:
+            url = urlparse(request.path)
+            parts = url.path.strip("/").split("/")
+            # /<scope>/_apis/artifactcache/<resource>[/<id>]
+            if len(parts) < 4 or "/".join(parts[1:3]) != ActionsCacheServer.__API_PATH:
+                return self.__reply(request, 404)
+            scope, resource, args = parts[0], parts[3], parts[4:]
+
+            if method == "GET" and resource == "cache":
+                return self.__query(request, scope, parse_qs(url.query))
+            elif method == "POST" and resource == "caches" and len(args) == 0:
+                return self.__reserve(request, scope)
+            elif method == "PATCH" and resource == "caches" and len(args) == 1:
+                return self.__upload(request, scope, int(args[0]))
+            elif method == "POST" and resource == "caches" and len(args) == 1:
+                return self.__commit(request, scope, int(args[0]))
+            elif method == "GET" and resource == "artifacts" and len(args) == 1:
+                return self.__download(request, scope, int(args[0]))
+            return self.__reply(request, 404)
+        except Exception:
+            logging.error(f"Error in cache server: {traceback.format_exc()}")
+            self.__reply(request, 500)
+
+    def __reply(
+        self,
+        request: BaseHTTPRequestHandler,
+        status: int,
+        body: Optional[Dict[str, Any]] = None,
+    ):
+        content = json.dumps(body).encode("utf-8") if body is not None else b""
+        request.send_response(status)
+        if body is not None:
+            request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(content)))
+        request.end_headers()
+        request.wfile.write(content)
+
+    def __read_json(self, request: BaseHTTPRequestHandler) -> Dict[str, Any]:
+        length = int(request.headers.get("Content-Length", 0))
+        return json.loads(request.rfile.read(length) or b"{}")
+
+    def __query(self, request: BaseHTTPRequestHandler, scope: str, query):
+        keys = [unquote(key) for key in query.get("keys", [""])[0].split(",") if key]
+        version = query.get("version", [""])[0]
+        with self.lock:
+            entry = self.__find(scope, keys, version)
+            if entry is None:
+                return self.__reply(request, 204)
+            entry.last_used = time.time()
+
+        host = request.headers.get("Host")
+        return self.__reply(
+            request,
+            200,
+            {
+                "scope": scope,
+                "cacheKey": entry.key,
+                "cacheVersion": entry.version,
+                "creationTime": entry.created_at,
+                "archiveLocation": f"http://{host}/{scope}/{ActionsCacheServer.__API_PATH}/artifacts/{entry.id}",
+            },
+        )
+
+    def __reserve(self, request: BaseHTTPRequestHandler, scope: str):
+        data = self.__read_json(request)
+        with self.lock:
+            self.__expire_uploads()
+            for entry in self.entries.values():
+                if (
+                    entry.scope == scope
+                    and entry.key == data["key"]
+                    and entry.version == data.get("version", "")
+                ):
+                    # The cache already exists or is being uploaded
+                    return self.__reply(request, 409)
+            entry = CacheEntry(
+                self.next_id, scope, data["key"], data.get("version", "")
+            )
+            self.next_id += 1
+            self.entries[entry.id] = entry
+        open(self.__get_cache_path(entry.id), "wb").close()
+        return self.__reply(request, 201, {"cacheId": entry.id})
+
+    def __get_entry(self, scope: str, id: int) -> Optional[CacheEntry]:
+        with self.lock:
+            entry = self.entries.get(id)
+        if entry is None or entry.scope != scope:
+            return None
+        return entry
+
+    def __upload(self, request: BaseHTTPRequestHandler, scope: str, id: int):
+        entry = self.__get_entry(scope, id)
+        if entry is None or entry.committed:
+            return self.__reply(request, 404)
+
+        # Content-Range: bytes <start>-<end>/*
+        match = re.match(r"bytes (\d+)-(\d+)", request.headers.get("Content-Range", ""))
+        start = int(match.group(1)) if match else 0
+        length = int(request.headers.get("Content-Length", 0))
+        with open(self.__get_cache_path(id), "r+b") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = request.rfile.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+                # The upload is still in progress
+                entry.last_used = time.time()
+        return self.__reply(request, 200)
+
+    def __commit(self, request: BaseHTTPRequestHandler, scope: str, id: int):
+        self.__read_json(request)
+        entry = self.__get_entry(scope, id)
+        if entry is None:
+            return self.__reply(request, 404)
+        with self.lock:
+            entry.size = os.path.getsize(self.__get_cache_path(id))
+            entry.committed = True
+            entry.last_used = time.time()
+            self.__evict()
+            self.__save_index()
+        return self.__reply(request, 204)
+
+    def __download(self, request: BaseHTTPRequestHandler, scope: str, id: int):
+        with self.lock:
+            entry = self.entries.get(id)
+            if entry is None or entry.scope != scope or not entry.committed:
+                entry = None
+            else:
+                # The file is not removed while it is being downloaded
+                self.readers[id] = self.readers.get(id, 0) + 1
+        if entry is None:
+            return self.__reply(request, 404)
+
+        try:
+            self.__send_file(request, self.__get_cache_path(id))
+        finally:
+            with self.lock:
+                self.readers[id] -= 1
+                if self.readers[id] == 0:
+                    del self.readers[id]
+                    if id not in self.entries:
+                        # The cache was removed during the download
+                        try:
+                            os.remove(self.__get_cache_path(id))
+                        except FileNotFoundError:
+                            pass
+
+    def __send_file(self, request: BaseHTTPRequestHandler, cache_path: str):
+        size = os.path.getsize(cache_path)
+        start, end, status = 0, size - 1, 200
+        # Concurrent downloads use ranges
+        match = re.match(r"bytes=(\d+)-(\d*)", request.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            status = 206
+
+        request.send_response(status)
+        request.send_header("Content-Type", "application/octet-stream")
+        request.send_header("Content-Length", str(max(end - start + 1, 0)))
+        if status == 206:
+            request.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        request.end_headers()
+        with open(cache_path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                request.wfile.write(chunk)
+                remaining -= len(chunk)
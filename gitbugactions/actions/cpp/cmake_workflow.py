@@ -1,6 +1,6 @@
 import re, glob
 
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 from junitparser import TestCase
 
@@ -42,6 +42,27 @@ class CMakeWorkflow(GitHubWorkflow):
                 else:
                     job["env"]["CMAKE_VERSION"] = "latest"
 
+    def _get_build_cache_script(self, cache_dir: str) -> Optional[str]:
+        # CMake reads the compiler launchers from the environment (>= 3.17).
+        # The paths are relative to the workspace, which changes between clones.
+        return (
+            "if command -v ccache > /dev/null 2>&1; then\n"
+            f"  mkdir -p {cache_dir}/ccache\n"
+            f'  echo "CCACHE_DIR={cache_dir}/ccache" >> "$GITHUB_ENV"\n'
+            '  echo "CCACHE_BASEDIR=$GITHUB_WORKSPACE" >> "$GITHUB_ENV"\n'
+            '  echo "CCACHE_NOHASHDIR=true" >> "$GITHUB_ENV"\n'
+            "  launcher=ccache\n"
+            "elif command -v sccache > /dev/null 2>&1; then\n"
+            f"  mkdir -p {cache_dir}/sccache\n"
+            f'  echo "SCCACHE_DIR={cache_dir}/sccache" >> "$GITHUB_ENV"\n'
+            "  launcher=sccache\n"
+            "fi\n"
+            'if [ -n "$launcher" ]; then\n'
+            '  echo "CMAKE_C_COMPILER_LAUNCHER=$launcher" >> "$GITHUB_ENV"\n'
+            '  echo "CMAKE_CXX_COMPILER_LAUNCHER=$launcher" >> "$GITHUB_ENV"\n'
+            "fi\n"
+        )
+
     def get_test_results(self, repo_path) -> List[TestCase]:
         search_path = str(Path(repo_path, "**", "*", self.result_file))
         files = glob.glob(search_path, recursive=True)
@@ -1,10 +1,12 @@
+import os
 import re
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from junitparser import TestCase
 
 from gitbugactions.actions.multi.junitxmlparser import JUnitXMLParser
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.workflow import GitHubWorkflow
 
 
@@ -15,6 +17,11 @@ class GoWorkflow(GitHubWorkflow):
         r"go\s+(([^\s]+\s+)*)?",
     ]
     GITBUG_CACHE = "~/gitbug-cache"
+    __TEST_FUNCTION_PATTERN = re.compile(
+        r"^func\s+(Test\w*)\s*\(\s*\w+\s+\*testing\.T\s*\)", re.MULTILINE
+    )
+    # Output of the test runner when no tests match the filters
+    __NO_TESTS_PATTERN = re.compile(r"testing: warning: no tests to run")
 
     def _is_test_command(self, command) -> bool:
         return self.__is_command(command, ["test"])[0]
@@ -139,6 +146,34 @@ class GoWorkflow(GitHubWorkflow):
                                     + " 2>&1 | ~/go/bin/go-junit-report > report.xml"
                                 )
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        # go test only filters by the names of the test functions
+        names = set()
+        for file in selection.get_files([".go"]):
+            path = os.path.join(repo_path, file)
+            if not file.endswith("_test.go") or not os.path.isfile(path):
+                continue
+            with open(path, "r", errors="replace") as f:
+                names.update(GoWorkflow.__TEST_FUNCTION_PATTERN.findall(f.read()))
+        if len(names) == 0:
+            return False
+
+        args = f"-run '^({'|'.join(sorted(names))})$'"
+        return self._instrument_test_commands(
+            lambda line: self._add_arguments(line, r"\bgo\s+test(?=\s|$)", args)
+        )
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        return GoWorkflow.__NO_TESTS_PATTERN.search(output) is not None
+
+    def _get_build_cache_script(self, cache_dir: str) -> Optional[str]:
+        return (
+            f"mkdir -p {cache_dir}/go\n"
+            f'echo "GOCACHE={cache_dir}/go" >> "$GITHUB_ENV"\n'
+        )
+
     def get_test_results(self, repo_path) -> List[TestCase]:
         parser = JUnitXMLParser()
         return parser.get_test_results(str(Path(repo_path, "report.xml")))
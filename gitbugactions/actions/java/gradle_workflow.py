@@ -1,10 +1,11 @@
 import re
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from junitparser import TestCase
 
 from gitbugactions.actions.multi.junitxmlparser import JUnitXMLParser
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.workflow import GitHubWorkflow
 
 
@@ -14,6 +15,8 @@ class GradleWorkflow(GitHubWorkflow):
     __TESTS_COMMAND_PATTERNS = [
         r"(gradle|gradlew)\s+(([^\s]+\s+)*)?(test|check|build|buildDependents|buildNeeded)",
     ]
+    # Output of the test runner when no tests match the filters
+    __NO_TESTS_PATTERN = re.compile(r"No tests found for given includes")
 
     def _is_test_command(self, command) -> bool:
         # Checks if the given command matches any of the tests command patterns
@@ -25,6 +28,25 @@ class GradleWorkflow(GitHubWorkflow):
     def instrument_test_steps(self, **kwargs):
         pass
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        classes = selection.get_names([".java", ".kt", ".groovy", ".scala"])
+        if len(classes) == 0:
+            return False
+
+        # --tests is an option of the test task, so other tasks (e.g. check or
+        # build) keep running the full suite. The classes can be in any package.
+        args = " ".join(f"--tests '*{name}'" for name in classes)
+        return self._instrument_test_commands(
+            lambda line: self._add_arguments(
+                line, r"\bgradlew?\s+(\S+\s+)*?(\S*:)?test(?=\s|$)", args
+            )
+        )
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        return GradleWorkflow.__NO_TESTS_PATTERN.search(output) is not None
+
     def instrument_offline_execution(self):
         # Add an "--offline" option to the test command
         if "jobs" in self.doc:
@@ -34,6 +56,20 @@ class GradleWorkflow(GitHubWorkflow):
                         if "run" in step and self._is_test_command(step["run"]):
                             step["run"] += " --offline"
 
+    def _get_build_cache_script(self, cache_dir: str) -> Optional[str]:
+        # The init script enables the local build cache without changing the
+        # files of the repository. GRADLE_USER_HOME may be a dependency volume.
+        return (
+            'gradle_home="${GRADLE_USER_HOME:-$HOME/.gradle}"\n'
+            f'mkdir -p "$gradle_home/init.d" {cache_dir}/gradle\n'
+            'cat > "$gradle_home/init.d/gitbugactions-build-cache.gradle" << EOF\n'
+            "gradle.startParameter.buildCacheEnabled = true\n"
+            "settingsEvaluated { settings ->\n"
+            f"    settings.buildCache {{ local {{ directory = new File('{cache_dir}/gradle') }} }}\n"
+            "}\n"
+            "EOF\n"
+        )
+
     def get_test_results(self, repo_path) -> List[TestCase]:
         parser = JUnitXMLParser()
         return parser.get_test_results(
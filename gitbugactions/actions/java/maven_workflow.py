@@ -5,6 +5,7 @@ from typing import List
 from junitparser import TestCase
 
 from gitbugactions.actions.multi.junitxmlparser import JUnitXMLParser
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.workflow import GitHubWorkflow
 
 
@@ -14,6 +15,14 @@ class MavenWorkflow(GitHubWorkflow):
     __TESTS_COMMAND_PATTERNS = [
         r"(maven|mvn|mavenw|mvnw)\s+(([^\s]+\s+)*)?(test|package|verify|install)",
     ]
+    # Output of the test runner when no tests match the filters
+    __NO_TESTS_PATTERN = re.compile(r"No tests to run|No tests were executed")
+    # Separators of the commands in a line (e.g. mvn install && mvn test)
+    __COMMAND_SEPARATORS = re.compile(r"(&&|\|\||;|\|)")
+    # Options that skip the execution of the tests
+    __SKIP_TESTS_PATTERN = re.compile(
+        r"-D(skipTests|maven\.test\.skip)(=true)?(?=\s|$)"
+    )
 
     def _is_test_command(self, command) -> bool:
         # Checks if the given command matches any of the tests command patterns
@@ -25,6 +34,41 @@ class MavenWorkflow(GitHubWorkflow):
     def instrument_test_steps(self, **kwargs):
         pass
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        classes = selection.get_names([".java", ".kt", ".groovy", ".scala"])
+        if len(classes) == 0:
+            return False
+
+        # Modules without the selected classes must not fail the build
+        args = (
+            f"-Dtest={','.join(classes)} "
+            + "-Dsurefire.failIfNoSpecifiedTests=false -DfailIfNoTests=false"
+        )
+        return self._instrument_test_commands(
+            lambda line: self.__add_test_arguments(line, args)
+        )
+
+    def __add_test_arguments(self, line: str, args: str) -> str:
+        """
+        Adds the arguments to every maven command of the line that runs the
+        tests, so the selection is not only applied to e.g. a previous install
+        that skips them.
+        """
+        commands = MavenWorkflow.__COMMAND_SEPARATORS.split(line)
+        for i, command in enumerate(commands):
+            skips_tests = MavenWorkflow.__SKIP_TESTS_PATTERN.search(command)
+            if self._is_test_command(command) and not skips_tests:
+                commands[i] = self._add_arguments(
+                    command, r"\b(maven|mvn)w?(?=\s)", args
+                )
+        return "".join(commands)
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        # Surefire does not fail without tests (see instrument_test_selection)
+        return MavenWorkflow.__NO_TESTS_PATTERN.search(output) is not None
+
     def instrument_offline_execution(self):
         # Add an "--offline" option to the test command
         if "jobs" in self.doc:
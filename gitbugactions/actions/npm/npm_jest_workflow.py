@@ -1,9 +1,12 @@
+import re
+import shlex
 from pathlib import Path
 from typing import List
 
 from junitparser import TestCase
 
 from gitbugactions.actions.multi.junitxmlparser import JUnitXMLParser
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.npm.npm_workflow import NpmWorkflow
 
 
@@ -13,6 +16,9 @@ class NpmJestWorkflow(NpmWorkflow):
     def is_npm_test_command(cls, command: str) -> bool:
         return "jest" in command.lower()
 
+    # Output of the test runner when no tests match the filters
+    __NO_TESTS_PATTERN = re.compile(r"No tests found, exiting with code")
+
     def instrument_test_steps(self, **kwargs):
         if "jobs" in self.doc:
             for _, job in self.doc["jobs"].items():
@@ -24,6 +30,31 @@ class NpmJestWorkflow(NpmWorkflow):
                             ] = f"""npm install --save-dev jest-junit
 {step['run']} -- --reporters=default --reporters=jest-junit"""
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        files = [
+            file
+            for file in selection.get_files(
+                [".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"]
+            )
+            if re.search(r"(\.(test|spec)\.[^.]+$)|(^|/)__tests__/", file)
+        ]
+        if len(files) == 0:
+            return False
+
+        # The paths are patterns matched against the paths of the test files,
+        # which is more precise than matching the names of the tests with -t
+        args = " ".join(shlex.quote(f"{re.escape(file)}$") for file in files)
+        return self._instrument_test_commands(
+            lambda line: self._add_arguments(
+                line, r"\s--(?=\s+--reporters=default)", args
+            )
+        )
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        return NpmJestWorkflow.__NO_TESTS_PATTERN.search(output) is not None
+
     def get_test_results(self, repo_path) -> List[TestCase]:
         parser = JUnitXMLParser()
         # Jest-junit outputs to junit.xml by default
@@ -0,0 +1,128 @@
+import codecs
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import IO, Callable, Deque, List, Optional
+
+# Called with the name of the stream (e.g. "stdout") and each line of output
+LineHook = Callable[[str, str], None]
+
+
+class OutputCapture:
+    """
+    Captures an output stream of a process while it runs. The output is read
+    line by line, so the memory used does not depend on the size of the output:
+        - Only the first ``head_size`` and the last ``tail_size`` characters are
+          kept in memory. The output in between is omitted from ``get_text``.
+        - The full output can be written to a log file.
+        - Each line is passed to the hooks as soon as it is read.
+
+    Invalid UTF-8 is replaced instead of raising errors.
+    """
+
+    # Maximum size of the lines read from the stream. Longer lines (e.g. progress
+    # bars without new lines) are split.
+    __MAX_LINE_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        name: str,
+        head_size: int,
+        tail_size: int,
+        log_path: Optional[str] = None,
+        hooks: Optional[List[LineHook]] = None,
+    ):
+        """
+        Args:
+            name (str): Name of the stream, passed to the hooks.
+            head_size (int): Number of characters kept from the start of the output.
+            tail_size (int): Number of characters kept from the end of the output.
+            log_path (str): File where the full output is written. If None, the
+                output is not written.
+            hooks (List[LineHook]): Functions called with each line.
+        """
+        self.name = name
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.log_path = log_path
+        self.hooks = hooks or []
+        self.head: List[str] = []
+        self.head_length = 0
+        self.tail: Deque[str] = deque()
+        self.tail_length = 0
+        self.omitted = 0
+        self.size = 0
+
+    def feed(self, line: str):
+        """
+        Adds a line (with its line break) to the captured output.
+        """
+        self.size += len(line)
+        for hook in self.hooks:
+            try:
+                hook(self.name, line)
+            except Exception:
+                logging.error(f"Error in output hook: {traceback.format_exc()}")
+
+        if self.head_length < self.head_size:
+            line_head = line[: self.head_size - self.head_length]
+            self.head.append(line_head)
+            self.head_length += len(line_head)
+            line = line[len(line_head) :]
+            if len(line) == 0:
+                return
+
+        self.tail.append(line)
+        self.tail_length += len(line)
+        while self.tail_length > self.tail_size and len(self.tail) > 0:
+            removed = self.tail.popleft()
+            self.tail_length -= len(removed)
+            self.omitted += len(removed)
+
+    def read(self, stream: IO[bytes]):
+        """
+        Reads the stream until it is closed.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        log_file = None
+        if self.log_path is not None:
+            log_file = open(self.log_path, "w", encoding="utf-8")
+        try:
+            for data in iter(
+                lambda: stream.readline(OutputCapture.__MAX_LINE_SIZE), b""
+            ):
+                line = decoder.decode(data)
+                if log_file is not None:
+                    log_file.write(line)
+                if len(line) > 0:
+                    self.feed(line)
+            line = decoder.decode(b"", final=True)
+            if len(line) > 0:
+                if log_file is not None:
+                    log_file.write(line)
+                self.feed(line)
+        finally:
+            if log_file is not None:
+                log_file.close()
+            stream.close()
+
+    def start(self, stream: IO[bytes]) -> threading.Thread:
+        """
+        Reads the stream in a new thread.
+        """
+        thread = threading.Thread(target=self.read, args=(stream,), daemon=True)
+        thread.start()
+        return thread
+
+    def get_text(self) -> str:
+        """
+        Returns the captured output. If part of the output was omitted, a line
+        with the number of omitted characters is added in its place.
+        """
+        text = "".join(self.head)
+        if self.omitted > 0:
+            if not text.endswith("\n"):
+                text += "\n"
+            text += f"[... {self.omitted} characters omitted ...]\n"
+        return text + "".join(self.tail)
@@ -1,10 +1,13 @@
+import os
 import re
+import shlex
 from pathlib import Path
 from typing import List
 
 from junitparser import TestCase
 
 from gitbugactions.actions.multi.junitxmlparser import JUnitXMLParser
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.workflow import GitHubWorkflow
 
 
@@ -16,6 +19,8 @@ class PytestWorkflow(GitHubWorkflow):
         r"py.test",
         r"python([23](\.\d+)?)?\s+(([^\s]+\s+)*)?-m\s+pytest",  # Matches commands that call pytest through python's module option
     ]
+    # Output of the test runner when no tests match the filters
+    __NO_TESTS_PATTERN = re.compile(r"\bno tests ran\b")
 
     def _is_test_command(self, command) -> bool:
         # Checks if the given command matches any of the tests command patterns
@@ -53,6 +58,32 @@ class PytestWorkflow(GitHubWorkflow):
                                     step["run"],
                                 )
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        files = [
+            file
+            for file in selection.get_files([".py"])
+            if os.path.basename(file).startswith("test_") or file.endswith("_test.py")
+        ]
+        if len(files) == 0:
+            return False
+
+        # Paths given in the command line replace the testpaths of the config
+        args = " ".join(shlex.quote(file) for file in files)
+        return self._instrument_test_commands(
+            lambda line: (
+                line
+                # e.g. pip install pytest
+                if re.search(r"\binstall\b", line)
+                else self._add_arguments(line, r"py\.?test(?=\s|$)", args)
+            )
+        )
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        # pytest exits with code 5 when no tests are collected
+        return PytestWorkflow.__NO_TESTS_PATTERN.search(output) is not None
+
     def get_test_results(self, repo_path) -> List[TestCase]:
         parser = JUnitXMLParser()
         return parser.get_test_results(str(Path(repo_path, "report.xml")))
@@ -0,0 +1,201 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import docker
+
+from gitbugactions.actions.actions import ActTestsRun
+from gitbugactions.actions.workflow import GitHubWorkflow
+from gitbugactions.docker.client import DockerClient
+
+
+class ActRunCache:
+    """
+    Caches the results of act runs by the content of what is executed: the
+    state of the working tree, the instrumented workflows, the runner image
+    and the execution options. Identical executions (e.g. the current commit
+    of a bug-fix and the previous commit of the next one) are only run once.
+
+    If a run for a key is already in progress in another thread, the other
+    threads wait for its results instead of running it again.
+
+    Estimated timeouts change between runs, so they are not part of the keys.
+    The cached runs that timed out are run again if the new timeout is larger
+    (see ``is_stale``).
+    """
+
+    __IMAGE_IDS: Dict[str, str] = {}
+    __IMAGE_IDS_LOCK = threading.Lock()
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries (int): Maximum number of cached executions. The least
+                recently used ones are evicted first.
+        """
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, List[ActTestsRun]]" = OrderedDict()
+        # Timeouts of the cached executions
+        self.timeouts: Dict[str, Optional[int]] = {}
+        self.running: Dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_image_id(image: str) -> str:
+        """
+        Returns the id of a docker image so that rebuilt images with the same
+        tag do not share cached results. If the image does not exist yet, its
+        name is returned.
+        """
+        with ActRunCache.__IMAGE_IDS_LOCK:
+            if image in ActRunCache.__IMAGE_IDS:
+                return ActRunCache.__IMAGE_IDS[image]
+            try:
+                image_id = DockerClient.getInstance().images.get(image).id
+            except docker.errors.ImageNotFound:
+                return image
+            ActRunCache.__IMAGE_IDS[image] = image_id
+            return image_id
+
+    @staticmethod
+    def get_workflow_hash(workflow: GitHubWorkflow) -> str:
+        """
+        Hashes an instrumented workflow. The GitHub tokens added by the
+        instrumentation rotate between runs, so they are masked.
+        """
+        content = json.dumps(workflow.doc, sort_keys=True, default=str)
+        for token in workflow.tokens:
+            content = content.replace(token.token, "***")
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_workflows_fingerprint(workflows: List[GitHubWorkflow]) -> List[List[str]]:
+        """
+        Returns the name of the file and the hash of each workflow.
+        """
+        # The repo is copied to a different path for each execution
+        return [
+            [os.path.basename(workflow.path), ActRunCache.get_workflow_hash(workflow)]
+            for workflow in workflows
+        ]
+
+    @staticmethod
+    def get_key(
+        tree_id: str,
+        workflows: List[GitHubWorkflow],
+        runner_image: str,
+        offline: bool,
+        default_actions: bool,
+        timeout: Optional[int],
+    ) -> str:
+        """
+        Args:
+            tree_id (str): Id of the git tree of the working tree (see
+                ``RepoStateManager.get_worktree_tree_id``).
+            workflows (List[GitHubWorkflow]): Workflows that are executed.
+            runner_image (str): Name of the runner image.
+            offline (bool): Whether the workflows are run without network.
+            default_actions (bool): Whether the default actions are used.
+            timeout (int): Timeout of each workflow in minutes, if set by the
+                user. None if the timeout is estimated from previous runs.
+        """
+        key = {
+            "tree": tree_id,
+            "workflows": ActRunCache.get_workflows_fingerprint(workflows),
+            "runner_image": ActRunCache.get_image_id(runner_image),
+            "offline": offline,
+            "default_actions": default_actions,
+            "timeout": timeout,
+        }
+        return hashlib.sha256(
+            json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def is_stale(
+        timed_out: bool, stored_timeout: Optional[int], timeout: Optional[int]
+    ) -> bool:
+        """
+        Returns True if a stored execution must be run again because it timed
+        out with a smaller timeout than the new one.
+        """
+        return (
+            timed_out
+            and stored_timeout is not None
+            and timeout is not None
+            and timeout > stored_timeout
+        )
+
+    @staticmethod
+    def __copy(act_run: ActTestsRun) -> ActTestsRun:
+        """
+        Copies a run so that changes to its tests or to its workflow (e.g. the
+        instrumentation of a later phase) are not seen by the other callers.
+        The GitHub tokens of the workflow are shared.
+        """
+        copied = copy.copy(act_run)
+        copied.tests = copy.deepcopy(act_run.tests)
+        copied.step_timings = copy.deepcopy(act_run.step_timings)
+        copied.job_timings = copy.deepcopy(act_run.job_timings)
+        copied.workflow = copy.copy(act_run.workflow)
+        copied.workflow.doc = copy.deepcopy(act_run.workflow.doc)
+        copied.workflow.tokens = list(act_run.workflow.tokens)
+        return copied
+
+    def get_or_run(
+        self,
+        key: str,
+        run: Callable[[], List[ActTestsRun]],
+        timeout: Optional[int] = None,
+    ) -> List[ActTestsRun]:
+        """
+        Returns the cached runs for the key or calls ``run`` to create them.
+        Callers get deep copies of the cached runs so that they can modify them.
+
+        Args:
+            timeout (int): Timeout of the runs in minutes.
+        """
+        while True:
+            with self.lock:
+                # 124 is the return code for the timeout
+                if key in self.entries and ActRunCache.is_stale(
+                    any(act_run.return_code == 124 for act_run in self.entries[key]),
+                    self.timeouts.get(key),
+                    timeout,
+                ):
+                    del self.entries[key]
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return [
+                        ActRunCache.__copy(act_run) for act_run in self.entries[key]
+                    ]
+                event = self.running.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self.running[key] = event
+                    self.misses += 1
+                    break
+            # Another thread is running the same execution
+            event.wait()
+
+        try:
+            act_runs = run()
+            with self.lock:
+                self.entries[key] = act_runs
+                self.timeouts[key] = timeout
+                if len(self.entries) > self.max_entries:
+                    evicted, _ = self.entries.popitem(last=False)
+                    self.timeouts.pop(evicted, None)
+        finally:
+            with self.lock:
+                del self.running[key]
+            event.set()
+
+        return [ActRunCache.__copy(act_run) for act_run in act_runs]
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from gitbugactions.actions.actions import ActTestsRun
+from gitbugactions.actions.run_cache import ActRunCache
+from gitbugactions.actions.workflow import GitHubWorkflow
+from gitbugactions.utils.blob_store import BlobStore
+
+
+class RunStore:
+    """
+    On-disk store of the act runs executed by every stage (collect, export and
+    filter). The runs are keyed by the working tree and the instrumented
+    workflows (see ``get_key``), which are shared by the stages, so a stage can
+    reuse the runs of another stage instead of running them again (e.g. the
+    first execution of filter_bugs is the run of collect_bugs). The runner
+    image and the network settings differ between stages, so they are kept in
+    the ledger instead.
+
+    The store is a directory with:
+        - ``runs/<key>.jsonl``: one line per execution of the key with the runs
+          of each workflow (test results, output and timings).
+        - ``ledger.jsonl``: one line per execution with its key, the stage that
+          ran it and its metadata. The ledger can be queried with ``query``.
+        - ``blobs``: the outputs of the runs and of the tests (see ``BlobStore``).
+
+    Each key can have several executions (e.g. the repeated executions used by
+    filter_bugs to detect flaky tests), identified by their index. The timeout
+    of each execution is stored, so an execution that timed out is run again
+    with a larger timeout (see ``ActRunCache.is_stale``).
+    """
+
+    def __init__(self, path: str, stage: str):
+        """
+        Args:
+            path (str): Directory of the store.
+            stage (str): Name of the stage that is writing to the store.
+        """
+        self.path = path
+        self.stage = stage
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(path, "runs"), exist_ok=True)
+        self.blob_store = BlobStore(os.path.join(path, "blobs"))
+
+    @staticmethod
+    def get_key(tree_id: str, workflows: List[GitHubWorkflow]) -> str:
+        """
+        Returns the fingerprint of an execution.
+
+        Args:
+            tree_id (str): Id of the git tree of the working tree (see
+                ``RepoStateManager.get_worktree_tree_id``).
+            workflows (List[GitHubWorkflow]): Workflows that are executed.
+        """
+        key = {
+            "tree": tree_id,
+            "workflows": ActRunCache.get_workflows_fingerprint(workflows),
+        }
+        return hashlib.sha256(
+            json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def __get_runs_path(self, key: str) -> str:
+        return os.path.join(self.path, "runs", f"{key}.jsonl")
+
+    def __read_executions(self, key: str) -> List[Dict[str, Any]]:
+        runs_path = self.__get_runs_path(key)
+        if not os.path.exists(runs_path):
+            return []
+        with open(runs_path, "r") as f:
+            return [json.loads(line) for line in f if len(line.strip()) != 0]
+
+    def count(self, key: str) -> int:
+        """
+        Returns the number of executions stored for the key.
+        """
+        with self.lock:
+            return len(self.__read_executions(key))
+
+    def get(
+        self,
+        key: str,
+        execution: int,
+        workflows: List[GitHubWorkflow],
+        timeout: Optional[int] = None,
+    ) -> Optional[List[ActTestsRun]]:
+        """
+        Returns the runs of an execution or None if it was not stored.
+
+        Args:
+            key (str): Fingerprint of the execution.
+            execution (int): Index of the execution.
+            workflows (List[GitHubWorkflow]): Workflows of the execution. They
+                are matched with the stored runs by the name of their files.
+            timeout (int): Timeout of the new execution in minutes. Executions
+                that timed out with a smaller timeout are not returned.
+        """
+        with self.lock:
+            executions = self.__read_executions(key)
+        if execution >= len(executions):
+            return None
+        # 124 is the return code for the timeout
+        if ActRunCache.is_stale(
+            any(data["return_code"] == 124 for data in executions[execution]["runs"]),
+            executions[execution].get("timeout"),
+            timeout,
+        ):
+            return None
+
+        workflows_by_name = {
+            os.path.basename(workflow.path): workflow for workflow in workflows
+        }
+        act_runs = []
+        for data in executions[execution]["runs"]:
+            workflow = workflows_by_name.get(os.path.basename(data["workflow"]["path"]))
+            if workflow is None:
+                return None
+            act_runs.append(ActTestsRun.from_dict(data, workflow, self.blob_store))
+        return act_runs
+
+    def add(
+        self,
+        key: str,
+        act_runs: List[ActTestsRun],
+        timeout: Optional[int] = None,
+        execution: Optional[int] = None,
+        **metadata,
+    ) -> int:
+        """
+        Stores the runs of an execution.
+
+        Args:
+            key (str): Fingerprint of the execution.
+            act_runs (List[ActTestsRun]): Runs of each workflow.
+            timeout (int): Timeout of the runs in minutes.
+            execution (int): Index of the execution replaced by the runs (e.g.
+                an execution that timed out, run again with a larger timeout).
+                If None or not stored, the runs are added as a new execution.
+            metadata: Information added to the ledger (e.g. the commit).
+
+        Returns:
+            int: Index of the execution.
+        """
+        runs = [act_run.asdict(self.blob_store) for act_run in act_runs]
+        line = {"key": key, "runs": runs, "timeout": timeout}
+        with self.lock:
+            executions = self.__read_executions(key)
+            if execution is not None and execution < len(executions):
+                executions[execution] = line
+                with open(self.__get_runs_path(key), "w") as f:
+                    for data in executions:
+                        f.write(json.dumps(data) + "\n")
+            else:
+                execution = len(executions)
+                with open(self.__get_runs_path(key), "a") as f:
+                    f.write(json.dumps(line) + "\n")
+
+            entry = {
+                "key": key,
+                "execution": execution,
+                "stage": self.stage,
+                "created_at": time.time(),
+                "elapsed_time": sum(act_run.elapsed_time for act_run in act_runs),
+                "max_elapsed_time": max(
+                    (act_run.elapsed_time for act_run in act_runs), default=0
+                ),
+                # 124 is the return code for the timeout
+                "timed_out": any(act_run.return_code == 124 for act_run in act_runs),
+                "timeout": timeout,
+                "failed": any(act_run.failed for act_run in act_runs),
+                "tests": sum(len(act_run.tests) for act_run in act_runs),
+                "peak_memory": max(
+                    (act_run.peak_memory or 0 for act_run in act_runs), default=0
+                ),
+                **metadata,
+            }
+            with open(os.path.join(self.path, "ledger.jsonl"), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return execution
+
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        """
+        Returns the ledger entries whose fields are equal to the filters
+        (e.g. ``query(stage="filter", commit=...)``).
+        """
+        ledger_path = os.path.join(self.path, "ledger.jsonl")
+        if not os.path.exists(ledger_path):
+            return []
+
+        entries = []
+        with self.lock:
+            with open(ledger_path, "r") as f:
+                for line in f:
+                    if len(line.strip()) == 0:
+                        continue
+                    entry = json.loads(line)
+                    if all(entry.get(k) == v for k, v in filters.items()):
+                        entries.append(entry)
+        return entries
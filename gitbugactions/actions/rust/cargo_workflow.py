@@ -1,10 +1,12 @@
+import os
 import re
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from junitparser import TestCase
 
 from gitbugactions.actions.multi.junitxmlparser import JUnitXMLParser
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.workflow import GitHubWorkflow
 
 
@@ -15,6 +17,8 @@ class CargoWorkflow(GitHubWorkflow):
         r"cargo\s+(([^\s]+\s+)*)?",
     ]
     GITBUG_CACHE = "~/gitbug-cache"
+    # Output of the test runner when no tests match the filters
+    __NO_TESTS_PATTERN = re.compile(r"no test target named")
 
     def _is_test_command(self, command) -> bool:
         return self.__is_command(command, ["test"])[0]
@@ -89,6 +93,46 @@ class CargoWorkflow(GitHubWorkflow):
                             if "cargo2junit" not in step["run"]:
                                 step["run"] += " | cargo2junit > results.xml"
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        # Only the integration tests (tests/<name>.rs) have their own targets.
+        # The unit tests are in the modules of the crate, so the full suite runs.
+        targets = []
+        for file in selection.get_files([".rs"]):
+            directory, name = os.path.split(file)
+            if os.path.basename(directory) != "tests":
+                return False
+            targets.append(os.path.splitext(name)[0])
+        if len(targets) == 0:
+            return False
+
+        args = " ".join(f"--test {target}" for target in targets)
+        return self._instrument_test_commands(
+            lambda line: self._add_arguments(line, r"\bcargo\s+test(?=\s|$)", args)
+        )
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        return CargoWorkflow.__NO_TESTS_PATTERN.search(output) is not None
+
+    def _get_build_cache_script(self, cache_dir: str) -> Optional[str]:
+        # The target dir is linked instead of set with CARGO_TARGET_DIR, so
+        # the steps that use paths in target/ keep working. The compiled
+        # dependencies are reused because the registry has the same path in
+        # every run. Cargo locks the target dir, so concurrent runs of the
+        # repository build one at a time.
+        return (
+            f"mkdir -p {cache_dir}/cargo-target\n"
+            f"[ -e target ] || ln -s {cache_dir}/cargo-target target\n"
+            "if command -v sccache > /dev/null 2>&1; then\n"
+            f"  mkdir -p {cache_dir}/sccache\n"
+            f'  echo "SCCACHE_DIR={cache_dir}/sccache" >> "$GITHUB_ENV"\n'
+            '  echo "RUSTC_WRAPPER=sccache" >> "$GITHUB_ENV"\n'
+            # sccache does not cache incremental builds
+            '  echo "CARGO_INCREMENTAL=0" >> "$GITHUB_ENV"\n'
+            "fi\n"
+        )
+
     def get_test_results(self, repo_path) -> List[TestCase]:
         parser = JUnitXMLParser()
         return parser.get_test_results(str(Path(repo_path, "results.xml")))
@@ -0,0 +1,161 @@
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from gitbugactions.actions.workflow import GitHubWorkflow
+
+
+class StepTimer:
+    """
+    Measures the time of each job and step of a run from the output of act,
+    while the run executes. A step lasts from its ``⭐ Run`` line to its
+    ``✅ Success`` or ``❌ Failure`` line and a job from its first line to its
+    ``🏁 Job`` line.
+
+    Each step is classified by what it does, so the time of the runs can be
+    split into:
+        - runner: set up and completion of the jobs by act.
+        - setup: actions (e.g. actions/checkout and actions/setup-java).
+        - dependencies: commands that install the dependencies.
+        - build: commands that build the project.
+        - test: test commands (see ``GitHubWorkflow._is_test_command``).
+        - other: the remaining commands.
+    """
+
+    __JOB = r"^\[(?P<job>[^\]]+)\]\s+"
+    __START_PATTERN = re.compile(
+        __JOB + r"⭐\s+Run\s+(?:(?P<stage>Pre|Main|Post)\s+)?(?P<step>.+?)\s*$"
+    )
+    # Recent versions of act add the duration of the step
+    __END_PATTERN = re.compile(
+        __JOB
+        + r"(?:✅|❌)\s+(?P<status>Success|Failure)\s+-\s+"
+        + r"(?:(?P<stage>Pre|Main|Post)\s+)?(?P<step>.+?)(?:\s+\[\d[^\]]*\])?\s*$"
+    )
+    __JOB_END_PATTERN = re.compile(__JOB + r"🏁\s+Job\s+(?P<status>succeeded|failed)")
+    __JOB_PATTERN = re.compile(__JOB)
+    __DEPENDENCIES_PATTERN = re.compile(
+        r"\b(install|ci|restore|dependencies|deps|dependency:\S+|fetch|download|sync|bundle)\b",
+        re.IGNORECASE,
+    )
+    __BUILD_PATTERN = re.compile(
+        r"\b(build|compile|assemble|package|make|cmake|tsc)\b", re.IGNORECASE
+    )
+
+    def __init__(self, workflow: GitHubWorkflow):
+        self.workflow = workflow
+        # Finished steps, in the order they finished
+        self.steps: List[Dict[str, Any]] = []
+        self.jobs: Dict[str, float] = {}
+        self.__lock = threading.Lock()
+        self.__running_steps: Dict[Tuple[str, str, Optional[str]], float] = {}
+        self.__running_jobs: Dict[str, float] = {}
+
+    def __find_step(self, name: str) -> Optional[Dict]:
+        jobs = self.workflow.doc.get("jobs")
+        if not isinstance(jobs, dict):
+            return None
+        for job in jobs.values():
+            if not isinstance(job, dict) or not isinstance(job.get("steps"), list):
+                continue
+            for step in job["steps"]:
+                if not isinstance(step, dict):
+                    continue
+                if step.get("name") == name or step.get("uses") == name:
+                    return step
+                # act names unnamed steps after their command, which may have
+                # several lines
+                if (
+                    "name" not in step
+                    and isinstance(step.get("run"), str)
+                    and len(step["run"].strip()) > 0
+                    and name.startswith(step["run"].strip().splitlines()[0].strip())
+                ):
+                    return step
+        return None
+
+    def get_category(self, name: str, stage: Optional[str] = None) -> str:
+        """
+        Returns the category of a step from its name in the output of act.
+        """
+        if stage is None and name in ("Set up job", "Complete job"):
+            return "runner"
+        step = self.__find_step(name)
+        if step is not None and "uses" in step:
+            return "setup"
+        command = name
+        if step is not None and isinstance(step.get("run"), str):
+            command = step["run"]
+        if self.workflow._is_test_command(command):
+            return "test"
+        if StepTimer.__DEPENDENCIES_PATTERN.search(command):
+            return "dependencies"
+        if StepTimer.__BUILD_PATTERN.search(command):
+            return "build"
+        return "other"
+
+    def __add_step(
+        self,
+        job: str,
+        name: str,
+        stage: Optional[str],
+        status: Optional[str],
+        elapsed_time: float,
+    ):
+        self.steps.append(
+            {
+                "job": job,
+                "step": name,
+                "stage": stage,
+                "category": self.get_category(name, stage),
+                "status": status,
+                "elapsed_time": elapsed_time,
+            }
+        )
+
+    def hook(self, stream: str, line: str):
+        line = line.rstrip("\r\n")
+        match = StepTimer.__JOB_PATTERN.match(line)
+        if match is None:
+            return
+        job = match.group("job")
+        now = time.time()
+        with self.__lock:
+            # act cleans up the containers after the end of the jobs
+            if job not in self.jobs:
+                self.__running_jobs.setdefault(job, now)
+
+            match = StepTimer.__START_PATTERN.match(line)
+            if match is not None:
+                self.__running_steps[
+                    (job, match.group("step"), match.group("stage"))
+                ] = now
+                return
+
+            match = StepTimer.__END_PATTERN.match(line)
+            if match is not None:
+                step, stage = match.group("step"), match.group("stage")
+                start = self.__running_steps.pop((job, step, stage), None)
+                if start is not None:
+                    status = match.group("status").lower()
+                    self.__add_step(job, step, stage, status, now - start)
+                return
+
+            match = StepTimer.__JOB_END_PATTERN.match(line)
+            if match is not None:
+                self.jobs[job] = now - self.__running_jobs.pop(job, now)
+
+    def finish(self):
+        """
+        Records the steps and jobs that did not finish (e.g. when the run timed
+        out) with the time until now and no status.
+        """
+        now = time.time()
+        with self.__lock:
+            for (job, step, stage), start in self.__running_steps.items():
+                self.__add_step(job, step, stage, None, now - start)
+            self.__running_steps = {}
+            for job, start in self.__running_jobs.items():
+                self.jobs[job] = now - start
+            self.__running_jobs = {}
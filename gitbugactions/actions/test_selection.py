@@ -0,0 +1,52 @@
+import os
+from typing import Any, Dict, Iterable, List
+
+from unidiff import PatchSet
+
+
+class TestSelection:
+    """
+    Tests selected for a run: the test files added or modified by the test patch
+    of a bug-fix. Each workflow turns the selection into the filters of its test
+    runner (see ``GitHubWorkflow.instrument_test_selection``).
+    """
+
+    # Not a test class (avoids pytest collection warnings)
+    __test__ = False
+
+    def __init__(self, files: List[str]):
+        """
+        Args:
+            files (List[str]): Paths of the test files relative to the root of
+                the repository.
+        """
+        self.files: List[str] = sorted(set(files))
+
+    @staticmethod
+    def from_patch(patch: PatchSet) -> "TestSelection":
+        return TestSelection([file.path for file in patch if not file.is_removed_file])
+
+    def get_files(self, extensions: Iterable[str]) -> List[str]:
+        """
+        Returns the selected files with one of the extensions (e.g. ".py").
+        """
+        return [file for file in self.files if os.path.splitext(file)[1] in extensions]
+
+    def get_names(self, extensions: Iterable[str]) -> List[str]:
+        """
+        Returns the names without extension of the selected files with one of the
+        extensions (e.g. the test classes of Java files).
+        """
+        return sorted(
+            set(
+                os.path.splitext(os.path.basename(file))[0]
+                for file in self.get_files(extensions)
+            )
+        )
+
+    def asdict(self) -> Dict[str, Any]:
+        return {"files": self.files}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "TestSelection":
+        return TestSelection(data["files"])
@@ -0,0 +1,157 @@
+import logging
+import math
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+
+class TimeoutEstimator:
+    """
+    Estimates the timeout of the act runs of each repository from the duration
+    of its previous runs, instead of using the same timeout for every
+    repository. The timeout of a repository is a percentile of the durations
+    of its runs with a margin, rounded up to whole minutes and limited to
+    ``[min_timeout, max_timeout]``. Repositories with fewer than
+    ``min_samples`` runs use ``default_timeout``.
+
+    Runs that timed out are not recorded, since their duration only tells
+    that the run needed more time.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        margin: float = 1.5,
+        min_timeout: int = 2,
+        max_timeout: int = 60,
+        default_timeout: int = 10,
+        min_samples: int = 1,
+        max_samples: int = 50,
+    ):
+        """
+        Args:
+            percentile (float): Percentile (0-100) of the durations of the
+                previous runs used as the base of the timeout.
+            margin (float): Multiplier of the percentile.
+            min_timeout (int): Minimum timeout in minutes.
+            max_timeout (int): Maximum timeout in minutes.
+            default_timeout (int): Timeout in minutes of the repositories
+                without enough runs.
+            min_samples (int): Minimum number of runs of a repository for its
+                timeout to be estimated.
+            max_samples (int): Number of the most recent runs kept for each
+                repository.
+        """
+        self.percentile = percentile
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.default_timeout = default_timeout
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.__lock = threading.Lock()
+        self.__durations: Dict[str, List[float]] = {}
+
+    def record(self, repo: str, elapsed_time: Optional[float]):
+        """
+        Records the duration (in seconds) of a run of the repository.
+        """
+        if not elapsed_time or elapsed_time <= 0:
+            return
+        with self.__lock:
+            durations = self.__durations.setdefault(repo, [])
+            durations.append(elapsed_time)
+            del durations[: -self.max_samples]
+
+    def load_history(self, entries: List[Dict]):
+        """
+        Records the durations of previous runs, e.g. the entries of the ledger
+        of a run store (``RunStore.query()``). Each entry records its longest
+        workflow, since the timeout applies to each workflow.
+        """
+        for entry in entries:
+            if "repo" not in entry or entry.get("timed_out", False):
+                continue
+            self.record(
+                entry["repo"],
+                entry.get("max_elapsed_time", entry.get("elapsed_time")),
+            )
+
+    def get_percentile(self, repo: str) -> Optional[float]:
+        """
+        Returns the percentile of the durations of the runs of the repository
+        or None if it does not have enough runs.
+        """
+        with self.__lock:
+            durations = sorted(self.__durations.get(repo, []))
+        if len(durations) == 0 or len(durations) < self.min_samples:
+            return None
+        # Linear interpolation between the closest ranks
+        rank = (len(durations) - 1) * self.percentile / 100
+        lower, upper = math.floor(rank), math.ceil(rank)
+        return durations[lower] + (durations[upper] - durations[lower]) * (rank - lower)
+
+    def get_timeout(self, repo: str) -> int:
+        """
+        Returns the timeout in minutes of the runs of the repository.
+        """
+        percentile = self.get_percentile(repo)
+        if percentile is None:
+            return self.default_timeout
+        timeout = math.ceil(percentile * self.margin / 60)
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+
+class IdleWatchdog:
+    """
+    Calls a function when a run does not write any output for longer than the
+    idle timeout (e.g. when a test hangs). ``hook`` must be called with each
+    line of the output of the run. The idle timeout must be longer than the
+    silent steps of the runs, e.g. the pulls of large images.
+    """
+
+    def __init__(self, idle_timeout: float, on_idle: Callable[[], None]):
+        """
+        Args:
+            idle_timeout (float): Seconds without output after which the run is
+                considered idle.
+            on_idle (Callable[[], None]): Function called once when the run is
+                considered idle.
+        """
+        self.idle_timeout = idle_timeout
+        self.on_idle = on_idle
+        self.idle = False
+        self.__last_output = time.monotonic()
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def hook(self, stream: str, line: str):
+        self.__last_output = time.monotonic()
+
+    def __watch(self):
+        interval = min(max(self.idle_timeout / 10, 0.1), 5)
+        while not self.__stop.wait(interval):
+            idle_time = time.monotonic() - self.__last_output
+            if idle_time < self.idle_timeout:
+                continue
+            self.idle = True
+            logging.warning(f"No output for {idle_time:.0f}s, stopping the run")
+            try:
+                self.on_idle()
+            except Exception:
+                logging.error(
+                    f"Error while stopping an idle run: {traceback.format_exc()}"
+                )
+            return
+
+    def start(self):
+        self.__last_output = time.monotonic()
+        self.__thread = threading.Thread(target=self.__watch, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
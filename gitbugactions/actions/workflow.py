@@ -1,11 +1,13 @@
 import logging
+import re
 from abc import ABC, abstractmethod
-from typing import List, Set
+from typing import Callable, List, Optional, Set
 
 import yaml
 from junitparser import TestCase
 
 from gitbugactions.actions.action import Action
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.github_api import GithubToken
 
 
@@ -26,6 +28,8 @@ class GitHubWorkflow(ABC):
         "ubuntu-20.04",
         "ubuntu-18.04",
     ]
+    CLEAN_WORKSPACE_STEP = "gitbug-actions clean workspace"
+    BUILD_CACHE_STEP = "gitbug-actions enable build cache"
 
     def __init__(self, path: str, workflow: str = ""):
         try:
@@ -42,6 +46,8 @@ class GitHubWorkflow(ABC):
             self.doc = []
         self.path = path
         self.tokens: List[GithubToken] = []
+        # Whether the test commands only run the tests of a TestSelection
+        self.test_selection_applied = False
 
     @abstractmethod
     def _is_test_command(self, command) -> bool:
@@ -73,20 +79,18 @@ class GitHubWorkflow(ABC):
             return False
 
     def get_actions(self) -> Set[Action]:
+        """
+        Gets the actions used by the steps of the workflow and the reusable
+        workflows called by its jobs.
+        """
         actions: Set[Action] = set()
-        if "jobs" in self.doc and isinstance(self.doc["jobs"], dict):
-            for _, job in self.doc["jobs"].items():
-                if "steps" in job and isinstance(job["steps"], list):
-                    for step in job["steps"]:
-                        if "uses" in step:
-                            try:
-                                action = Action(step["uses"])
-                            except Exception:
-                                logging.warning(
-                                    f"Failed to parse action {step['uses']}"
-                                )
-                                continue
-                            actions.add(action)
+        for declaration in Action.get_uses(self.doc):
+            try:
+                action = Action(declaration)
+            except Exception:
+                logging.warning(f"Failed to parse action {declaration}")
+                continue
+            actions.add(action)
 
         return actions
 
@@ -238,6 +242,74 @@ class GitHubWorkflow(ABC):
                         filtered_steps.append(step)
                     job["steps"] = filtered_steps
 
+    def instrument_clean_workspace(self):
+        """
+        Adds a step at the beginning of each job that removes the files that are
+        not in the git index of the repository. Used when the containers are
+        reused between runs, so that files from previous runs (e.g. deleted
+        source files or old test reports) do not affect the current run.
+        Dependencies installed in the workspace (node_modules) are kept.
+        """
+        clean_step = {
+            "name": GitHubWorkflow.CLEAN_WORKSPACE_STEP,
+            "run": "git clean -ffdx -e node_modules || :",
+            "shell": "bash",
+            "working-directory": "${{ github.workspace }}",
+        }
+        if "jobs" in self.doc and isinstance(self.doc["jobs"], dict):
+            for _, job in self.doc["jobs"].items():
+                if "steps" not in job or not isinstance(job["steps"], list):
+                    continue
+                if (
+                    len(job["steps"]) > 0
+                    and isinstance(job["steps"][0], dict)
+                    and job["steps"][0].get("name")
+                    == GitHubWorkflow.CLEAN_WORKSPACE_STEP
+                ):
+                    continue
+                job["steps"].insert(0, dict(clean_step))
+
+    def _get_build_cache_script(self, cache_dir: str) -> Optional[str]:
+        """
+        Returns the commands that point the build tool of the workflow to the
+        build cache in ``cache_dir`` or None if the build tool has no cache.
+        The commands can set environment variables for the next steps through
+        ``$GITHUB_ENV``.
+        """
+        return None
+
+    def instrument_build_cache(self, cache_dir: str) -> bool:
+        """
+        Adds a step at the beginning of each job that enables the build cache
+        of the build tool (e.g. ccache or the Gradle build cache) in
+        ``cache_dir``. The cache dir is shared by the runs of the repository,
+        so the builds of neighbouring commits reuse the compiled objects.
+
+        Returns:
+            bool: True if the build tool of the workflow has a build cache.
+        """
+        script = self._get_build_cache_script(cache_dir)
+        if script is None:
+            return False
+
+        build_cache_step = {
+            "name": GitHubWorkflow.BUILD_CACHE_STEP,
+            "run": script,
+            "shell": "bash",
+        }
+        if "jobs" in self.doc and isinstance(self.doc["jobs"], dict):
+            for _, job in self.doc["jobs"].items():
+                if "steps" not in job or not isinstance(job["steps"], list):
+                    continue
+                if any(
+                    isinstance(step, dict)
+                    and step.get("name") == GitHubWorkflow.BUILD_CACHE_STEP
+                    for step in job["steps"]
+                ):
+                    continue
+                job["steps"].insert(0, dict(build_cache_step))
+        return True
+
     def get_jobs(self) -> List[str]:
         """
         Gets the jobs from the workflow.
@@ -347,6 +419,75 @@ class GitHubWorkflow(ABC):
         """
         pass
 
+    def instrument_test_selection(
+        self, selection: TestSelection, repo_path: str
+    ) -> bool:
+        """
+        Instruments the test commands to run only the selected tests. Must be
+        called after ``instrument_test_steps``. Workflows whose test runners do
+        not support filters keep running the full suite.
+
+        Args:
+            selection (TestSelection): Tests to run.
+            repo_path (str): Path of the repository, with the selected files.
+
+        Returns:
+            bool: True if the test commands were instrumented.
+        """
+        return False
+
+    def has_no_selected_tests(self, output: str) -> bool:
+        """
+        Returns True if the test runner reports in the output of a run that no
+        tests match the filters of ``instrument_test_selection``. Runs without
+        tests for other reasons (e.g. compilation errors) return False.
+        """
+        return False
+
+    def _instrument_test_commands(self, instrument: Callable[[str], str]) -> bool:
+        """
+        Replaces each line of the test steps that has a test command by the result
+        of ``instrument``. Steps with a working directory are skipped, because the
+        paths of the selected tests are relative to the root of the repository.
+
+        Returns:
+            bool: True if any test command was changed.
+        """
+        if "jobs" not in self.doc or not isinstance(self.doc["jobs"], dict):
+            return False
+
+        changed = False
+        for _, job in self.doc["jobs"].items():
+            if "steps" not in job or not isinstance(job["steps"], list):
+                continue
+            for step in job["steps"]:
+                if (
+                    not isinstance(step, dict)
+                    or "run" not in step
+                    or "working-directory" in step
+                    or not self._is_test_command(step["run"])
+                ):
+                    continue
+                lines = step["run"].split("\n")
+                for i, line in enumerate(lines):
+                    if self._is_test_command(line):
+                        lines[i] = instrument(line)
+                new_run = "\n".join(lines)
+                if new_run != step["run"]:
+                    step["run"] = new_run
+                    changed = True
+
+        if changed:
+            self.test_selection_applied = True
+        return changed
+
+    @staticmethod
+    def _add_arguments(line: str, pattern: str, args: str) -> str:
+        """
+        Adds the arguments after the first match of the pattern in the line.
+        """
+        return re.sub(pattern, lambda match: f"{match.group(0)} {args}", line, count=1)
+
     @abstractmethod
     def get_test_results(self, repo_path) -> List[TestCase]:
         """
@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import uuid
 from enum import Enum
 from typing import Any, Dict, List, Optional, Set
@@ -9,8 +10,10 @@ from unidiff import PatchSet
 
 from gitbugactions.actions.action import Action
 from gitbugactions.actions.actions import ActTestsRun
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.github_api import GithubAPI
 from gitbugactions.test_executor import TestExecutor
+from gitbugactions.utils.blob_store import BlobStore
 from gitbugactions.utils.file_utils import get_patch_file_extensions
 from gitbugactions.utils.repo_state_manager import RepoStateManager
 
@@ -80,9 +83,12 @@ class BugPatch:
         self.change_type: ChangeType = ChangeType.get_change_type(
             self.bug_patch, self.non_code_patch
         )
+        self.fingerprint: str = self.__compute_fingerprint()
         self.actions: Set[Action] = actions
         self.strategy_used: str = "UNKNOWN"
         self.issues = None
+        # If set, the phases with the test patch only run the tests it selects
+        self.test_selection: Optional[TestSelection] = None
         # The actions are grouped by each phase of the strategy used
         self.actions_runs: List[List[ActTestsRun]] = []
 
@@ -124,7 +130,12 @@ class BugPatch:
             and len(self.__flat_failed_tests(self.actions_runs[0])) > 0
         )
 
-    def get_data(self):
+    def get_data(self, blob_store: Optional[BlobStore] = None):
+        """
+        Args:
+            blob_store (BlobStore): If set, the outputs of the runs are written
+                to the store and replaced by references.
+        """
         actions_runs = []
 
         for runs in self.actions_runs:
@@ -134,7 +145,7 @@ class BugPatch:
             runs_data = []
 
             for run in runs:
-                runs_data.append(run.asdict())
+                runs_data.append(run.asdict(blob_store))
             actions_runs.append(runs_data)
 
         return {
@@ -157,9 +168,15 @@ class BugPatch:
             "non_code_patch": str(self.non_code_patch),
             "non_code_patch_file_extensions": self.non_code_patch_file_extensions,
             "change_type": self.change_type.name,
+            "fingerprint": self.fingerprint,
             "actions_runs": actions_runs,
             "strategy": self.strategy_used,
             "issues": self.issues,
+            "test_selection": (
+                self.test_selection.asdict()
+                if self.test_selection is not None
+                else None
+            ),
         }
 
     def __clean_patch(self, patch: PatchSet) -> PatchSet:
@@ -237,7 +254,7 @@ class BugPatch:
             return None
         if not self.__apply_test_patch(executor.repo_clone):
             return None
-        return executor.run_tests(offline=offline, keep_containers=keep_containers)
+        return self.__run_selected_tests(executor, offline, keep_containers)
 
     def test_current_commit(
         self,
@@ -250,14 +267,32 @@ class BugPatch:
         RepoStateManager.clean_act_result_dir(executor.repo_clone.workdir)
 
         self.__set_commit(executor.repo_clone, self.commit)
-        return executor.run_tests(offline=offline, keep_containers=keep_containers)
+        return self.__run_selected_tests(executor, offline, keep_containers)
+
+    def __run_selected_tests(
+        self, executor: TestExecutor, offline: bool, keep_containers: bool
+    ) -> Optional[List[ActTestsRun]]:
+        act_runs = executor.run_tests(
+            offline=offline,
+            keep_containers=keep_containers,
+            test_selection=self.test_selection,
+        )
+        if (
+            self.test_selection is not None
+            and act_runs is not None
+            and not any(act_run.workflow.test_selection_applied for act_run in act_runs)
+        ):
+            # The full suite was run (see TestExecutor.run_tests), so the
+            # strategies must check the number of tests of the runs
+            self.test_selection = None
+        return act_runs
 
     @staticmethod
     def from_dict(bug: Dict[str, Any], repo_clone: pygit2.Repository) -> "BugPatch":
         github = GithubAPI()
         repo_full_name = bug["repository"]
 
-        return BugPatch(
+        bug_patch = BugPatch(
             github.get_repo(repo_full_name),
             repo_clone.revparse_single(bug["commit_hash"]),
             repo_clone.revparse_single(bug["previous_commit_hash"]),
@@ -266,31 +301,36 @@ class BugPatch:
             PatchSet(bug["non_code_patch"]),
             set(),
         )
+        # The bug must be reproduced with the tests used to collect it
+        if bug.get("test_selection") is not None:
+            bug_patch.test_selection = TestSelection.from_dict(bug["test_selection"])
+        return bug_patch
 
-    def __remove_patch_index(self, patch: PatchSet) -> str:
+    @staticmethod
+    def __remove_patch_index(patch: PatchSet) -> str:
         lines = str(patch).split("\n")
         return "\n".join(list(filter(lambda line: not line.startswith("index"), lines)))
 
+    def __compute_fingerprint(self) -> str:
+        """
+        Computes a canonical SHA-256 fingerprint of the patches. The index lines
+        are removed so that the same change applied to different blobs (e.g. in
+        forks and mirrors) results in the same fingerprint.
+        """
+        digest = hashlib.sha256()
+        for patch in (self.bug_patch, self.test_patch, self.non_code_patch):
+            digest.update(BugPatch.__remove_patch_index(patch).encode("utf-8"))
+            # Separator to avoid collisions between the different patches
+            digest.update(b"\0")
+        return digest.hexdigest()
+
     def __hash__(self):
-        return hash(
-            (
-                self.__remove_patch_index(self.bug_patch),
-                self.__remove_patch_index(self.test_patch),
-                self.__remove_patch_index(self.non_code_patch),
-            )
-        )
+        return hash(self.fingerprint)
 
     def __eq__(self, __value: object) -> bool:
         if not isinstance(__value, BugPatch):
             return False
-        return (
-            self.__remove_patch_index(self.bug_patch)
-            == self.__remove_patch_index(__value.bug_patch)
-            and self.__remove_patch_index(self.test_patch)
-            == self.__remove_patch_index(__value.test_patch)
-            and self.__remove_patch_index(self.non_code_patch)
-            == self.__remove_patch_index(__value.non_code_patch)
-        )
+        return self.fingerprint == __value.fingerprint
 
     def __ne__(self, __value: object) -> bool:
         return not self.__eq__(__value)
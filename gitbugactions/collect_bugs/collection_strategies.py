@@ -1,10 +1,44 @@
 from abc import ABC, abstractmethod
-from typing import List
+from enum import Enum, IntEnum
+from typing import Dict, List, Optional
 
 from gitbugactions.actions.actions import ActTestsRun
 from gitbugactions.collect_bugs.bug_patch import BugPatch
 
 
+class Phase(IntEnum):
+    """
+    Phases run to test a bug-fix (indexes of ``BugPatch.actions_runs``).
+    """
+
+    PREVIOUS_COMMIT = 0
+    PREVIOUS_COMMIT_WITH_DIFF = 1
+    CURRENT_COMMIT = 2
+
+
+class PhaseOutcome(Enum):
+    """
+    Outcomes of a phase required by the strategies.
+    """
+
+    # All the tests passed
+    PASSED = 0
+    # At least one test failed
+    FAILED = 1
+    # At least one test failed or one of the runs failed
+    BROKEN = 2
+
+    def matches(self, runs: Optional[List[ActTestsRun]]) -> bool:
+        if runs is None:
+            return False
+        failed_tests = sum(len(act_run.failed_tests) for act_run in runs)
+        if self == PhaseOutcome.PASSED:
+            return failed_tests == 0
+        elif self == PhaseOutcome.FAILED:
+            return failed_tests > 0
+        return failed_tests > 0 or any(act_run.failed for act_run in runs)
+
+
 class CollectionStrategy(ABC):
     @staticmethod
     def _diff_tests(run_failed: List[ActTestsRun], run_passed: List[ActTestsRun]):
@@ -43,6 +77,17 @@ class CollectionStrategy(ABC):
     def check(self, bug_patch: BugPatch) -> bool:
         pass
 
+    @abstractmethod
+    def get_requirements(self, bug_patch: BugPatch) -> List[Dict[Phase, PhaseOutcome]]:
+        """
+        Returns the phase outcomes the strategy needs to accept the bug-fix. Each
+        element is an alternative (e.g. a branch of an "or" in ``check``) with
+        the outcome needed from each of its phases. The outcomes are necessary,
+        not sufficient, conditions of ``check``. They are used to skip the phases
+        that can no longer change the strategy used (see ``PhasePlanner``).
+        """
+        pass
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -53,6 +98,9 @@ class UnknownStrategy(CollectionStrategy):
     def check(self, bug_patch: BugPatch) -> bool:
         return False
 
+    def get_requirements(self, bug_patch: BugPatch) -> List[Dict[Phase, PhaseOutcome]]:
+        return []
+
     @property
     def name(self) -> str:
         return "UNKNOWN"
@@ -79,13 +127,30 @@ class PassPassStrategy(CollectionStrategy):
                 bug_patch.actions_runs[1], bug_patch.actions_runs[2]
             )
             # previous commit should have at least the same number of tests than current commit
-            and CollectionStrategy._number_of_tests(bug_patch.actions_runs[0])
-            <= CollectionStrategy._number_of_tests(bug_patch.actions_runs[2])
+            # (unless the current commit only ran the tests selected by the test patch)
+            and (
+                bug_patch.test_selection is not None
+                or CollectionStrategy._number_of_tests(bug_patch.actions_runs[0])
+                <= CollectionStrategy._number_of_tests(bug_patch.actions_runs[2])
+            )
             # current commit should have same number of tests as previous commit w/ tests
             and CollectionStrategy._number_of_tests(bug_patch.actions_runs[2])
             == CollectionStrategy._number_of_tests(bug_patch.actions_runs[1])
         )
 
+    def get_requirements(self, bug_patch: BugPatch) -> List[Dict[Phase, PhaseOutcome]]:
+        if len(bug_patch.test_patch) == 0 or (
+            bug_patch.test_patch.removed > 0 and bug_patch.test_patch.added == 0
+        ):
+            return []
+        return [
+            {
+                Phase.PREVIOUS_COMMIT: PhaseOutcome.PASSED,
+                Phase.PREVIOUS_COMMIT_WITH_DIFF: PhaseOutcome.FAILED,
+                Phase.CURRENT_COMMIT: PhaseOutcome.PASSED,
+            }
+        ]
+
     @property
     def name(self) -> str:
         return "PASS_PASS"
@@ -109,6 +174,16 @@ class FailPassStrategy(CollectionStrategy):
             == CollectionStrategy._number_of_tests(bug_patch.actions_runs[2])
         )
 
+    def get_requirements(self, bug_patch: BugPatch) -> List[Dict[Phase, PhaseOutcome]]:
+        if len(bug_patch.test_patch) > 0:
+            return []
+        return [
+            {
+                Phase.PREVIOUS_COMMIT: PhaseOutcome.FAILED,
+                Phase.CURRENT_COMMIT: PhaseOutcome.PASSED,
+            }
+        ]
+
     @property
     def name(self) -> str:
         return "FAIL_PASS"
@@ -148,6 +223,22 @@ class FailFailStrategy(CollectionStrategy):
             == CollectionStrategy._number_of_tests(bug_patch.actions_runs[2])
         )
 
+    def get_requirements(self, bug_patch: BugPatch) -> List[Dict[Phase, PhaseOutcome]]:
+        requirements = [
+            {
+                Phase.PREVIOUS_COMMIT: PhaseOutcome.FAILED,
+                Phase.CURRENT_COMMIT: PhaseOutcome.FAILED,
+            }
+        ]
+        if len(bug_patch.test_patch) > 0:
+            requirements.append(
+                {
+                    Phase.PREVIOUS_COMMIT_WITH_DIFF: PhaseOutcome.FAILED,
+                    Phase.CURRENT_COMMIT: PhaseOutcome.FAILED,
+                }
+            )
+        return requirements
+
     @property
     def name(self) -> str:
         return "FAIL_FAIL"
@@ -181,6 +272,22 @@ class FailPassBuildStrategy(CollectionStrategy):
             and bug_patch.curr_commit_passed
         )
 
+    def get_requirements(self, bug_patch: BugPatch) -> List[Dict[Phase, PhaseOutcome]]:
+        requirements = [
+            {
+                Phase.PREVIOUS_COMMIT: PhaseOutcome.BROKEN,
+                Phase.CURRENT_COMMIT: PhaseOutcome.PASSED,
+            }
+        ]
+        if len(bug_patch.test_patch) > 0:
+            requirements.append(
+                {
+                    Phase.PREVIOUS_COMMIT_WITH_DIFF: PhaseOutcome.BROKEN,
+                    Phase.CURRENT_COMMIT: PhaseOutcome.PASSED,
+                }
+            )
+        return requirements
+
     @property
     def name(self) -> str:
         return "FAIL_PASS_BUILD"
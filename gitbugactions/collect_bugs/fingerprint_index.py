@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from gitbugactions.collect_bugs.bug_patch import BugPatch
+
+
+class FingerprintIndex:
+    """
+    On-disk index of the fingerprints of the patches that were already tested.
+    The index is shared across repositories and runs, so that identical fixes
+    (e.g. the ones found in forks and mirrors) are only tested once.
+
+    The index is stored as a JSONL file where each line has the fingerprint of
+    the patch and the repository and commit where it was first found.
+
+    The patches are claimed when they are scanned (``claim``), so identical
+    patches of the same run are skipped, but they are only written to the
+    index once they are tested (``add``). Patches whose test does not finish
+    (e.g. crashes, interruptions or patches dropped by the scheduler) are
+    tested again in later runs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.fingerprints: Dict[str, Dict[str, str]] = {}
+        # Patches claimed in this run that are not indexed yet
+        self.claimed: Dict[str, Dict[str, str]] = {}
+
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    if len(line.strip()) == 0:
+                        continue
+                    entry = json.loads(line)
+                    self.fingerprints.setdefault(entry["fingerprint"], entry)
+        elif os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @staticmethod
+    def __get_entry(bug_patch: BugPatch) -> Dict[str, str]:
+        return {
+            "fingerprint": bug_patch.fingerprint,
+            "repository": bug_patch.repo.full_name,
+            "commit_hash": bug_patch.commit,
+        }
+
+    def __contains__(self, bug_patch: BugPatch) -> bool:
+        with self.lock:
+            return bug_patch.fingerprint in self.fingerprints
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.fingerprints)
+
+    def get(self, bug_patch: BugPatch) -> Optional[Dict[str, str]]:
+        """
+        Returns the entry of the patch with the same fingerprint, if any. The
+        patches claimed in this run are also returned.
+        """
+        with self.lock:
+            return self.fingerprints.get(
+                bug_patch.fingerprint, self.claimed.get(bug_patch.fingerprint)
+            )
+
+    def claim(self, bug_patch: BugPatch) -> bool:
+        """
+        Claims the patch for testing in this run. The claim is only kept in
+        memory until the patch is added or released.
+
+        Returns:
+            bool: False if a patch with the same fingerprint was already indexed
+                or claimed.
+        """
+        with self.lock:
+            if (
+                bug_patch.fingerprint in self.fingerprints
+                or bug_patch.fingerprint in self.claimed
+            ):
+                return False
+            self.claimed[bug_patch.fingerprint] = FingerprintIndex.__get_entry(
+                bug_patch
+            )
+            return True
+
+    def release(self, bug_patch: BugPatch):
+        """
+        Releases the claim of a patch whose test did not finish, so that an
+        identical patch can be tested.
+        """
+        with self.lock:
+            entry = self.claimed.get(bug_patch.fingerprint)
+            if entry is not None and entry["commit_hash"] == bug_patch.commit:
+                del self.claimed[bug_patch.fingerprint]
+
+    def add(self, bug_patch: BugPatch) -> bool:
+        """
+        Adds the fingerprint of a tested patch to the index.
+
+        Returns:
+            bool: False if a patch with the same fingerprint was already indexed.
+        """
+        with self.lock:
+            self.claimed.pop(bug_patch.fingerprint, None)
+            if bug_patch.fingerprint in self.fingerprints:
+                return False
+
+            entry = FingerprintIndex.__get_entry(bug_patch)
+            self.fingerprints[bug_patch.fingerprint] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            return True
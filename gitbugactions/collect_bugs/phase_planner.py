@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional, Set
+
+from gitbugactions.actions.actions import ActTestsRun
+from gitbugactions.collect_bugs.bug_patch import BugPatch
+from gitbugactions.collect_bugs.collection_strategies import (
+    CollectionStrategy,
+    Phase,
+    PhaseOutcome,
+)
+
+
+class PhasePlanner:
+    """
+    Plans the phases run to test a bug-fix. Each strategy declares the phase
+    outcomes it needs (``CollectionStrategy.get_requirements``), so the planner
+    only runs the phases that can still change the strategy used to accept the
+    bug-fix, and stops as soon as the strategy is known.
+
+    The strategies are checked in order, as in ``PatchCollector.check_runs``: the
+    strategy used is the first one whose check passes, so the phases needed only
+    by the strategies after a passing one are not run.
+
+    The runs of the skipped phases are None in ``BugPatch.actions_runs``, so the
+    consumers of the bug-fixes (e.g. ``filter_bug``) must skip them too.
+    """
+
+    # Every strategy needs the current commit, so it is run first. The previous
+    # commit with the test patch is run before the previous commit because
+    # PASS_PASS needs it to fail, which is the least common outcome.
+    PRIORITY = (
+        Phase.CURRENT_COMMIT,
+        Phase.PREVIOUS_COMMIT_WITH_DIFF,
+        Phase.PREVIOUS_COMMIT,
+    )
+
+    def __init__(self, bug_patch: BugPatch, strategies: List[CollectionStrategy]):
+        self.bug_patch = bug_patch
+        self.bug_patch.actions_runs = [None] * len(Phase)
+        self.strategies = strategies
+        self.requirements: List[List[Dict[Phase, PhaseOutcome]]] = [
+            strategy.get_requirements(bug_patch) for strategy in strategies
+        ]
+        self.run_phases: List[Phase] = []
+        self.stopped = False
+
+    def __is_possible(self, requirement: Dict[Phase, PhaseOutcome]) -> bool:
+        return all(
+            outcome.matches(self.bug_patch.actions_runs[phase])
+            for phase, outcome in requirement.items()
+            if phase in self.run_phases
+        )
+
+    def get_pending_phases(self) -> Set[Phase]:
+        """
+        Returns the phases that can still change the strategy used.
+        """
+        if self.stopped:
+            return set()
+
+        phases = set()
+        for strategy, requirements in zip(self.strategies, self.requirements):
+            if strategy.check(self.bug_patch):
+                # The strategies after this one are never used
+                break
+            for requirement in requirements:
+                if self.__is_possible(requirement):
+                    phases.update(set(requirement.keys()) - set(self.run_phases))
+        return phases
+
+    def next_phase(self) -> Optional[Phase]:
+        """
+        Returns the next phase to run or None if no more phases are needed.
+        """
+        pending_phases = self.get_pending_phases()
+        for phase in PhasePlanner.PRIORITY:
+            if phase in pending_phases:
+                return phase
+        return None
+
+    def add_runs(self, phase: Phase, act_runs: Optional[List[ActTestsRun]]):
+        """
+        Records the runs of a phase. If every run crashed (or the phase could
+        not be run), no more phases are run.
+        """
+        self.run_phases.append(phase)
+        if act_runs is None or all(act_run.failed for act_run in act_runs):
+            self.stopped = True
+            return
+        self.bug_patch.actions_runs[phase] = act_runs
+
+    @property
+    def skipped_phases(self) -> List[Phase]:
+        return [phase for phase in Phase if phase not in self.run_phases]
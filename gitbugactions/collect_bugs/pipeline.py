@@ -0,0 +1,152 @@
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Any, Callable, Iterable, List, Optional
+
+
+class StageQueue:
+    """
+    FIFO queue that can be closed. ``get`` blocks until an item is available
+    and returns None once the queue is closed and empty.
+    """
+
+    def __init__(self):
+        self.items = deque()
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item: Any):
+        with self.condition:
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self) -> Optional[Any]:
+        with self.condition:
+            while len(self.items) == 0 and not self.closed:
+                self.condition.wait()
+            if len(self.items) == 0:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class PipelineStage:
+    """
+    Stage of a streaming pipeline. Each stage has its own workers which take
+    items from the stage's queue, process them with the handler and forward
+    the results to the next stage. A stage is closed once every stage before
+    it finished, so items flow through the pipeline as soon as they are ready
+    instead of waiting for the whole previous stage.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Optional[Iterable[Any]]],
+        n_workers: int = 1,
+        queue=None,
+    ):
+        """
+        Args:
+            name (str): Name of the stage (used for logging).
+            handler (Callable): Function that processes an item. The items it
+                returns are forwarded to the next stage.
+            n_workers (int): Number of items processed concurrently by the stage.
+            queue: Queue from which the items are taken. It must implement
+                ``put``, ``get`` and ``close`` like ``StageQueue``.
+        """
+        self.name = name
+        self.handler = handler
+        self.n_workers = n_workers
+        self.queue = queue if queue is not None else StageQueue()
+        self.next_stage: Optional["PipelineStage"] = None
+        self.workers: List[threading.Thread] = []
+        self.running_workers = 0
+        self.lock = threading.Lock()
+
+    def connect(self, next_stage: "PipelineStage") -> "PipelineStage":
+        """
+        Connects the output of this stage to the input of ``next_stage``.
+
+        Returns:
+            PipelineStage: The next stage, so that calls can be chained.
+        """
+        self.next_stage = next_stage
+        return next_stage
+
+    def start(self):
+        with self.lock:
+            self.running_workers = self.n_workers
+        for i in range(self.n_workers):
+            worker = threading.Thread(
+                target=self.__work, name=f"{self.name}-{i}", daemon=True
+            )
+            self.workers.append(worker)
+            worker.start()
+
+    def put(self, item: Any):
+        self.queue.put(item)
+
+    def close(self):
+        """
+        Signals that no more items will be added to the stage.
+        """
+        self.queue.close()
+
+    def join(self):
+        for worker in self.workers:
+            worker.join()
+
+    def __work(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+
+                try:
+                    outputs = self.handler(item)
+                except Exception:
+                    logging.error(
+                        f"Error in stage {self.name}: {traceback.format_exc()}"
+                    )
+                    continue
+
+                if outputs is not None and self.next_stage is not None:
+                    for output in outputs:
+                        self.next_stage.put(output)
+        finally:
+            with self.lock:
+                self.running_workers -= 1
+                last_worker = self.running_workers == 0
+            # The next stage is closed when all the workers of this one finish
+            if last_worker and self.next_stage is not None:
+                self.next_stage.close()
+
+
+class Pipeline:
+    """
+    Chain of pipeline stages.
+    """
+
+    def __init__(self, stages: List[PipelineStage]):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.connect(next_stage)
+
+    def run(self, items: Iterable[Any]):
+        """
+        Feeds the items to the first stage and waits for every stage to finish.
+        """
+        for stage in self.stages:
+            stage.start()
+        for item in items:
+            self.stages[0].put(item)
+        self.stages[0].close()
+        for stage in self.stages:
+            stage.join()
@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from gitbugactions.collect_bugs.bug_patch import BugPatch
+
+
+class RepoBudget:
+    """
+    Keeps track of the candidates tested for a repository and of the compute
+    time they used.
+    """
+
+    def __init__(self):
+        self.started: int = 0
+        # Candidates started that are still being tested
+        self.running: int = 0
+        self.tested: int = 0
+        self.found: int = 0
+        self.elapsed_time: float = 0
+        # Heap of (-score, insertion order, candidate)
+        self.pending: List[Tuple[float, int, Tuple]] = []
+
+    @property
+    def yield_rate(self) -> float:
+        # Laplace smoothing so that repos without history start at 0.5
+        return (self.found + 1) / (self.tested + 2)
+
+    @property
+    def reserved_time(self) -> Optional[float]:
+        """
+        Time reserved for the running candidates: the mean time of the tested
+        candidates for each one. None if no candidate was tested yet.
+        """
+        if self.running == 0:
+            return 0
+        if self.tested == 0:
+            return None
+        return self.running * self.elapsed_time / self.tested
+
+
+class CandidateScheduler:
+    """
+    Schedules the candidate bug patches by their expected yield. Candidates are
+    scored with cheap features of the patch and the past yield of the repo, and
+    the candidates with the highest scores are tested first. Once a repo uses
+    up its budget (number of candidates or time), its remaining candidates are
+    dropped.
+
+    The time of the candidates being tested is reserved from the time budget
+    of their repo, so the candidates of a repo are only started while the
+    budget can afford them. Until the first candidate of a repo is tested, its
+    candidates are tested one at a time.
+
+    The scheduler can be used as the queue of a ``PipelineStage``: ``get``
+    blocks until a candidate is available or the scheduler is closed.
+    """
+
+    # Weights of the features used to score the candidates
+    TEST_PATCH_WEIGHT = 1.0
+    DIFF_SIZE_WEIGHT = 0.25
+    FILES_TOUCHED_WEIGHT = 0.25
+    RUNNABLE_WORKFLOW_WEIGHT = 1.0
+    REPO_YIELD_WEIGHT = 2.0
+
+    def __init__(
+        self,
+        max_candidates_per_repo: Optional[int] = None,
+        max_minutes_per_repo: Optional[float] = None,
+    ):
+        """
+        Args:
+            max_candidates_per_repo (int): Maximum number of candidates tested per repo. If None, no limit is applied.
+            max_minutes_per_repo (float): Maximum time in minutes spent testing the candidates of a repo. If None, no limit is applied.
+        """
+        self.max_candidates_per_repo = max_candidates_per_repo
+        self.max_minutes_per_repo = max_minutes_per_repo
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.closed = False
+        self.budgets: Dict[str, RepoBudget] = {}
+        self.counter = itertools.count()
+
+    @staticmethod
+    def score(bug_patch: BugPatch, workflows_since: Optional[str] = None) -> float:
+        """
+        Scores a candidate using static features of the patch.
+
+        Args:
+            bug_patch (BugPatch): Candidate to score.
+            workflows_since (str): ISO timestamp of the first commit with workflows in the repo.
+        """
+        score = 0.0
+        patches = (bug_patch.bug_patch, bug_patch.test_patch, bug_patch.non_code_patch)
+
+        # Commits that change the tests are more likely to reproduce the bug
+        if len(bug_patch.test_patch) > 0:
+            score += CandidateScheduler.TEST_PATCH_WEIGHT
+
+        # Small and focused changes are more likely to be bug-fixes
+        lines_changed = sum(patch.added + patch.removed for patch in patches)
+        score -= CandidateScheduler.DIFF_SIZE_WEIGHT * math.log1p(lines_changed)
+        files_touched = sum(len(patch) for patch in patches)
+        score -= CandidateScheduler.FILES_TOUCHED_WEIGHT * math.log1p(files_touched)
+
+        # The workflows of the repo are more likely to run near the commit date
+        if (
+            workflows_since is not None
+            and bug_patch.commit_timestamp >= workflows_since
+        ):
+            score += CandidateScheduler.RUNNABLE_WORKFLOW_WEIGHT
+
+        return score
+
+    def __over_budget(self, budget: RepoBudget) -> bool:
+        return (
+            self.max_candidates_per_repo is not None
+            and budget.started >= self.max_candidates_per_repo
+        ) or (
+            self.max_minutes_per_repo is not None
+            and budget.elapsed_time >= self.max_minutes_per_repo * 60
+        )
+
+    def __is_waiting(self, budget: RepoBudget) -> bool:
+        """
+        Returns True if the next candidate of the repo must wait for the running
+        ones, because their time may use up the budget.
+        """
+        if self.max_minutes_per_repo is None or budget.running == 0:
+            return False
+        reserved_time = budget.reserved_time
+        return (
+            reserved_time is None
+            or budget.elapsed_time + reserved_time >= self.max_minutes_per_repo * 60
+        )
+
+    def put(self, candidate: Tuple, bug_patch: BugPatch, workflows_since=None):
+        """
+        Adds a candidate to the scheduler.
+
+        Args:
+            candidate (Tuple): Object returned by ``get`` when the candidate is scheduled.
+            bug_patch (BugPatch): Bug patch of the candidate.
+            workflows_since (str): ISO timestamp of the first commit with workflows in the repo.
+        """
+        score = CandidateScheduler.score(bug_patch, workflows_since)
+        with self.lock:
+            budget = self.budgets.setdefault(bug_patch.repo.full_name, RepoBudget())
+            heapq.heappush(budget.pending, (-score, next(self.counter), candidate))
+            self.condition.notify()
+
+    def __pop_best(self) -> Optional[Tuple]:
+        best_repo, best_score = None, -math.inf
+        for repo, budget in self.budgets.items():
+            if len(budget.pending) == 0:
+                continue
+            if self.__over_budget(budget):
+                logging.info(
+                    f"Skipping {len(budget.pending)} candidates from {repo}: budget exhausted"
+                )
+                budget.pending.clear()
+                continue
+            if self.__is_waiting(budget):
+                continue
+
+            score = (
+                -budget.pending[0][0]
+                + CandidateScheduler.REPO_YIELD_WEIGHT * budget.yield_rate
+            )
+            if score > best_score:
+                best_repo, best_score = repo, score
+
+        if best_repo is None:
+            return None
+
+        budget = self.budgets[best_repo]
+        budget.started += 1
+        budget.running += 1
+        return heapq.heappop(budget.pending)[2]
+
+    def get(self, block: bool = True) -> Optional[Tuple]:
+        """
+        Returns the candidate with the highest expected yield.
+
+        Args:
+            block (bool): If True, waits until a candidate is available or the
+                scheduler is closed. Otherwise, returns None if no candidate is
+                available.
+
+        Returns:
+            Optional[Tuple]: The candidate or None if no candidate is left within the budgets.
+        """
+        with self.condition:
+            while True:
+                candidate = self.__pop_best()
+                if candidate is not None or not block:
+                    return candidate
+                # The candidates waiting for running ones are not left behind
+                if self.closed and not any(
+                    len(budget.pending) > 0 for budget in self.budgets.values()
+                ):
+                    return None
+                self.condition.wait()
+
+    def close(self):
+        """
+        Signals that no more candidates will be added.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def done(self, bug_patch: BugPatch, found: bool, elapsed_time: float):
+        """
+        Records the outcome of a tested candidate.
+
+        Args:
+            bug_patch (BugPatch): Bug patch of the candidate.
+            found (bool): Whether the candidate is a bug-fix.
+            elapsed_time (float): Time in seconds spent testing the candidate.
+        """
+        with self.condition:
+            budget = self.budgets.setdefault(bug_patch.repo.full_name, RepoBudget())
+            budget.running = max(budget.running - 1, 0)
+            budget.tested += 1
+            budget.found += int(found)
+            budget.elapsed_time += elapsed_time
+            # The waiting candidates of the repo may be started now
+            self.condition.notify_all()
+
+    def pending(self) -> int:
+        with self.lock:
+            return sum(len(budget.pending) for budget in self.budgets.values())
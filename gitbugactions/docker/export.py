@@ -7,7 +7,7 @@ import tempfile
 import uuid
 import fnmatch
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
 from docker.models.containers import Container
 from docker.models.images import Image
@@ -330,7 +330,12 @@ def apply_diff(container_id: str, diff_file_path: str):
     shutil.rmtree(diff_path, ignore_errors=True)
 
 
-def create_diff_image(base_image: str, new_image_name: str, diff_file_path: str):
+def create_diff_image(
+    base_image: str,
+    new_image_name: str,
+    diff_file_path: Union[str, List[str]],
+    changes: Optional[List[str]] = None,
+):
     """Creates a new image with the diff file applied to the base image
 
     The diff file is created by the function ``extract_diff``. Even though the
@@ -346,12 +351,20 @@ def create_diff_image(base_image: str, new_image_name: str, diff_file_path: str)
             should follow the format 'repository:tag'.
         new_image_name (str): Name to tag the new image. The name
             should follow the format 'repository:tag'.
-        diff_file_path (str): Path to diff file created by ``extract_diff``
+        diff_file_path (Union[str, List[str]]): Path to diff file created by
+            ``extract_diff``. If a list of paths is provided, the diffs are
+            applied in order (e.g. the diffs of several containers).
+        changes (List[str], optional): Dockerfile instructions applied to the
+            new image (e.g. ["LABEL key=value"]). Defaults to None.
     """
     client = DockerClient.getInstance()
     container: Container = client.containers.run(base_image, detach=True)
-    apply_diff(container.id, diff_file_path)
+    diff_file_paths = (
+        [diff_file_path] if isinstance(diff_file_path, str) else diff_file_path
+    )
+    for path in diff_file_paths:
+        apply_diff(container.id, path)
     repository, tag = new_image_name.split(":")
-    container.commit(repository=repository, tag=tag)
+    container.commit(repository=repository, tag=tag, changes=changes)
     container.stop()
     container.remove(v=True, force=True)
@@ -0,0 +1,175 @@
+import logging
+import queue
+import threading
+import time
+import traceback
+from typing import Optional, Set
+
+import docker
+
+from gitbugactions.docker.client import DockerClient
+
+
+class ContainerReaper:
+    """
+    Removes the act containers of the runner images as soon as they exit,
+    instead of polling for exited containers. The reaper subscribes to the
+    ``die`` events of the docker daemon and removes the containers created by
+    act (named ``act-*``) that have the runner label (set on the runner images
+    and inherited by their containers and derived images) or that were created
+    from one of the watched images. Other containers of the runner images
+    (e.g. the ones used by ``create_diff_image``) are not removed.
+
+    Containers whose names start with a protected prefix (e.g. warm containers
+    or containers being exported) are never removed.
+
+    The removals are done by a separate thread from a bounded queue, so a slow
+    daemon does not block the events stream. Events that do not fit in the
+    queue are dropped; their containers are removed by the sweep of exited
+    containers done when the reaper starts.
+    """
+
+    LABEL = "gitbugactions.runner"
+
+    def __init__(self, max_pending: int = 1000):
+        """
+        Args:
+            max_pending (int): Maximum number of containers waiting to be removed.
+        """
+        self.images: Set[str] = set()
+        self.__protected: Set[str] = set()
+        self.__lock = threading.Lock()
+        self.__pending: "queue.Queue[Optional[str]]" = queue.Queue(max_pending)
+        self.__stop = threading.Event()
+        self.__events = None
+        self.__threads = []
+
+    def add_image(self, image: str):
+        """
+        Also removes the containers of an image without the runner label (e.g.
+        runner images built before the label was added).
+        """
+        with self.__lock:
+            self.images.add(image)
+
+    def protect(self, prefix: str):
+        """
+        Prevents the containers whose names start with the prefix from being
+        removed.
+        """
+        with self.__lock:
+            self.__protected.add(prefix)
+
+    def unprotect(self, prefix: str):
+        with self.__lock:
+            self.__protected.discard(prefix)
+
+    def is_reaped(self, name: str, image: str, labels: Set[str]) -> bool:
+        """
+        Returns True if the container should be removed once it exits.
+        """
+        name = name.lstrip("/")
+        if not name.startswith("act-"):
+            return False
+        with self.__lock:
+            if any(name.startswith(prefix) for prefix in self.__protected):
+                return False
+            return ContainerReaper.LABEL in labels or image in self.images
+
+    def handle_event(self, event: dict):
+        if (
+            event.get("Type", "container") != "container"
+            or event.get("Action", event.get("status")) != "die"
+        ):
+            return
+        actor = event.get("Actor") or {}
+        attributes = actor.get("Attributes") or {}
+        if not self.is_reaped(
+            attributes.get("name", ""),
+            attributes.get("image", event.get("from", "")),
+            set(attributes),
+        ):
+            return
+        try:
+            self.__pending.put_nowait(actor.get("ID", event.get("id")))
+        except queue.Full:
+            logging.warning("Container reaper queue is full, dropping container")
+
+    def __watch(self):
+        client = DockerClient.getInstance()
+        since = time.time()
+        while not self.__stop.is_set():
+            try:
+                self.__events = client.api.events(
+                    since=int(since),
+                    decode=True,
+                    filters={"type": "container", "event": "die"},
+                )
+                # stop may have closed the previous stream
+                if self.__stop.is_set():
+                    break
+                for event in self.__events:
+                    since = event.get("time", since)
+                    self.handle_event(event)
+            except Exception:
+                if self.__stop.is_set():
+                    break
+                logging.error(
+                    f"Error in the docker events stream: {traceback.format_exc()}"
+                )
+                # Reconnects from the last event received
+                self.__stop.wait(5)
+
+    def __remove(self):
+        client = DockerClient.getInstance()
+        while True:
+            container_id = self.__pending.get()
+            if container_id is None:
+                return
+            try:
+                client.api.remove_container(container_id, v=True, force=True)
+            except docker.errors.NotFound:
+                # Removed by act (--rm)
+                pass
+            except docker.errors.APIError as e:
+                # The removal is already in progress
+                logging.debug(f"Could not remove container {container_id}: {e}")
+
+    def sweep(self):
+        """
+        Queues the removal of the exited containers that should be removed.
+        """
+        client = DockerClient.getInstance()
+        for container in client.api.containers(all=True, filters={"status": "exited"}):
+            names = container.get("Names") or [""]
+            if self.is_reaped(
+                names[0], container.get("Image", ""), set(container.get("Labels") or {})
+            ):
+                try:
+                    self.__pending.put_nowait(container["Id"])
+                except queue.Full:
+                    break
+
+    def start(self):
+        self.__threads = [
+            threading.Thread(target=self.__watch, daemon=True),
+            threading.Thread(target=self.__remove, daemon=True),
+        ]
+        for thread in self.__threads:
+            thread.start()
+        try:
+            self.sweep()
+        except Exception:
+            logging.error(f"Error while sweeping containers: {traceback.format_exc()}")
+
+    def stop(self):
+        """
+        Stops the reaper after removing the containers already queued.
+        """
+        self.__stop.set()
+        if self.__events is not None:
+            self.__events.close()
+        self.__pending.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
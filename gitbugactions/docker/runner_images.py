@@ -0,0 +1,206 @@
+import grp
+import hashlib
+import io
+import logging
+import os
+import tarfile
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from gitbugactions.docker.client import DockerClient
+from gitbugactions.docker.reaper import ContainerReaper
+
+
+class RunnerImageBuilder:
+    """
+    Builds the runner images from Dockerfiles kept in memory, so that several
+    processes can build images at the same time. The images are tagged with
+    the hash of their Dockerfile, so each image is built once and a change to
+    its Dockerfile (e.g. another base image or host user) builds a new image.
+
+    Besides the default runner image (the full base image, with every
+    toolchain), the builder has toolchain images: a slim common image (see
+    ``set_slim_base_image``) with the layer of a single toolchain, chosen from
+    the build tools of the workflows (see ``get_image``). Smaller images start
+    faster and put less pressure on the page cache when many containers run at
+    once. The toolchain images share the layers of the common image.
+    """
+
+    __REPOSITORY = "gitbugactions-runner"
+    __LABEL = "gitbugactions.runner.dockerfile"
+    # Ubuntu image with node (used by the javascript actions), git and docker
+    __SLIM_BASE_IMAGE = "catthehacker/ubuntu:act-22.04"
+    __APT_INSTALL = (
+        "RUN apt-get update"
+        " && apt-get install -y --no-install-recommends {}"
+        " && rm -rf /var/lib/apt/lists/*"
+    )
+    __GO_VERSION = "1.22.5"
+    # Layers of each toolchain. The setup actions of the workflows still run,
+    # so the layers only have to make the common versions available.
+    __TOOLCHAINS: Dict[str, List[str]] = {
+        "java": [__APT_INSTALL.format("openjdk-17-jdk-headless maven")],
+        "python": [
+            __APT_INSTALL.format("python3 python3-dev python3-pip python3-venv")
+        ],
+        # node is already in the common image
+        "node": [],
+        "rust": [
+            __APT_INSTALL.format("build-essential pkg-config libssl-dev"),
+            # Same paths as the full image (see DependencyVolumeManager)
+            'ENV RUSTUP_HOME="/usr/share/rust/.rustup" CARGO_HOME="/usr/share/rust/.cargo"',
+            'ENV PATH="/usr/share/rust/.cargo/bin:$PATH"',
+            "RUN curl -fsSL https://sh.rustup.rs | sh -s -- -y --no-modify-path --profile minimal"
+            " && chmod -R a+w /usr/share/rust",
+        ],
+        "go": [
+            # The architectures of dpkg and Go have the same names (e.g. arm64)
+            'RUN arch="$(dpkg --print-architecture)"'
+            f" && curl -fsSL https://go.dev/dl/go{__GO_VERSION}.linux-$arch.tar.gz"
+            " | tar -C /usr/local -xz",
+            'ENV PATH="/usr/local/go/bin:$PATH"',
+        ],
+        "cpp": [__APT_INSTALL.format("build-essential cmake ninja-build ccache")],
+        "dotnet": [__APT_INSTALL.format("dotnet-sdk-8.0")],
+    }
+    __BUILD_TOOLS = {
+        "maven": "java",
+        "gradle": "java",
+        "pytest": "python",
+        "unittest": "python",
+        "npm-jest": "node",
+        "npm-mocha": "node",
+        "npm-vitest": "node",
+        "cargo": "rust",
+        "go": "go",
+        "cmake": "cpp",
+        "dotnet": "dotnet",
+    }
+
+    __LOCK = threading.Lock()
+    __BUILT: Set[str] = set()
+
+    @staticmethod
+    def set_slim_base_image(base_image: str):
+        """
+        Sets the base of the toolchain images. It must be an Ubuntu image with
+        node, so that the javascript actions can run.
+        """
+        RunnerImageBuilder.__SLIM_BASE_IMAGE = base_image
+
+    @staticmethod
+    def get_dockerfile(base_image: str) -> str:
+        """
+        Returns the Dockerfile of the default runner image, built from a full
+        runner image with every toolchain.
+        """
+        dockerfile = f"FROM {base_image}\n"
+        dockerfile += f"RUN sudo usermod -u 4000000 runneradmin\n"
+        dockerfile += f"RUN sudo groupadd -o -g {os.getgid()} {grp.getgrgid(os.getgid()).gr_name}\n"
+        dockerfile += f"RUN sudo usermod -G {os.getgid()} runner\n"
+        dockerfile += f"RUN sudo usermod -o -u {os.getuid()} runner\n"
+        # Avoids problems with Rust projects in certain hosts
+        dockerfile += f'ENV RUSTUP_HOME="/usr/share/rust/.rustup"\n'
+        # Lets the reaper remove the containers as soon as they exit
+        dockerfile += f"LABEL {ContainerReaper.LABEL}=true\n"
+        return dockerfile
+
+    @staticmethod
+    def get_common_dockerfile() -> str:
+        """
+        Returns the Dockerfile of the common image of the toolchain images.
+        The runs use the uid of the host user, which is given to the runner
+        user as in the default runner image.
+        """
+        dockerfile = f"FROM {RunnerImageBuilder.__SLIM_BASE_IMAGE}\n"
+        dockerfile += "USER root\n"
+        dockerfile += (
+            RunnerImageBuilder.__APT_INSTALL.format(
+                "sudo git curl ca-certificates unzip xz-utils zstd"
+            )
+            + "\n"
+        )
+        dockerfile += f"RUN groupadd -o -g {os.getgid()} {grp.getgrgid(os.getgid()).gr_name} || true\n"
+        dockerfile += (
+            "RUN (id -u runner > /dev/null 2>&1 || useradd -m -s /bin/bash runner)"
+            f" && usermod -o -u {os.getuid()} -G {os.getgid()} runner"
+            ' && echo "runner ALL=(ALL) NOPASSWD:ALL" > /etc/sudoers.d/runner\n'
+        )
+        dockerfile += f"LABEL {ContainerReaper.LABEL}=true\n"
+        return dockerfile
+
+    @staticmethod
+    def get_toolchain(build_tool: str) -> Optional[str]:
+        """
+        Returns the toolchain of a build tool (see ``GitHubWorkflow.get_build_tool``)
+        or None if it has no toolchain image.
+        """
+        return RunnerImageBuilder.__BUILD_TOOLS.get(build_tool)
+
+    @staticmethod
+    def get_toolchain_dockerfile(toolchain: str) -> str:
+        """
+        Returns the Dockerfile of the image of a toolchain. The common image is
+        built if it does not exist.
+        """
+        common_image = RunnerImageBuilder.build(
+            RunnerImageBuilder.get_common_dockerfile()
+        )
+        dockerfile = f"FROM {common_image}\n"
+        for line in RunnerImageBuilder.__TOOLCHAINS[toolchain]:
+            dockerfile += line + "\n"
+        return dockerfile
+
+    @staticmethod
+    def get_tag(dockerfile: str) -> str:
+        digest = hashlib.sha256(dockerfile.encode("utf-8")).hexdigest()
+        return f"{RunnerImageBuilder.__REPOSITORY}:{digest[:16]}"
+
+    @staticmethod
+    def build(dockerfile: str) -> str:
+        """
+        Builds the image of a Dockerfile if it does not exist.
+
+        Returns:
+            str: Name of the image.
+        """
+        tag = RunnerImageBuilder.get_tag(dockerfile)
+        with RunnerImageBuilder.__LOCK:
+            if tag in RunnerImageBuilder.__BUILT:
+                return tag
+            client = DockerClient.getInstance()
+            if len(client.images.list(name=tag)) == 0:
+                logging.info(f"Building runner image {tag}")
+                # The Dockerfile is the only file of the build context
+                context = io.BytesIO()
+                with tarfile.open(fileobj=context, mode="w") as tar:
+                    content = dockerfile.encode("utf-8")
+                    info = tarfile.TarInfo("Dockerfile")
+                    info.size = len(content)
+                    tar.addfile(info, io.BytesIO(content))
+                context.seek(0)
+                client.images.build(
+                    fileobj=context,
+                    custom_context=True,
+                    tag=tag,
+                    forcerm=True,
+                    labels={RunnerImageBuilder.__LABEL: tag.split(":")[-1]},
+                )
+            RunnerImageBuilder.__BUILT.add(tag)
+        return tag
+
+    @staticmethod
+    def get_image(build_tools: Iterable[str], default_image: str) -> str:
+        """
+        Returns the toolchain image of the build tools of the workflows of a
+        run. Runs with several toolchains or with unknown build tools use the
+        default image.
+        """
+        toolchains = set(
+            RunnerImageBuilder.get_toolchain(build_tool) for build_tool in build_tools
+        )
+        if len(toolchains) != 1 or None in toolchains:
+            return default_image
+        return RunnerImageBuilder.build(
+            RunnerImageBuilder.get_toolchain_dockerfile(toolchains.pop())
+        )
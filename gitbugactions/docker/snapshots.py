@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import traceback
+import uuid
+from typing import Dict, List, Optional, Set
+
+import pygit2
+
+from gitbugactions.actions.actions import Act, ActTestsRun
+from gitbugactions.actions.workflow import GitHubWorkflow
+from gitbugactions.docker.client import DockerClient
+from gitbugactions.docker.export import create_diff_image, extract_diff
+from gitbugactions.docker.volumes import DependencyVolumeManager
+from gitbugactions.utils.repo_utils import get_repo_identity
+
+
+class RunnerSnapshotManager:
+    """
+    Manages runner images with the toolchains and dependencies installed by
+    previous runs of a repository. The first run of a repository whose tests
+    execute is snapshotted: the diffs of its containers (see ``extract_diff``)
+    are applied to the runner image. Later runs with the same key use the
+    snapshot as their runner image, so the setup steps find the toolchains and
+    dependencies already installed.
+
+    The key of a snapshot is the repository, the content of its lockfiles (see
+    ``DependencyVolumeManager.get_lockfiles``) and the setup steps of its
+    workflows (the steps of each job before the first test step). The working
+    tree of the repository is not part of the snapshots.
+
+    The snapshots are labeled, so they can be removed with
+    ``docker image prune -a --filter label=gitbugactions.snapshot``.
+    """
+
+    __REPOSITORY = "gitbugactions-snapshot"
+    __LABEL = "gitbugactions.snapshot"
+    # Paths of the containers that are not part of the snapshots
+    __IGNORE_PATHS = ["/tmp/*", "*.act-result*", "/var/run/act*"]
+
+    def __init__(self, runner_image: str = "gitbugactions:latest", max_attempts=3):
+        """
+        Args:
+            runner_image (str): Image on which the snapshots are created.
+            max_attempts (int): Maximum number of runs snapshotted for each key.
+                Runs are not snapshotted if their tests do not execute.
+        """
+        self.runner_image = runner_image
+        self.max_attempts = max_attempts
+        self.__lock = threading.Lock()
+        self.__creating: Set[str] = set()
+        self.__attempts: Dict[str, int] = {}
+
+    @staticmethod
+    def get_setup_steps(workflow: GitHubWorkflow) -> Dict[str, List]:
+        """
+        Returns the steps of each job of the workflow before its first test
+        step. The tokens added to the setup steps are removed.
+        """
+        setup_steps = {}
+        if "jobs" not in workflow.doc or not isinstance(workflow.doc["jobs"], dict):
+            return setup_steps
+        for job_name, job in workflow.doc["jobs"].items():
+            if not isinstance(job, dict) or not isinstance(job.get("steps"), list):
+                continue
+            steps = []
+            for step in job["steps"]:
+                if (
+                    isinstance(step, dict)
+                    and "run" in step
+                    and workflow._is_test_command(step["run"])
+                ):
+                    break
+                if isinstance(step, dict) and isinstance(step.get("with"), dict):
+                    step = dict(step)
+                    step["with"] = {
+                        key: value
+                        for key, value in step["with"].items()
+                        if key != "token"
+                    }
+                steps.append(step)
+            setup_steps[job_name] = steps
+        return setup_steps
+
+    def get_key(
+        self,
+        repo: pygit2.Repository,
+        workflows: List[GitHubWorkflow],
+        runner_image: Optional[str] = None,
+    ) -> str:
+        """
+        Args:
+            runner_image (str): Image used by the runs. If None, uses the
+                runner image of the manager.
+        """
+        runner_image = runner_image if runner_image is not None else self.runner_image
+        digest = hashlib.sha256(runner_image.encode("utf-8") + b"\0")
+        digest.update(get_repo_identity(repo).encode("utf-8") + b"\0")
+        for lockfile in DependencyVolumeManager.get_lockfiles(repo):
+            digest.update(lockfile.encode("utf-8") + b"\0")
+            with open(os.path.join(repo.workdir, lockfile), "rb") as f:
+                digest.update(f.read())
+            digest.update(b"\0")
+        setup_steps = [
+            [
+                os.path.basename(workflow.path),
+                RunnerSnapshotManager.get_setup_steps(workflow),
+            ]
+            for workflow in workflows
+        ]
+        digest.update(json.dumps(setup_steps, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get_image(self, key: str) -> Optional[str]:
+        """
+        Returns the name of the snapshot of the key or None if it does not exist.
+        """
+        image = f"{RunnerSnapshotManager.__REPOSITORY}:{key[:32]}"
+        if len(DockerClient.getInstance().images.list(name=image)) > 0:
+            return image
+        return None
+
+    def acquire(self, key: str) -> bool:
+        """
+        Returns True if the caller should snapshot its run for the key. Only
+        one run of each key is snapshotted at a time. ``release`` must be
+        called afterwards.
+        """
+        with self.__lock:
+            if (
+                key in self.__creating
+                or self.__attempts.get(key, 0) >= self.max_attempts
+            ):
+                return False
+            self.__creating.add(key)
+            self.__attempts[key] = self.__attempts.get(key, 0) + 1
+            return True
+
+    def release(self, key: str):
+        with self.__lock:
+            self.__creating.discard(key)
+
+    def create(
+        self,
+        key: str,
+        act_runs: List[ActTestsRun],
+        repo_path: str,
+        runner_image: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Creates the snapshot of the key from the containers kept by the runs.
+        The containers are found by the ids of the runs (see
+        ``Act.get_run_filters``) and are not removed.
+
+        Args:
+            key (str): Key returned by ``get_key``.
+            act_runs (List[ActTestsRun]): Runs of the workflows.
+            repo_path (str): Path of the repository in the containers.
+            runner_image (str): Image used by the runs. If None, uses the
+                runner image of the manager.
+
+        Returns:
+            Optional[str]: Name of the snapshot or None if the runs can not be
+                snapshotted (e.g. their tests did not execute).
+        """
+        if len(act_runs) == 0 or any(len(act_run.tests) == 0 for act_run in act_runs):
+            return None
+
+        client = DockerClient.getInstance()
+        ignore_paths = RunnerSnapshotManager.__IGNORE_PATHS + [
+            os.path.normpath(repo_path) + "*"
+        ]
+        diff_path = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+        os.makedirs(diff_path)
+        try:
+            diff_files = []
+            for act_run in act_runs:
+                if act_run.run_id is None:
+                    continue
+                for container in client.containers.list(
+                    all=True, filters=Act.get_run_filters(act_run.run_id)
+                ):
+                    diff_file = os.path.join(diff_path, f"{container.id}.tar.gz")
+                    extract_diff(container.id, diff_file, ignore_paths=ignore_paths)
+                    diff_files.append(diff_file)
+            if len(diff_files) == 0:
+                return None
+
+            image = f"{RunnerSnapshotManager.__REPOSITORY}:{key[:32]}"
+            create_diff_image(
+                runner_image if runner_image is not None else self.runner_image,
+                image,
+                diff_files,
+                changes=[f"LABEL {RunnerSnapshotManager.__LABEL}={key}"],
+            )
+            logging.info(f"Created runner snapshot {image}")
+            return image
+        except Exception:
+            logging.error(
+                f"Error while creating runner snapshot: {traceback.format_exc()}"
+            )
+            return None
+        finally:
+            shutil.rmtree(diff_path, ignore_errors=True)
@@ -0,0 +1,171 @@
+import logging
+import re
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional, Tuple
+
+import docker
+
+from gitbugactions.docker.client import DockerClient
+
+
+class ContainerStatsSampler:
+    """
+    Samples the docker stats of the containers of a run while it executes. act
+    creates and removes the containers of each job during the run, so the
+    containers are listed again in each sample.
+
+    Measured resources:
+        - peak_memory: highest memory used at the same time by the containers
+          (without the page cache, as in ``docker stats``), in bytes.
+        - cpu_seconds: CPU time used by the containers.
+        - block_io_bytes: bytes read from and written to block devices.
+        - network_bytes: bytes received and sent.
+
+    The counters are read from the last sample of each container, so the usage
+    after the last sample (at most ``interval`` seconds) is not counted.
+    Containers that already existed when the sampler started (e.g. warm
+    containers) only count the usage after the start.
+    """
+
+    def __init__(self, filters: Dict[str, Any], interval: float = 2):
+        """
+        Args:
+            filters (Dict[str, Any]): Docker filters of the containers of the
+                run (see ``Act.get_run_filters``).
+            interval (float): Seconds between samples.
+        """
+        self.filters = filters
+        self.interval = interval
+        self.peak_memory = 0
+        # Last counters (cpu, block io, network) of each container
+        self.__counters: Dict[str, Tuple[int, int, int]] = {}
+        self.__baselines: Dict[str, Tuple[int, int, int]] = {}
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def parse_stats(stats: Dict[str, Any]) -> Tuple[int, int, int, int]:
+        """
+        Returns the memory used and the cpu (in ns), block io and network counters
+        of a response of the docker stats API.
+        """
+        memory_stats = stats.get("memory_stats") or {}
+        memory = memory_stats.get("usage", 0)
+        # cgroup v1 and v2 name the page cache differently
+        memory_details = memory_stats.get("stats") or {}
+        memory -= memory_details.get(
+            "total_inactive_file", memory_details.get("inactive_file", 0)
+        )
+
+        cpu = ((stats.get("cpu_stats") or {}).get("cpu_usage") or {}).get(
+            "total_usage", 0
+        )
+
+        block_io = sum(
+            entry.get("value", 0)
+            for entry in (
+                (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+            )
+            if entry.get("op", "").lower() in ("read", "write")
+        )
+
+        network = sum(
+            interface.get("rx_bytes", 0) + interface.get("tx_bytes", 0)
+            for interface in (stats.get("networks") or {}).values()
+        )
+        return max(memory, 0), cpu, block_io, network
+
+    def sample(self, baseline: bool = False):
+        client = DockerClient.getInstance()
+        memory = 0
+        for container in client.containers.list(filters=self.filters):
+            try:
+                stats = client.api.stats(container.id, stream=False, one_shot=True)
+            except docker.errors.NotFound:
+                # The container was removed
+                continue
+            container_memory, *counters = ContainerStatsSampler.parse_stats(stats)
+            memory += container_memory
+            if baseline:
+                self.__baselines[container.id] = tuple(counters)
+            else:
+                self.__counters[container.id] = tuple(counters)
+        if not baseline:
+            self.peak_memory = max(self.peak_memory, memory)
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                logging.error(
+                    f"Error while sampling container stats: {traceback.format_exc()}"
+                )
+
+    def start(self):
+        try:
+            self.sample(baseline=True)
+        except Exception:
+            logging.error(
+                f"Error while sampling container stats: {traceback.format_exc()}"
+            )
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+        try:
+            # The containers of kept or warm runs are still alive
+            self.sample()
+        except Exception:
+            logging.error(
+                f"Error while sampling container stats: {traceback.format_exc()}"
+            )
+
+    def __get_counter(self, index: int) -> int:
+        return sum(
+            counters[index] - self.__baselines.get(container_id, (0, 0, 0))[index]
+            for container_id, counters in self.__counters.items()
+        )
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.__get_counter(0) / 1e9
+
+    @property
+    def block_io_bytes(self) -> int:
+        return self.__get_counter(1)
+
+    @property
+    def network_bytes(self) -> int:
+        return self.__get_counter(2)
+
+
+class ImagePullTimer:
+    """
+    Measures the time act spends pulling images (e.g. of docker actions and
+    services) from its output. A pull of a job lasts until the next line of
+    the same job.
+    """
+
+    __PULL_PATTERN = re.compile(r"^\[(?P<job>[^\]]+)\]\s+\S+\s+docker pull image=")
+    __JOB_PATTERN = re.compile(r"^\[(?P<job>[^\]]+)\]")
+
+    def __init__(self):
+        self.pull_time = 0.0
+        self.__pulls: Dict[str, float] = {}
+
+    def hook(self, stream: str, line: str):
+        match = ImagePullTimer.__JOB_PATTERN.match(line)
+        if match is None:
+            return
+        job = match.group("job")
+        now = time.time()
+        if job in self.__pulls:
+            self.pull_time += now - self.__pulls.pop(job)
+        if ImagePullTimer.__PULL_PATTERN.match(line):
+            self.__pulls[job] = now
@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import traceback
+from typing import Dict, List, Tuple
+
+import docker
+import pygit2
+
+from gitbugactions.docker.client import DockerClient
+from gitbugactions.utils.repo_utils import get_repo_identity
+
+
+class DependencyVolumeManager:
+    """
+    Manages the docker volumes that keep the dependencies downloaded by the
+    runs (e.g. ~/.m2 or ~/.cargo/registry). act does not support actions/cache,
+    so without these volumes every run downloads the dependencies again.
+
+    There is a volume per ecosystem, repository and hash of the lockfiles of
+    the ecosystem, so runs only share dependencies resolved from the same
+    lockfiles. The least recently used volumes are removed once the volumes
+    use more space than the size budget.
+
+    Optionally, each repository also has a build cache volume (e.g. for ccache
+    or the Gradle build cache, see ``GitHubWorkflow.instrument_build_cache``),
+    shared by every state of the repository so that the builds of neighbouring
+    commits reuse the compiled objects.
+    """
+
+    # Root of the volumes whose paths are set through environment variables
+    __CACHE_ROOT = "/home/runner/.gitbugactions-cache"
+    # Files that determine the dependencies of each ecosystem, the paths where
+    # the volumes are mounted and the environment variables that point the
+    # tools to them. Whenever possible, the paths are set with environment
+    # variables because docker creates missing parent directories as root.
+    __ECOSYSTEMS = {
+        "maven": (["pom.xml"], ["/home/runner/.m2"], {}),
+        "gradle": (
+            [
+                "build.gradle",
+                "build.gradle.kts",
+                "settings.gradle",
+                "settings.gradle.kts",
+                "gradle.lockfile",
+                "gradle/libs.versions.toml",
+                "gradle/wrapper/gradle-wrapper.properties",
+            ],
+            [f"{__CACHE_ROOT}/gradle"],
+            {"GRADLE_USER_HOME": f"{__CACHE_ROOT}/gradle"},
+        ),
+        "npm": (
+            ["package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml"],
+            [f"{__CACHE_ROOT}/npm"],
+            {
+                "npm_config_cache": f"{__CACHE_ROOT}/npm/npm",
+                "YARN_CACHE_FOLDER": f"{__CACHE_ROOT}/npm/yarn",
+                "npm_config_store_dir": f"{__CACHE_ROOT}/npm/pnpm",
+            },
+        ),
+        "pip": (
+            [
+                "requirements.txt",
+                "requirements-dev.txt",
+                "Pipfile.lock",
+                "poetry.lock",
+                "pyproject.toml",
+                "setup.py",
+                "setup.cfg",
+            ],
+            [f"{__CACHE_ROOT}/pip"],
+            {"PIP_CACHE_DIR": f"{__CACHE_ROOT}/pip"},
+        ),
+        # CARGO_HOME also has the binaries of the toolchain, so only its
+        # registry and git dirs are mounted (the runner image uses /usr/share/rust)
+        "cargo": (
+            ["Cargo.toml", "Cargo.lock"],
+            ["/usr/share/rust/.cargo/registry", "/usr/share/rust/.cargo/git"],
+            {},
+        ),
+        "go": (
+            ["go.mod", "go.sum"],
+            [f"{__CACHE_ROOT}/go"],
+            {"GOMODCACHE": f"{__CACHE_ROOT}/go"},
+        ),
+        "nuget": (
+            ["packages.lock.json", "Directory.Packages.props", "NuGet.config"],
+            [f"{__CACHE_ROOT}/nuget"],
+            {"NUGET_PACKAGES": f"{__CACHE_ROOT}/nuget"},
+        ),
+    }
+    # Path where the build cache volume is mounted
+    BUILD_CACHE_PATH = f"{__CACHE_ROOT}/build"
+    __VOLUME_PREFIX = "gitbugactions-deps"
+    __LABEL = "gitbugactions.dependencies"
+    # Size budget of the volumes (in bytes)
+    __MAX_SIZE = 50 * 1024**3
+    # Minimum time between the checks of the size of the volumes (docker df is slow)
+    __EVICTION_INTERVAL = 300
+
+    __LOCK = threading.Lock()
+    __LAST_USED: Dict[str, float] = {}
+    __IN_USE: Dict[str, int] = {}
+    __LAST_EVICTION = 0.0
+
+    @staticmethod
+    def set_max_size(max_size_gb: float):
+        DependencyVolumeManager.__MAX_SIZE = int(max_size_gb * 1024**3)
+
+    @staticmethod
+    def get_lockfiles(repo: pygit2.Repository) -> List[str]:
+        """
+        Returns the lockfiles of every ecosystem found in the repository, as
+        paths relative to its working tree.
+        """
+        lockfiles = []
+        for ecosystem_lockfiles, _, _ in DependencyVolumeManager.__ECOSYSTEMS.values():
+            for lockfile in ecosystem_lockfiles:
+                if os.path.isfile(os.path.join(repo.workdir, lockfile)):
+                    lockfiles.append(lockfile)
+        return lockfiles
+
+    @staticmethod
+    def get_volumes(
+        repo: pygit2.Repository, dependencies: bool = True, build_cache: bool = False
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Returns the volumes for the current state of the repository.
+
+        Args:
+            repo (pygit2.Repository): Repository being tested.
+            dependencies (bool): If True, includes the dependency volumes.
+            build_cache (bool): If True, includes the build cache volume.
+
+        Returns:
+            Tuple[Dict[str, str], Dict[str, str]]: Maps the name of each volume to
+                its path in the runner, and the environment variables that point
+                the tools to the volumes.
+        """
+        repo_identity = get_repo_identity(repo)
+        volumes, env = {}, {}
+        if build_cache:
+            digest = hashlib.sha256(repo_identity.encode("utf-8"))
+            name = f"{DependencyVolumeManager.__VOLUME_PREFIX}-build-0-{digest.hexdigest()[:24]}"
+            volumes[name] = DependencyVolumeManager.BUILD_CACHE_PATH
+        if not dependencies:
+            return volumes, env
+
+        for ecosystem, (
+            lockfiles,
+            paths,
+            ecosystem_env,
+        ) in DependencyVolumeManager.__ECOSYSTEMS.items():
+            digest = hashlib.sha256(repo_identity.encode("utf-8"))
+            found = False
+            for lockfile in lockfiles:
+                lockfile_path = os.path.join(repo.workdir, lockfile)
+                if not os.path.isfile(lockfile_path):
+                    continue
+                found = True
+                digest.update(lockfile.encode("utf-8") + b"\0")
+                with open(lockfile_path, "rb") as f:
+                    digest.update(f.read())
+                digest.update(b"\0")
+            if not found:
+                continue
+
+            for i, path in enumerate(paths):
+                name = f"{DependencyVolumeManager.__VOLUME_PREFIX}-{ecosystem}-{i}-{digest.hexdigest()[:24]}"
+                volumes[name] = path
+            env.update(ecosystem_env)
+        return volumes, env
+
+    @staticmethod
+    def __create_volume(client: docker.DockerClient, name: str, image: str):
+        try:
+            client.volumes.get(name)
+            return
+        except docker.errors.NotFound:
+            pass
+
+        client.volumes.create(
+            name=name, labels={DependencyVolumeManager.__LABEL: "true"}
+        )
+        # The volumes are created by root, but the runs use the uid of the host user
+        client.containers.run(
+            image,
+            ["chown", f"{os.getuid()}:{os.getgid()}", "/volume"],
+            user="root",
+            entrypoint="",
+            volumes={name: {"bind": "/volume", "mode": "rw"}},
+            remove=True,
+        )
+
+    @staticmethod
+    def acquire(
+        repo: pygit2.Repository,
+        image: str,
+        dependencies: bool = True,
+        build_cache: bool = False,
+    ) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Creates the volumes for the current state of the repository and marks
+        them as in use. ``release`` must be called after the run.
+
+        Args:
+            repo (pygit2.Repository): Repository being tested.
+            image (str): Runner image, used to initialize new volumes.
+            dependencies (bool): If True, acquires the dependency volumes.
+            build_cache (bool): If True, acquires the build cache volume.
+
+        Returns:
+            Tuple[List[str], Dict[str, str]]: The volumes in the format
+                ``name:path`` and the environment variables of the run.
+        """
+        volumes, env = DependencyVolumeManager.get_volumes(
+            repo, dependencies=dependencies, build_cache=build_cache
+        )
+        client = DockerClient.getInstance()
+        acquired = []
+        for name, path in volumes.items():
+            with DependencyVolumeManager.__LOCK:
+                try:
+                    DependencyVolumeManager.__create_volume(client, name, image)
+                except Exception:
+                    logging.error(
+                        f"Error while creating volume {name}: {traceback.format_exc()}"
+                    )
+                    continue
+                DependencyVolumeManager.__IN_USE[name] = (
+                    DependencyVolumeManager.__IN_USE.get(name, 0) + 1
+                )
+                DependencyVolumeManager.__LAST_USED[name] = time.time()
+            acquired.append(f"{name}:{path}")
+        return acquired, env
+
+    @staticmethod
+    def release(volumes: List[str]):
+        """
+        Marks the volumes returned by ``acquire`` as no longer in use and
+        removes the least recently used volumes if the size budget is exceeded.
+        """
+        if len(volumes) == 0:
+            return
+        with DependencyVolumeManager.__LOCK:
+            for volume in volumes:
+                name = volume.split(":")[0]
+                DependencyVolumeManager.__IN_USE[name] -= 1
+                if DependencyVolumeManager.__IN_USE[name] == 0:
+                    del DependencyVolumeManager.__IN_USE[name]
+                DependencyVolumeManager.__LAST_USED[name] = time.time()
+
+            if (
+                time.time() - DependencyVolumeManager.__LAST_EVICTION
+                < DependencyVolumeManager.__EVICTION_INTERVAL
+            ):
+                return
+            DependencyVolumeManager.__LAST_EVICTION = time.time()
+
+        try:
+            DependencyVolumeManager.evict()
+        except Exception:
+            logging.error(f"Error while evicting volumes: {traceback.format_exc()}")
+
+    @staticmethod
+    def evict():
+        """
+        Removes the least recently used volumes that are not in use until the
+        volumes fit in the size budget.
+        """
+        client = DockerClient.getInstance()
+        sizes: Dict[str, int] = {}
+        for volume in client.df().get("Volumes") or []:
+            if volume["Name"].startswith(DependencyVolumeManager.__VOLUME_PREFIX):
+                sizes[volume["Name"]] = max(volume["UsageData"]["Size"], 0)
+
+        total_size = sum(sizes.values())
+        if total_size <= DependencyVolumeManager.__MAX_SIZE:
+            return
+
+        with DependencyVolumeManager.__LOCK:
+            # Volumes from previous executions were never used by this one
+            candidates = sorted(
+                (
+                    name
+                    for name in sizes
+                    if name not in DependencyVolumeManager.__IN_USE
+                ),
+                key=lambda name: DependencyVolumeManager.__LAST_USED.get(name, 0),
+            )
+            for name in candidates:
+                if total_size <= DependencyVolumeManager.__MAX_SIZE:
+                    break
+                try:
+                    client.volumes.get(name).remove()
+                except docker.errors.APIError:
+                    # The volume is used by a container
+                    continue
+                total_size -= sizes[name]
+                DependencyVolumeManager.__LAST_USED.pop(name, None)
+                logging.info(f"Removed dependency volume {name}")
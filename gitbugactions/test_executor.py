@@ -1,21 +1,41 @@
 import copy
+import hashlib
+import logging
 import os
+import shutil
+import subprocess
 import threading
-import time
 import uuid
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-import schedule
 from pygit2 import Repository
 
-from gitbugactions.actions.actions import ActTestsRun, GitHubActions
+from gitbugactions.actions.actions import (
+    Act,
+    ActCacheDirManager,
+    ActTestsRun,
+    GitHubActions,
+)
+from gitbugactions.actions.admission import AdmissionController
+from gitbugactions.actions.cache_server import ActionsCacheServer
+from gitbugactions.actions.run_cache import ActRunCache
+from gitbugactions.actions.run_store import RunStore
+from gitbugactions.actions.test_selection import TestSelection
+from gitbugactions.actions.timeouts import TimeoutEstimator
+from gitbugactions.actions.workflow import GitHubWorkflow
 from gitbugactions.docker.client import DockerClient
+from gitbugactions.docker.reaper import ContainerReaper
+from gitbugactions.docker.runner_images import RunnerImageBuilder
+from gitbugactions.docker.snapshots import RunnerSnapshotManager
+from gitbugactions.docker.volumes import DependencyVolumeManager
 from gitbugactions.utils.repo_state_manager import RepoStateManager
+from gitbugactions.utils.repo_utils import get_repo_identity
 from gitbugactions.actions.templates.template_workflows import TemplateWorkflowManager
 
 
 class TestExecutor:
-    __CLEANUP = []
+    __REAPER: Optional[ContainerReaper] = None
     __CLEANUP_ENABLED = True
     __CLEANUP_LOCK = threading.Lock()
 
@@ -28,7 +48,68 @@ class TestExecutor:
         runner_image: str = "gitbugactions:latest",
         base_image: str | None = None,
         instrument_workflows: bool = True,
+        run_cache: Optional[ActRunCache] = None,
+        run_store: Optional[RunStore] = None,
+        execution: Optional[int] = None,
+        warm_containers: bool = False,
+        dependency_volumes: bool = False,
+        cache_server: Optional[ActionsCacheServer] = None,
+        admission_controller: Optional[AdmissionController] = None,
+        snapshot_manager: Optional[RunnerSnapshotManager] = None,
+        parallel_workflows: int = 1,
+        timeout_estimator: Optional[TimeoutEstimator] = None,
+        idle_timeout: Optional[float] = None,
+        build_cache: bool = False,
+        toolchain_images: bool = False,
     ):
+        """
+        Args:
+            run_cache (ActRunCache): Cache of act runs. If set, executions
+                identical to previous ones reuse their results. The cache is not
+                used when the containers are kept.
+            run_store (RunStore): Persistent store where the runs are recorded.
+            execution (int): Index of the execution in the run store. If the
+                store already has this execution, its runs are reused instead of
+                running the workflows again (except when the containers are
+                kept). If None, the workflows are always run.
+            warm_containers (bool): If True, the containers are reused by every
+                run of the executor (e.g. the three phases of a bug-fix), so
+                the toolchains and dependencies installed by the first run are
+                reused. The containers must be removed with
+                ``remove_warm_containers``.
+            dependency_volumes (bool): If True, the dependencies downloaded by
+                the runs are kept in docker volumes shared by the runs of the
+                same repository (see ``DependencyVolumeManager``). The volumes
+                are not used in offline runs or when the containers are kept,
+                because the dependencies would not be part of the containers.
+            cache_server (ActionsCacheServer): Server used by the cache steps of
+                the workflows, which are kept instead of removed. Each repository
+                has its own caches. Not used in offline runs.
+            admission_controller (AdmissionController): If set, each run waits
+                until the host has the resources for it. The peak memory of the
+                runs is recorded in the controller.
+            snapshot_manager (RunnerSnapshotManager): If set, the runs use the
+                snapshot of the repository as their runner image. If there is
+                no snapshot, the containers of the run are snapshotted. Not
+                used when the containers are kept.
+            parallel_workflows (int): Maximum number of test workflows of the
+                repository run at the same time. The extra workflows acquire
+                their own act cache dirs from ``ActCacheDirManager``.
+            timeout_estimator (TimeoutEstimator): If set, gives the timeout of
+                the runs that are not given one. The duration of the runs is
+                recorded in the estimator.
+            idle_timeout (float): Minutes without output after which a run is
+                stopped as if it timed out. If None, only the timeout applies.
+            build_cache (bool): If True, the workflows whose build tool has a
+                build cache (e.g. ccache or the Gradle build cache) keep it in
+                a docker volume shared by the runs of the repository (see
+                ``DependencyVolumeManager``). Not used in offline runs or when
+                the containers are kept.
+            toolchain_images (bool): If True, the runs whose workflows use a
+                single toolchain use its slim image instead of the runner image
+                (see ``RunnerImageBuilder``). Runs with several toolchains or
+                unknown build tools use the runner image.
+        """
         TestExecutor.__schedule_cleanup(runner_image)
         self.act_cache_dir = act_cache_dir
         self.repo_clone = repo_clone
@@ -40,45 +121,61 @@ class TestExecutor:
         self.default_actions = default_actions
         self.first_commit = repo_clone.revparse_single("HEAD")
         self.instrument_workflows = instrument_workflows
+        self.run_cache = run_cache
+        self.run_store = run_store
+        self.execution = execution
+        self.warm_containers = warm_containers
+        self.dependency_volumes = dependency_volumes
+        self.cache_server = cache_server
+        self.admission_controller = admission_controller
+        self.snapshot_manager = snapshot_manager
+        self.parallel_workflows = parallel_workflows
+        self.timeout_estimator = timeout_estimator
+        self.idle_timeout = idle_timeout
+        self.build_cache = build_cache
+        self.toolchain_images = toolchain_images
+        # Act names the containers after the workflows, so a stable prefix makes
+        # every run of the executor use the same containers. The prefix is short
+        # because act truncates the names of the containers.
+        self.warm_id = f"gba-{uuid.uuid4().hex[:12]}"
+        if self.warm_containers:
+            with TestExecutor.__CLEANUP_LOCK:
+                if TestExecutor.__REAPER is not None:
+                    TestExecutor.__REAPER.protect(f"act-{self.warm_id}")
 
     @staticmethod
     def __schedule_cleanup(runner_image):
         with TestExecutor.__CLEANUP_LOCK:
-            if (
-                runner_image in TestExecutor.__CLEANUP
-                or not TestExecutor.__CLEANUP_ENABLED
-            ):
+            if not TestExecutor.__CLEANUP_ENABLED:
                 return
-
-            docker = DockerClient.getInstance()
-
-            def cleanup():
-                for container in docker.containers.list(
-                    all=True, filters={"ancestor": runner_image, "status": "exited"}
-                ):
-                    container.remove(force=True)
-
-            docker = DockerClient.getInstance()
-            schedule.every(1).minutes.do(cleanup)
-
-            class ScheduleThread(threading.Thread):
-                @classmethod
-                def run(cls):
-                    while threading.main_thread().is_alive():
-                        schedule.run_pending()
-                        time.sleep(1)
-
-            ScheduleThread().start()
-            TestExecutor.__CLEANUP.append(runner_image)
+            if TestExecutor.__REAPER is None:
+                TestExecutor.__REAPER = ContainerReaper()
+                TestExecutor.__REAPER.start()
+            TestExecutor.__REAPER.add_image(runner_image)
 
     @staticmethod
     def toggle_cleanup(enabled: bool):
         with TestExecutor.__CLEANUP_LOCK:
-            if not enabled:
-                schedule.clear()
-                TestExecutor.__CLEANUP.clear()
+            if not enabled and TestExecutor.__REAPER is not None:
+                TestExecutor.__REAPER.stop()
+                TestExecutor.__REAPER = None
             TestExecutor.__CLEANUP_ENABLED = enabled
 
+    def remove_warm_containers(self):
+        """
+        Removes the containers kept alive by the runs of the executor.
+        """
+        if not self.warm_containers:
+            return
+        client = DockerClient.getInstance()
+        for container in client.containers.list(
+            all=True, filters={"name": f"act-{self.warm_id}"}
+        ):
+            container.remove(v=True, force=True)
+        with TestExecutor.__CLEANUP_LOCK:
+            if TestExecutor.__REAPER is not None:
+                TestExecutor.__REAPER.unprotect(f"act-{self.warm_id}")
+
     def reset_repo(self):
         RepoStateManager.reset_to_commit(self.repo_clone, self.first_commit.id)
 
@@ -86,22 +183,51 @@ class TestExecutor:
         self,
         keep_containers: bool = False,
         offline: bool = False,
-        timeout: int = 10,
+        timeout: Optional[int] = None,
+        test_selection: Optional[TestSelection] = None,
     ) -> List[ActTestsRun]:
+        """
+        Args:
+            timeout (int): Timeout of each workflow in minutes. If None, the
+                timeout estimator gives the timeout of the repository (10
+                minutes without an estimator).
+            test_selection (TestSelection): If set, the workflows that support
+                filters only run the selected tests. If the test runners report
+                that the filters match no tests, the full suite is run instead
+                (the workflows of the runs are then not instrumented with the
+                selection, see ``GitHubWorkflow.test_selection_applied``).
+        """
         act_runs: List[ActTestsRun] = []
         default_actions = False
+        # The estimated timeouts change with each run, so they are not part of
+        # the keys of the runs (see ActRunCache)
+        key_timeout = timeout
+        if timeout is None and self.timeout_estimator is not None:
+            timeout = self.timeout_estimator.get_timeout(
+                get_repo_identity(self.repo_clone)
+            )
+        elif timeout is None:
+            timeout = 10
+            key_timeout = timeout
 
         # Cleanup act result dir
         RepoStateManager.clean_act_result_dir(self.repo_clone.workdir)
+        use_cache = self.run_cache is not None and not keep_containers
+        # The runs have no access to the server when they are offline
+        use_cache_server = self.cache_server is not None and not offline
+        if use_cache or self.run_store is not None:
+            tree_id = RepoStateManager.get_worktree_tree_id(self.repo_clone)
 
         test_actions = GitHubActions(
             self.repo_clone.workdir,
             self.language,
-            keep_containers=keep_containers,
+            keep_containers=keep_containers or self.warm_containers,
             runner_image=self.runner_image,
             offline=offline,
             base_image=self.base_image,
             instrument_workflows=self.instrument_workflows,
+            keep_cache_steps=use_cache_server,
+            test_selection=test_selection,
         )
 
         if len(test_actions.test_workflows) == 0 and self.default_actions is not None:
@@ -113,6 +239,12 @@ class TestExecutor:
                     ".github/workflows",
                     os.path.basename(workflow.path),
                 )
+                if test_selection is not None:
+                    # The default actions are shared by the executions
+                    new_workflow.doc = copy.deepcopy(workflow.doc)
+                    new_workflow.instrument_test_selection(
+                        test_selection, self.repo_clone.workdir
+                    )
                 test_actions.test_workflows.append(new_workflow)
 
         temp_workflow_path = None
@@ -124,34 +256,326 @@ class TestExecutor:
             test_actions = GitHubActions(
                 self.repo_clone.workdir,
                 self.language,
-                keep_containers=keep_containers,
+                keep_containers=keep_containers or self.warm_containers,
                 runner_image=self.runner_image,
                 offline=offline,
                 base_image=self.base_image,
                 instrument_workflows=self.instrument_workflows,
+                keep_cache_steps=use_cache_server,
+                test_selection=test_selection,
             )
 
+        use_build_cache = False
+        if self.build_cache and not offline and not keep_containers:
+            # Every workflow is instrumented, even if an earlier one has a cache
+            use_build_cache = any(
+                [
+                    workflow.instrument_build_cache(
+                        DependencyVolumeManager.BUILD_CACHE_PATH
+                    )
+                    for workflow in test_actions.test_workflows
+                ]
+            )
+
+        if self.warm_containers:
+            # The containers keep the files of the previous runs. The files of
+            # the current state are staged so that the clean step keeps them.
+            self.__stage_worktree()
+            for workflow in test_actions.test_workflows:
+                workflow.instrument_clean_workspace()
+
+        if self.toolchain_images:
+            test_actions.runner_image = RunnerImageBuilder.get_image(
+                [workflow.get_build_tool() for workflow in test_actions.test_workflows],
+                self.runner_image,
+            )
+        # The snapshots replace the runner image of the actions during the runs
+        runner_image = test_actions.runner_image
+
+        key, store_key = None, None
+        if use_cache:
+            key = ActRunCache.get_key(
+                tree_id,
+                test_actions.test_workflows,
+                runner_image,
+                offline,
+                default_actions,
+                key_timeout,
+            )
+        if self.run_store is not None:
+            # The stages run with different images and network settings, so
+            # the store only keys the runs by what is executed
+            store_key = RunStore.get_key(tree_id, test_actions.test_workflows)
+
+        # The dependencies in the volumes would not be part of kept containers
+        use_volumes = self.dependency_volumes and not offline and not keep_containers
+
+        def run() -> List[ActTestsRun]:
+            if self.snapshot_manager is not None and not keep_containers:
+                act_runs = self.__run_workflows_with_snapshot(
+                    test_actions,
+                    timeout,
+                    use_volumes,
+                    use_cache_server,
+                    use_build_cache,
+                )
+            else:
+                act_runs = self.__run_workflows(
+                    test_actions,
+                    timeout,
+                    use_volumes,
+                    use_cache_server,
+                    use_build_cache,
+                )
+            if self.run_store is not None:
+                self.run_store.add(
+                    store_key,
+                    act_runs,
+                    timeout=timeout,
+                    # Replaces the stored execution if it timed out
+                    execution=None if keep_containers else self.execution,
+                    commit=str(self.repo_clone.head.target),
+                    repo=get_repo_identity(self.repo_clone),
+                    tree=tree_id,
+                    runner_image=runner_image,
+                    offline=offline,
+                    default_actions=default_actions,
+                )
+            return act_runs
+
+        act_runs = None
+        if (
+            self.run_store is not None
+            and self.execution is not None
+            and not keep_containers
+        ):
+            act_runs = self.run_store.get(
+                store_key, self.execution, test_actions.test_workflows, timeout=timeout
+            )
+        if act_runs is None:
+            if use_cache:
+                act_runs = self.run_cache.get_or_run(key, run, timeout=timeout)
+            else:
+                act_runs = run()
+
+        if self.instrument_workflows and temp_workflow_path:
+            TemplateWorkflowManager.remove_temp_workflow(temp_workflow_path)
+
+        for act_run in act_runs:
+            act_run.default_actions = default_actions
+
+        if sum(len(act_run.tests) for act_run in act_runs) == 0 and any(
+            act_run.workflow.test_selection_applied
+            and act_run.workflow.has_no_selected_tests(
+                act_run.stdout + "\n" + act_run.stderr
+            )
+            for act_run in act_runs
+        ):
+            # The filters may select no tests (e.g. if the selected files only
+            # have helpers), which would not tell if the tests pass. Runs
+            # without tests for other reasons (e.g. compilation errors) would
+            # not have tests in the full suite either.
+            logging.info(
+                f"No tests selected in {self.repo_clone.workdir}, running the full suite"
+            )
+            return self.run_tests(
+                keep_containers=keep_containers, offline=offline, timeout=key_timeout
+            )
+
+        return act_runs
+
+    def __run_workflows(
+        self,
+        test_actions: GitHubActions,
+        timeout: int,
+        use_volumes: bool,
+        use_cache_server: bool,
+        use_build_cache: bool,
+    ) -> List[ActTestsRun]:
         act_runs: List[ActTestsRun] = []
+        volumes, env = [], {}
+        if use_volumes or use_build_cache:
+            volumes, env = DependencyVolumeManager.acquire(
+                self.repo_clone,
+                self.runner_image,
+                dependencies=use_volumes,
+                build_cache=use_build_cache,
+            )
+        if use_cache_server:
+            scope = hashlib.sha256(
+                get_repo_identity(self.repo_clone).encode("utf-8")
+            ).hexdigest()[:16]
+            env["ACTIONS_CACHE_URL"] = self.cache_server.get_url(scope)
+            # The token is not checked by the server, but actions/cache requires it
+            env["ACTIONS_RUNTIME_TOKEN"] = "gitbugactions"
 
         # Act creates names for the containers by hashing the content of the workflows
         # To avoid conflicts between threads, we randomize the name
         for workflow in test_actions.test_workflows:
-            workflow.doc["name"] = f"{workflow.doc['name']}-{str(uuid.uuid4())}"
+            if self.warm_containers:
+                if not workflow.doc["name"].startswith(self.warm_id):
+                    workflow.doc["name"] = f"{self.warm_id}-{workflow.doc['name']}"
+            else:
+                workflow.doc["name"] = f"{workflow.doc['name']}-{str(uuid.uuid4())}"
         test_actions.save_workflows()
 
-        for workflow in test_actions.test_workflows:
-            act_runs.append(
-                test_actions.run_workflow(workflow, self.act_cache_dir, timeout=timeout)
-            )
+        try:
+            if self.parallel_workflows > 1 and len(test_actions.test_workflows) > 1:
+                act_runs = self.__run_workflows_concurrently(
+                    test_actions, timeout, volumes, env
+                )
+            else:
+                for workflow in test_actions.test_workflows:
+                    act_runs.append(
+                        self.__run_workflow(
+                            test_actions,
+                            workflow,
+                            self.act_cache_dir,
+                            timeout,
+                            volumes,
+                            env,
+                        )
+                    )
+        finally:
+            DependencyVolumeManager.release(volumes)
 
         # Only delete the ones we have created
         if self.instrument_workflows:
             test_actions.delete_workflows()
 
-            if temp_workflow_path:
-                TemplateWorkflowManager.remove_temp_workflow(temp_workflow_path)
+        return act_runs
 
-        for act_run in act_runs:
-            act_run.default_actions = default_actions
+    def __run_workflows_concurrently(
+        self,
+        test_actions: GitHubActions,
+        timeout: int,
+        volumes: List[str],
+        env: Dict[str, str],
+    ) -> List[ActTestsRun]:
+        """
+        Runs the workflows at the same time. act writes the results of each run
+        to the repository, so every workflow but the first runs in a copy of the
+        repository with its own act cache dir. The runs are returned in the
+        order of the workflows.
+        """
+
+        def run(index: int, workflow: GitHubWorkflow) -> ActTestsRun:
+            if index == 0:
+                return self.__run_workflow(
+                    test_actions, workflow, self.act_cache_dir, timeout, volumes, env
+                )
+
+            # The paths are stable, so warm containers reuse their workspaces
+            repo_path = f"{os.path.normpath(self.repo_clone.workdir)}-{index}"
+            shutil.rmtree(repo_path, ignore_errors=True)
+            shutil.copytree(self.repo_clone.workdir, repo_path, symlinks=True)
+            workflow_actions = copy.copy(test_actions)
+            workflow_actions.repo_path = repo_path
+            act_cache_dir = ActCacheDirManager.acquire_act_cache_dir()
+            try:
+                return self.__run_workflow(
+                    workflow_actions, workflow, act_cache_dir, timeout, volumes, env
+                )
+            finally:
+                ActCacheDirManager.return_act_cache_dir(act_cache_dir)
+                shutil.rmtree(repo_path, ignore_errors=True)
+
+        with ThreadPoolExecutor(max_workers=self.parallel_workflows) as executor:
+            futures = [
+                executor.submit(run, index, workflow)
+                for index, workflow in enumerate(test_actions.test_workflows)
+            ]
+            return [future.result() for future in futures]
 
+    def __run_workflows_with_snapshot(
+        self,
+        test_actions: GitHubActions,
+        timeout: int,
+        use_volumes: bool,
+        use_cache_server: bool,
+        use_build_cache: bool,
+    ) -> List[ActTestsRun]:
+        runner_image = test_actions.runner_image
+        key = self.snapshot_manager.get_key(
+            self.repo_clone, test_actions.test_workflows, runner_image=runner_image
+        )
+        snapshot = self.snapshot_manager.get_image(key)
+        if snapshot is not None:
+            test_actions.runner_image = snapshot
+            return self.__run_workflows(
+                test_actions, timeout, use_volumes, use_cache_server, use_build_cache
+            )
+        elif not self.snapshot_manager.acquire(key):
+            return self.__run_workflows(
+                test_actions, timeout, use_volumes, use_cache_server, use_build_cache
+            )
+
+        # The containers are kept until they are snapshotted
+        test_actions.keep_containers = True
+        try:
+            act_runs = self.__run_workflows(
+                test_actions, timeout, use_volumes, use_cache_server, use_build_cache
+            )
+            self.snapshot_manager.create(
+                key,
+                act_runs,
+                self.repo_clone.workdir,
+                runner_image=runner_image,
+            )
+        finally:
+            self.snapshot_manager.release(key)
+            if not self.warm_containers:
+                client = DockerClient.getInstance()
+                for workflow in test_actions.test_workflows:
+                    for container in client.containers.list(
+                        all=True,
+                        filters=Act.get_run_filters(self.__get_run_id(workflow)),
+                    ):
+                        container.remove(v=True, force=True)
         return act_runs
+
+    def __run_workflow(
+        self,
+        test_actions: GitHubActions,
+        workflow: GitHubWorkflow,
+        act_cache_dir: str,
+        timeout: int,
+        volumes: List[str],
+        env: Dict[str, str],
+    ) -> ActTestsRun:
+        def run() -> ActTestsRun:
+            return test_actions.run_workflow(
+                workflow,
+                act_cache_dir,
+                timeout=timeout,
+                volumes=volumes,
+                env=env,
+                idle_timeout=self.idle_timeout,
+                run_id=self.__get_run_id(workflow),
+            )
+
+        repo = get_repo_identity(self.repo_clone)
+        if self.admission_controller is None:
+            act_run = run()
+        else:
+            with self.admission_controller.admit(repo):
+                act_run = run()
+            self.admission_controller.record(repo, act_run.peak_memory)
+        # 124 is the return code for the timeout
+        if self.timeout_estimator is not None and act_run.return_code != 124:
+            self.timeout_estimator.record(repo, act_run.elapsed_time)
+        return act_run
+
+    @staticmethod
+    def __get_run_id(workflow: GitHubWorkflow) -> str:
+        """
+        Returns the id of the run of the workflow in the labels of its
+        containers. The names of the workflows are unique to each run (or to
+        the executor, with warm containers), so the ids are too.
+        """
+        return hashlib.sha256(workflow.doc["name"].encode("utf-8")).hexdigest()[:16]
+
+    def __stage_worktree(self):
+        subprocess.run(
+            ["git", "add", "-A"], cwd=self.repo_clone.workdir, capture_output=True
+        )
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+from typing import Any, Optional
+
+import zstandard
+
+
+class BlobStore:
+    """
+    Content-addressed store of large texts (e.g. the output of the runs and of
+    each test). The texts are compressed and identified by the SHA-256 of their
+    content, so identical outputs (e.g. of repeated executions) are stored once.
+
+    Texts are replaced by references with the format
+    ``{"blob": <sha256>, "size": <length>, "preview": <start of the text>}``.
+    ``resolve`` accepts both references and inline texts, so data written with
+    and without a store can be read in the same way.
+
+    The texts are compressed with zstd.
+    """
+
+    __PREVIEW_SIZE = 256
+
+    def __init__(self, path: str, min_size: int = 1024):
+        """
+        Args:
+            path (str): Directory of the store.
+            min_size (int): Texts shorter than this are kept inline.
+        """
+        self.path = path
+        self.min_size = min_size
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def is_ref(value: Any) -> bool:
+        return isinstance(value, dict) and "blob" in value
+
+    def __get_blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], f"{digest[2:]}.zst")
+
+    def put(self, text: str) -> str:
+        """
+        Stores a text.
+
+        Returns:
+            str: SHA-256 of the text, used to read it with ``get``.
+        """
+        content = text.encode("utf-8", errors="replace")
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self.__get_blob_path(digest)
+        if os.path.exists(blob_path):
+            return digest
+
+        compressed = zstandard.ZstdCompressor(level=10).compress(content)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Written to a temporary file first, so readers never see partial blobs
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(compressed)
+        os.replace(temp_path, blob_path)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """
+        Reads a text stored with ``put``.
+        """
+        with open(self.__get_blob_path(digest), "rb") as f:
+            content = zstandard.ZstdDecompressor().decompress(f.read())
+        return content.decode("utf-8")
+
+    def to_ref(self, text: Optional[str]) -> Any:
+        """
+        Returns a reference to the text, or the text itself if it is short.
+        """
+        if text is None or len(text) < self.min_size:
+            return text
+        return {
+            "blob": self.put(text),
+            "size": len(text),
+            "preview": text[: BlobStore.__PREVIEW_SIZE],
+        }
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Returns the text of a reference. Other values are returned unchanged.
+        """
+        if BlobStore.is_ref(value):
+            return self.get(value["blob"])
+        return value
+
+    @staticmethod
+    def get_preview(value: Any) -> Any:
+        """
+        Returns the start of the text of a reference without reading the blob.
+        Other values are returned unchanged.
+        """
+        if BlobStore.is_ref(value):
+            return value["preview"]
+        return value
+
+    def resolve_all(self, data: Any) -> Any:
+        """
+        Returns a copy of the data (e.g. a bug read from the results) with every
+        reference replaced by its text.
+        """
+        if BlobStore.is_ref(data):
+            return self.get(data["blob"])
+        elif isinstance(data, dict):
+            return {key: self.resolve_all(value) for key, value in data.items()}
+        elif isinstance(data, list):
+            return [self.resolve_all(value) for value in data]
+        return data
@@ -1,9 +1,10 @@
 import os
+import re
+import threading
 from enum import Enum
-from typing import List
+from typing import Dict, List, Optional, Pattern, Tuple
 
 from unidiff import PatchSet
-import re
 
 
 class FileType(Enum):
@@ -24,55 +25,177 @@ def get_patch_file_extensions(patch: PatchSet) -> List[str]:
     )
 
 
-def get_file_type(language: str, file_path: str) -> FileType:
-    language_extensions = {
-        "java": {"java"},
-        "python": {"py"},
-        "go": {"go"},
-        "javascript": {"js", "cjs", "mjs", "jsx"},
-        "rust": {"rs"},
-        "typescript": {"ts", "tsx"},
-        "c#": {"cs"},
-        "c++": {"cpp", "cc", "cxx", "hpp", "hh", "hxx", "c", "h"},
-        "c": {"cpp", "cc", "cxx", "hpp", "hh", "hxx", "c", "h"},
+class FileClassifier:
+    """
+    Classifies the files of a repository as source, tests or non-source files.
+
+    The language tables are built once per language and each path is only
+    classified once, so a classifier can be reused for every diff of a repo.
+    Rules derived from the build tools of the repo (e.g. Maven's ``src/test``)
+    can be added to improve the detection of test files.
+    """
+
+    __LANGUAGE_EXTENSIONS = {
+        "java": frozenset({"java"}),
+        "python": frozenset({"py"}),
+        "go": frozenset({"go"}),
+        "javascript": frozenset({"js", "cjs", "mjs", "jsx"}),
+        "rust": frozenset({"rs"}),
+        "typescript": frozenset({"ts", "tsx"}),
+        "c#": frozenset({"cs"}),
+        "c++": frozenset({"cpp", "cc", "cxx", "hpp", "hh", "hxx", "c", "h"}),
+        "c": frozenset({"cpp", "cc", "cxx", "hpp", "hh", "hxx", "c", "h"}),
     }
-    test_keywords = {
-        "test",
-        "tests",
-        "__tests__",
-        "Test",
-        "Tests",
-        "unittest",
-        "unittests",
+    __TEST_KEYWORDS = frozenset(
+        {
+            "test",
+            "tests",
+            "__tests__",
+            "Test",
+            "Tests",
+            "unittest",
+            "unittests",
+        }
+    )
+    __TEST_KEYWORDS_LANGUAGES = frozenset(
+        {"java", "python", "javascript", "rust", "typescript", "c#", "c++", "c"}
+    )
+    __LANGUAGE_TEST_PATTERNS = {
+        "go": re.compile(r"_test\.go"),
+        "javascript": re.compile(r"\.test\.js"),
+        "typescript": re.compile(r"\.test\.ts"),
+        "c++": re.compile(r"(\.test|_test)\.(cpp|c|cc|cxx|hpp|hxx)$"),
+        "c": re.compile(r"(\.test|_test)\.(cpp|c|cc|cxx|hpp|hxx)$"),
     }
+    # Test paths used by the build tools. The rules are only used if the
+    # build tool is detected in the repository.
+    __BUILD_TOOL_TEST_RULES = {
+        # Maven and Gradle keep the tests in src/test (e.g. src/test/kotlin)
+        "maven": r"(^|/)src/test/",
+        "gradle": r"(^|/)src/test/",
+        # Cargo's integration tests and benchmarks
+        "cargo": r"(^|/)(tests|benches)/",
+        "go": r"_test\.go$",
+        # Jest, Mocha and Vitest test files
+        "npm": r"(^|/)__tests__/|\.(test|spec)\.[cm]?[jt]sx?$",
+        # Pytest's test discovery
+        "python": r"(^|/)(test_[^/]*|[^/]*_test)\.py$",
+    }
+    __BUILD_TOOL_FILES = {
+        "maven": ["pom.xml"],
+        "gradle": ["build.gradle", "build.gradle.kts", "settings.gradle"],
+        "cargo": ["Cargo.toml"],
+        "go": ["go.mod"],
+        "npm": ["package.json"],
+        "python": ["pyproject.toml", "setup.py", "setup.cfg", "pytest.ini"],
+    }
+    # Max number of paths cached by each classifier
+    __CACHE_SIZE = 100000
+
+    __CLASSIFIERS: Dict[str, "FileClassifier"] = {}
+    __CLASSIFIERS_LOCK = threading.Lock()
+
+    def __init__(self, language: str, test_rules: Optional[List[str]] = None):
+        """
+        Args:
+            language (str): Language of the repository.
+            test_rules (List[str]): Regexes that match paths of test files.
+        """
+        self.language = language
+        self.extensions = FileClassifier.__LANGUAGE_EXTENSIONS[language]
+        self.use_keywords = language in FileClassifier.__TEST_KEYWORDS_LANGUAGES
+        self.language_test_pattern = FileClassifier.__LANGUAGE_TEST_PATTERNS.get(
+            language
+        )
+        self.test_rules: Optional[Pattern] = (
+            re.compile("|".join(f"(?:{rule})" for rule in test_rules))
+            if test_rules
+            else None
+        )
+        self.__cache: Dict[str, FileType] = {}
 
-    if language in [
-        "java",
-        "python",
-        "javascript",
-        "rust",
-        "typescript",
-        "c#",
-        "c++",
-        "c",
-    ]:
-        if any([keyword in file_path.split(os.sep) for keyword in test_keywords]):
-            return FileType.TESTS
-    if language in ["go"]:
-        if "_test.go" in file_path:
-            return FileType.TESTS
-    if language in ["javascript"]:
-        if ".test.js" in file_path:
-            return FileType.TESTS
-    if language in ["typescript"]:
-        if ".test.ts" in file_path:
-            return FileType.TESTS
-    if language in ["c", "c++"] and file_path != "/dev/null":
-        cpp_test_pattern = re.compile(r"(\.test|_test)\.(cpp|c|cc|cxx|hpp|hxx)$")
-        if cpp_test_pattern.search(file_path):
-            return FileType.TESTS
-
-    if get_file_extension(file_path) in language_extensions[language]:
-        return FileType.SOURCE
-    else:
-        return FileType.NON_SOURCE
+    @staticmethod
+    def for_language(language: str) -> "FileClassifier":
+        """
+        Returns the shared classifier (without repo-derived rules) of a language.
+        """
+        with FileClassifier.__CLASSIFIERS_LOCK:
+            if language not in FileClassifier.__CLASSIFIERS:
+                FileClassifier.__CLASSIFIERS[language] = FileClassifier(language)
+            return FileClassifier.__CLASSIFIERS[language]
+
+    @staticmethod
+    def detect_test_rules(repo_path: str) -> List[str]:
+        """
+        Detects the build tools used in the repository and returns the
+        rules that match their test files.
+        """
+        rules = []
+        for build_tool, files in FileClassifier.__BUILD_TOOL_FILES.items():
+            if any(os.path.exists(os.path.join(repo_path, file)) for file in files):
+                rule = FileClassifier.__BUILD_TOOL_TEST_RULES[build_tool]
+                if rule not in rules:
+                    rules.append(rule)
+        return rules
+
+    @staticmethod
+    def for_repo(language: str, repo_path: str) -> "FileClassifier":
+        """
+        Builds a classifier for a repository with the rules of its build tools.
+        """
+        return FileClassifier(language, FileClassifier.detect_test_rules(repo_path))
+
+    def __classify(self, file_path: str) -> FileType:
+        if file_path != "/dev/null":
+            if self.test_rules is not None and self.test_rules.search(file_path):
+                return FileType.TESTS
+            if self.use_keywords and not FileClassifier.__TEST_KEYWORDS.isdisjoint(
+                file_path.split(os.sep)
+            ):
+                return FileType.TESTS
+            if self.language_test_pattern is not None and (
+                self.language_test_pattern.search(file_path)
+            ):
+                return FileType.TESTS
+
+        if get_file_extension(file_path) in self.extensions:
+            return FileType.SOURCE
+        else:
+            return FileType.NON_SOURCE
+
+    def classify(self, file_path: str) -> FileType:
+        file_type = self.__cache.get(file_path)
+        if file_type is None:
+            file_type = self.__classify(file_path)
+            if len(self.__cache) >= FileClassifier.__CACHE_SIZE:
+                self.__cache.clear()
+            self.__cache[file_path] = file_type
+        return file_type
+
+    def classify_patch(self, patch: PatchSet) -> Tuple[PatchSet, PatchSet, PatchSet]:
+        """
+        Splits a patch into the source, tests and non-source patches.
+
+        Returns:
+            Tuple[PatchSet, PatchSet, PatchSet]: The bug patch, the test patch
+                and the non-code patch.
+        """
+        bug_patch: PatchSet = PatchSet("")
+        test_patch: PatchSet = PatchSet("")
+        non_code_patch: PatchSet = PatchSet("")
+
+        for p in patch:
+            source_type = self.classify(p.source_file)
+            target_type = self.classify(p.target_file)
+            if FileType.TESTS in (source_type, target_type):
+                test_patch.append(p)
+            elif FileType.SOURCE in (source_type, target_type):
+                bug_patch.append(p)
+            else:
+                non_code_patch.append(p)
+
+        return bug_patch, test_patch, non_code_patch
+
+
+def get_file_type(language: str, file_path: str) -> FileType:
+    return FileClassifier.for_language(language).classify(file_path)
@@ -1,6 +1,7 @@
 import os
 import shutil
 import subprocess
+import tempfile
 import logging
 from typing import Optional
 
@@ -54,3 +55,33 @@ class RepoStateManager:
 
         # Always clean untracked files
         RepoStateManager.clean_untracked_files(repo)
+
+    @staticmethod
+    def get_worktree_tree_id(repo: pygit2.Repository) -> str:
+        """
+        Returns the id of the git tree that represents the current state of the
+        working tree (tracked and untracked files, ignoring the .gitignore'd ones).
+
+        A temporary index is used, so the index of the repository is not changed.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            index_path = os.path.join(temp_dir, "index")
+            # Starting from the repo's index avoids hashing the unchanged files again
+            if os.path.exists(os.path.join(repo.path, "index")):
+                shutil.copyfile(os.path.join(repo.path, "index"), index_path)
+            env = dict(os.environ, GIT_INDEX_FILE=index_path)
+            subprocess.run(
+                ["git", "add", "-A"],
+                cwd=repo.workdir,
+                env=env,
+                capture_output=True,
+                check=True,
+            )
+            run = subprocess.run(
+                ["git", "write-tree"],
+                cwd=repo.workdir,
+                env=env,
+                capture_output=True,
+                check=True,
+            )
+            return run.stdout.decode("utf-8").strip()
@@ -54,3 +54,27 @@ def git_clean(repo: pygit2.Repository, force=True):
                     os.remove(full_path)
             except Exception as e:
                 logging.error(f"Error removing {full_path}: {e}")
+
+
+def get_repo_identity(repo: pygit2.Repository) -> str:
+    """
+    Returns a string that identifies the repository across clones: the url of
+    its origin remote or, if it has no origin, the path of its working tree.
+    """
+    try:
+        url = repo.remotes["origin"].url
+    except (KeyError, ValueError):
+        url = None
+    if not url:
+        return os.path.abspath(repo.workdir)
+    return normalize_repo_url(url)
+
+
+def normalize_repo_url(url: str) -> str:
+    """
+    Returns the identity of a repository from its clone url (see
+    ``get_repo_identity``).
+    """
+    # The same repository can be cloned with and without the .git suffix
+    url = url.rstrip("/")
+    return url[: -len(".git")] if url.endswith(".git") else url
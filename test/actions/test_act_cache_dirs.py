@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from gitbugactions.actions.action import Action
+from gitbugactions.actions.actions import ActCacheDirManager
+
+
+@pytest.fixture(autouse=True)
+def act_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(
+        ActCacheDirManager,
+        "_ActCacheDirManager__DEFAULT_CACHE_DIR",
+        str(tmp_path / "act-cache" / "default"),
+    )
+    monkeypatch.setattr(ActCacheDirManager, "_ActCacheDirManager__ACTIONS", set())
+    store = Mock()
+    store.get.side_effect = lambda action: str(tmp_path / "store" / action.repo)
+    monkeypatch.setattr(ActCacheDirManager, "_ActCacheDirManager__ACTION_STORE", store)
+    yield
+    ActCacheDirManager.init_act_cache_dirs(0)
+
+
+def create_action(name: str) -> Action:
+    return Action(f"actions/{name}@v4")
+
+
+def test_fifo():
+    ActCacheDirManager.init_act_cache_dirs(1)
+    cache_dir = ActCacheDirManager.acquire_act_cache_dir()
+
+    acquired = []
+
+    def acquire(name: str):
+        acquired.append((name, ActCacheDirManager.acquire_act_cache_dir()))
+
+    threads = []
+    for name in ("first", "second"):
+        threads.append(threading.Thread(target=acquire, args=(name,)))
+        threads[-1].start()
+        time.sleep(0.05)
+    assert acquired == []
+
+    ActCacheDirManager.return_act_cache_dir(cache_dir)
+    threads[0].join(5)
+    assert acquired == [("first", cache_dir)]
+    ActCacheDirManager.return_act_cache_dir(cache_dir)
+    threads[1].join(5)
+    assert acquired[1] == ("second", cache_dir)
+
+
+def test_timeout():
+    ActCacheDirManager.init_act_cache_dirs(1)
+    cache_dir = ActCacheDirManager.acquire_act_cache_dir()
+    ActCacheDirManager.cache_action(create_action("checkout"))
+
+    temp_dir = ActCacheDirManager.acquire_act_cache_dir(timeout=0.05)
+    assert temp_dir != cache_dir
+    # Temporary dirs are also populated with the actions
+    assert os.path.islink(os.path.join(temp_dir, "act", "actions-checkout@v4"))
+    ActCacheDirManager.return_act_cache_dir(temp_dir)
+    assert not os.path.exists(temp_dir)
+    ActCacheDirManager.return_act_cache_dir(cache_dir)
+
+
+def test_populate():
+    ActCacheDirManager.init_act_cache_dirs(1)
+    ActCacheDirManager.cache_action(create_action("checkout"))
+    ActCacheDirManager.set_pool_size(2)
+    ActCacheDirManager.cache_action(create_action("setup-python"))
+
+    cache_dirs = [ActCacheDirManager.acquire_act_cache_dir() for _ in range(2)]
+    for cache_dir in cache_dirs:
+        assert sorted(os.listdir(os.path.join(cache_dir, "act"))) == [
+            "actions-checkout@v4",
+            "actions-setup-python@v4",
+        ]
+
+    # Dirs returned after the pool shrinks are deleted
+    ActCacheDirManager.set_pool_size(1)
+    for cache_dir in cache_dirs:
+        ActCacheDirManager.return_act_cache_dir(cache_dir)
+    assert sum(os.path.exists(cache_dir) for cache_dir in cache_dirs) == 1
@@ -0,0 +1,67 @@
+import os
+
+from gitbugactions.actions.action import Action
+from gitbugactions.actions.python.pytest_workflow import PytestWorkflow
+
+COMPOSITE_ACTION = """name: Setup
+runs:
+  using: composite
+  steps:
+    - uses: actions/setup-python@v4
+    - uses: ./local-action
+    - run: pip install tox
+      shell: bash
+"""
+
+REUSABLE_WORKFLOW = """name: Tests
+on: workflow_call
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v3
+      - uses: docker://alpine:3.18
+  lint:
+    uses: owner/shared/.github/workflows/lint.yml@main
+"""
+
+
+def test_get_uses():
+    workflow = PytestWorkflow("tests.yml", REUSABLE_WORKFLOW)
+    assert Action.get_uses(workflow.doc) == [
+        "owner/shared/.github/workflows/lint.yml@main",
+        "actions/checkout@v3",
+    ]
+    assert {action.declaration for action in workflow.get_actions()} == {
+        "owner/shared/.github/workflows/lint.yml@main",
+        "actions/checkout@v3",
+    }
+
+
+def test_get_dependencies(tmp_path):
+    action_dir = str(tmp_path / "action")
+    os.makedirs(os.path.join(action_dir, "setup"))
+    with open(os.path.join(action_dir, "setup", "action.yaml"), "w") as f:
+        f.write(COMPOSITE_ACTION)
+    action = Action("owner/action/setup@v1")
+    assert [
+        dependency.declaration for dependency in action.get_dependencies(action_dir)
+    ] == ["actions/setup-python@v4"]
+
+    os.makedirs(os.path.join(action_dir, ".github", "workflows"))
+    with open(os.path.join(action_dir, ".github", "workflows", "tests.yml"), "w") as f:
+        f.write(REUSABLE_WORKFLOW)
+    workflow = Action("owner/action/.github/workflows/tests.yml@v1")
+    assert workflow.is_reusable_workflow()
+    assert len(workflow.get_dependencies(action_dir)) == 2
+
+    # Actions that are not composite have no dependencies
+    assert Action("owner/action@v1").get_dependencies(action_dir) == []
+
+
+def test_get_cache_names():
+    assert Action("actions/checkout@v3").get_cache_names() == ["actions-checkout@v3"]
+    assert Action("owner/shared/.github/workflows/lint.yml@main").get_cache_names() == [
+        "owner-shared@main",
+        "owner-shared-.github-workflows-lint.yml@main",
+    ]
@@ -0,0 +1,71 @@
+import os
+import subprocess
+from unittest.mock import PropertyMock
+
+import pytest
+
+from gitbugactions.actions.action import Action
+from gitbugactions.actions.action_store import ActionStore
+
+
+def git(path: str, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@test", *args],
+        cwd=path,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def remote(tmp_path, mocker):
+    path = str(tmp_path / "remote")
+    os.makedirs(path)
+    git(path, "init", "-q")
+    for version in ("1", "2"):
+        with open(os.path.join(path, "action.yml"), "w") as f:
+            f.write(f"name: action {version}\n")
+        git(path, "add", "action.yml")
+        git(path, "commit", "-q", "-m", f"version {version}")
+    git(path, "tag", "v1", "HEAD~1")
+    git(path, "tag", "-a", "v2", "-m", "v2")
+    git(path, "tag", "v2.0.0")
+    mocker.patch.object(
+        Action, "url", new_callable=PropertyMock, return_value=f"file://{path}"
+    )
+    return path
+
+
+def test_resolve_ref(remote):
+    assert Action("owner/action@v2").resolve_ref() == git(remote, "rev-parse", "HEAD")
+    assert Action("owner/action@main").resolve_ref() is None
+
+
+def test_get(tmp_path, remote):
+    store = ActionStore(str(tmp_path / "store"))
+    v2 = store.get(Action("owner/action@v2"))
+    # Tags of the same commit are stored once
+    assert store.get(Action("owner/action@v2.0.0")) == v2
+    assert os.path.basename(v2) == git(remote, "rev-parse", "HEAD")
+    assert git(v2, "rev-parse", "v2.0.0") == git(remote, "rev-parse", "HEAD")
+    assert os.path.exists(os.path.join(v2, ".git", "shallow"))
+
+    v1 = store.get(Action("owner/action@v1"))
+    assert v1 != v2
+    with open(os.path.join(v1, "action.yml")) as f:
+        assert f.read() == "name: action 1\n"
+
+
+def test_export_import(tmp_path, remote, mocker):
+    store = ActionStore(str(tmp_path / "store"))
+    action_dir = store.get(Action("owner/action@v2"))
+    store.export_archive(str(tmp_path / "actions.tar.gz"))
+
+    new_store = ActionStore(str(tmp_path / "new_store"))
+    new_store.import_archive(str(tmp_path / "actions.tar.gz"))
+    # The imported refs are not resolved again
+    resolve_ref = mocker.patch.object(Action, "resolve_ref")
+    new_action_dir = new_store.get(Action("owner/action@v2"))
+    assert os.path.basename(new_action_dir) == os.path.basename(action_dir)
+    resolve_ref.assert_not_called()
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from gitbugactions.actions.admission import AdmissionController
+
+GB = 1024**3
+
+
+@pytest.fixture
+def host(mocker):
+    host = {"total": 16 * GB, "available": 16 * GB, "load": 0.0}
+    mocker.patch.object(
+        AdmissionController,
+        "get_host_memory",
+        side_effect=lambda: {"total": host["total"], "available": host["available"]},
+    )
+    mocker.patch.object(
+        AdmissionController, "get_load", side_effect=lambda: host["load"]
+    )
+    return host
+
+
+def test_parse_memory():
+    assert AdmissionController.parse_memory("7g") == 7 * GB
+    assert AdmissionController.parse_memory("512m") == 512 * 1024**2
+    assert AdmissionController.parse_memory("1.5GB") == int(1.5 * GB)
+    with pytest.raises(ValueError):
+        AdmissionController.parse_memory("a lot")
+
+
+def test_estimate():
+    controller = AdmissionController(7 * GB, margin=1.5, min_memory=GB)
+    # Repos without previous runs are estimated with the memory limit
+    assert controller.get_estimate("small") == 7 * GB
+    controller.load_history([{"repo": "small", "peak_memory": 100}, {"key": "x"}])
+    controller.record("heavy", 6 * GB)
+    assert controller.get_estimate("small") == GB
+    assert controller.get_estimate("heavy") == 7 * GB
+
+
+def test_small_repos_run_in_parallel(host):
+    controller = AdmissionController(7 * GB, reserved_memory=2 * GB, poll_interval=0.01)
+    controller.record("small", GB)
+    controller.record("heavy", 7 * GB)
+
+    # 14GB can be reserved: 1 heavy run and 5 small runs (1.25GB each)
+    tickets = [controller.acquire("heavy")]
+    for _ in range(5):
+        tickets.append(controller.acquire("small"))
+
+    admitted = threading.Event()
+    thread = threading.Thread(
+        target=lambda: (controller.acquire("small"), admitted.set())
+    )
+    thread.start()
+    assert not admitted.wait(0.1)
+    controller.release(tickets[0])
+    assert admitted.wait(5)
+    thread.join()
+
+
+def test_host_resources(host):
+    controller = AdmissionController(GB, reserved_memory=GB, poll_interval=0.01)
+    ticket = controller.acquire("repo")
+
+    admitted = threading.Event()
+    thread = threading.Thread(
+        target=lambda: (controller.acquire("repo"), admitted.set())
+    )
+    host["available"] = GB
+    host["load"] = 2.0
+    thread.start()
+    assert not admitted.wait(0.1)
+    host["available"] = 4 * GB
+    assert not admitted.wait(0.1)
+    host["load"] = 0.5
+    assert admitted.wait(5)
+    thread.join()
+    controller.release(ticket)
+
+
+def test_first_run_is_always_admitted(host):
+    host["available"] = 0
+    controller = AdmissionController(7 * GB)
+    with controller.admit("repo"):
+        pass
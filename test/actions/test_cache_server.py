@@ -0,0 +1,121 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from gitbugactions.actions.cache_server import ActionsCacheServer
+
+
+@pytest.fixture
+def cache_server(tmp_path):
+    server = ActionsCacheServer(str(tmp_path), host="127.0.0.1")
+    server.start()
+    yield server
+    server.stop()
+
+
+def request(url: str, method: str = "GET", data=None, headers={}):
+    if isinstance(data, dict):
+        data = json.dumps(data).encode("utf-8")
+        headers = {**headers, "Content-Type": "application/json"}
+    req = urllib.request.Request(url, data=data, method=method, headers=headers)
+    with urllib.request.urlopen(req) as response:
+        return response.status, response.read()
+
+
+def save(url: str, key: str, content: bytes):
+    api = url + "_apis/artifactcache/"
+    _, body = request(api + "caches", "POST", {"key": key, "version": "v1"})
+    cache_id = json.loads(body)["cacheId"]
+    # Uploaded in two chunks
+    request(
+        api + f"caches/{cache_id}",
+        "PATCH",
+        content[2:],
+        {"Content-Range": f"bytes 2-{len(content) - 1}/*"},
+    )
+    request(
+        api + f"caches/{cache_id}",
+        "PATCH",
+        content[:2],
+        {"Content-Range": "bytes 0-1/*"},
+    )
+    request(api + f"caches/{cache_id}", "POST", {"size": len(content)})
+
+
+def restore(url: str, keys: str):
+    status, body = request(url + f"_apis/artifactcache/cache?keys={keys}&version=v1")
+    if status == 204:
+        return None
+    _, content = request(json.loads(body)["archiveLocation"])
+    return content
+
+
+def test_save_and_restore(cache_server):
+    url = cache_server.get_url("owner-repo", host="127.0.0.1")
+    save(url, "deps-linux-abc", b"first")
+    save(url, "deps-linux-def", b"second")
+
+    assert restore(url, "deps-linux-abc") == b"first"
+    # Restore keys match the most recent cache with the prefix
+    assert restore(url, "deps-linux-xyz,deps-linux-") == b"second"
+    # The first key must match exactly
+    assert restore(url, "deps-linux-") is None
+
+    # The caches are scoped by repository
+    other_url = cache_server.get_url("owner-other", host="127.0.0.1")
+    assert restore(other_url, "deps-linux-abc") is None
+
+    # A cache cannot be saved twice
+    with pytest.raises(urllib.error.HTTPError) as e:
+        request(
+            url + "_apis/artifactcache/caches",
+            "POST",
+            {"key": "deps-linux-abc", "version": "v1"},
+        )
+    assert e.value.code == 409
+
+
+def test_persistence_and_eviction(tmp_path):
+    server = ActionsCacheServer(
+        str(tmp_path), host="127.0.0.1", max_size_gb=10 / 1024**3
+    )
+    server.start()
+    url = server.get_url("owner-repo", host="127.0.0.1")
+    save(url, "first", b"123456")
+    save(url, "second", b"123456")
+    server.stop()
+
+    # Only the most recent cache fits in the size budget
+    server = ActionsCacheServer(str(tmp_path), host="127.0.0.1")
+    server.start()
+    url = server.get_url("owner-repo", host="127.0.0.1")
+    assert restore(url, "first") is None
+    assert restore(url, "second") == b"123456"
+    server.stop()
+
+
+def test_expired_upload(tmp_path):
+    server = ActionsCacheServer(str(tmp_path), host="127.0.0.1", upload_timeout=0)
+    server.start()
+    api = server.get_url("owner-repo", host="127.0.0.1") + "_apis/artifactcache/"
+    # The run is stopped before the cache is committed
+    status, _ = request(api + "caches", "POST", {"key": "deps", "version": "v1"})
+    assert status == 201
+
+    # The key can be saved again once the upload expires
+    save(server.get_url("owner-repo", host="127.0.0.1"), "deps", b"123456")
+    assert restore(server.get_url("owner-repo", host="127.0.0.1"), "deps") == (
+        b"123456"
+    )
+    assert len(server.entries) == 1
+    server.stop()
+
+
+def test_default_host(tmp_path, mocker):
+    # The server only listens on the address given to the runs
+    mocker.patch.object(ActionsCacheServer, "get_docker_host", return_value="127.0.0.1")
+    server = ActionsCacheServer(str(tmp_path))
+    assert server.httpd.server_address[0] == "127.0.0.1"
+    server.httpd.server_close()
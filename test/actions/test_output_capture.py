@@ -0,0 +1,48 @@
+import io
+import subprocess
+import sys
+
+from gitbugactions.actions.output_capture import OutputCapture
+
+
+def test_head_and_tail(tmp_path):
+    log_path = str(tmp_path / "stdout.log")
+    lines = []
+    capture = OutputCapture(
+        "stdout",
+        head_size=10,
+        tail_size=16,
+        log_path=log_path,
+        hooks=[lambda stream, line: lines.append((stream, line))],
+    )
+    output = "".join(f"line {i}\n" for i in range(100))
+    capture.read(io.BytesIO(output.encode("utf-8")))
+
+    text = capture.get_text()
+    assert text.startswith("line 0\nlin")
+    assert text.endswith("line 98\nline 99\n")
+    assert "characters omitted" in text
+    assert capture.size == len(output)
+    # The log file and the hooks get the full output
+    assert open(log_path).read() == output
+    assert len(lines) == 100 and lines[0] == ("stdout", "line 0\n")
+
+
+def test_invalid_utf8():
+    capture = OutputCapture("stderr", head_size=1024, tail_size=1024)
+    capture.read(io.BytesIO(b"ok \xff\xfe\n\xe2\x9c\x85 done"))
+    assert capture.get_text() == "ok ��\n✅ done"
+
+
+def test_process_output():
+    process = subprocess.Popen(
+        [sys.executable, "-c", "print('x' * 200000)"], stdout=subprocess.PIPE
+    )
+    capture = OutputCapture("stdout", head_size=100, tail_size=100)
+    thread = capture.start(process.stdout)
+    assert process.wait() == 0
+    thread.join()
+
+    # Long lines are split, so only the head and the tail are kept
+    assert capture.size == 200001
+    assert len(capture.get_text()) < 300
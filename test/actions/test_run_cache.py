@@ -0,0 +1,121 @@
+import os
+import subprocess
+import threading
+import time
+from unittest.mock import Mock
+
+import pygit2
+from junitparser import Failure, TestCase
+
+from gitbugactions.actions.actions import ActTestsRun
+from gitbugactions.actions.run_cache import ActRunCache
+from gitbugactions.actions.workflow_factory import GitHubWorkflowFactory
+from gitbugactions.utils.repo_state_manager import RepoStateManager
+
+
+def test_worktree_tree_id(tmp_path):
+    repo_path = str(tmp_path)
+    subprocess.run(["git", "init", "-q"], cwd=repo_path, check=True)
+    with open(os.path.join(repo_path, "main.py"), "w") as f:
+        f.write("print(1)\n")
+    repo = pygit2.Repository(os.path.join(repo_path, ".git"))
+
+    tree_id = RepoStateManager.get_worktree_tree_id(repo)
+    assert tree_id == RepoStateManager.get_worktree_tree_id(repo)
+    # The index of the repository is not changed
+    assert len(repo.index) == 0
+
+    with open(os.path.join(repo_path, "main.py"), "w") as f:
+        f.write("print(2)\n")
+    assert tree_id != RepoStateManager.get_worktree_tree_id(repo)
+
+
+def test_workflow_hash_masks_tokens():
+    token = Mock()
+    token.token = "ghp_first"
+    workflow = Mock()
+    workflow.doc = {"jobs": {"test": {"steps": [{"with": {"token": "ghp_first"}}]}}}
+    workflow.tokens = [token]
+    workflow_hash = ActRunCache.get_workflow_hash(workflow)
+
+    token.token = "ghp_second"
+    workflow.doc = {"jobs": {"test": {"steps": [{"with": {"token": "ghp_second"}}]}}}
+    assert workflow_hash == ActRunCache.get_workflow_hash(workflow)
+
+
+def create_run(return_code: int = 1) -> ActTestsRun:
+    workflow = GitHubWorkflowFactory.create_workflow(
+        "test/resources/test_workflows/python/pytest_gitbugactions.yml", "python"
+    )
+    failed = TestCase("test_failed", "tests.test_main", 0.2)
+    failed.result = [Failure("assert 1 == 2", "AssertionError")]
+    return ActTestsRun(
+        failed=False,
+        tests=[TestCase("test_passed", "tests.test_main", 0.1), failed],
+        stdout="out",
+        stderr="err",
+        workflow=workflow,
+        workflow_name="tests-1234",
+        build_tool="pytest",
+        elapsed_time=12.5,
+        default_actions=False,
+        return_code=return_code,
+    )
+
+
+def test_get_or_run():
+    cache = ActRunCache(max_entries=1)
+    calls = []
+
+    def run():
+        calls.append(1)
+        # Give the other threads time to wait for this run
+        time.sleep(0.1)
+        return [create_run()]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_run("a", run)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 4
+    assert cache.hits == 3 and cache.misses == 1
+
+    # Callers get copies of the cached runs
+    results[0][0].default_actions = True
+    results[0][0].tests[1].result = []
+    results[0][0].tests.pop(0)
+    results[0][0].workflow.doc["jobs"].clear()
+    act_run = cache.get_or_run("a", run)[0]
+    assert not act_run.default_actions
+    assert len(act_run.tests) == 2
+    assert [test.name for test in act_run.failed_tests] == ["test_failed"]
+    assert len(act_run.workflow.doc["jobs"]) > 0
+
+    # The least recently used entry is evicted
+    cache.get_or_run("b", run)
+    cache.get_or_run("a", run)
+    assert len(calls) == 3
+
+
+def test_get_or_run_timed_out():
+    cache = ActRunCache()
+    return_codes = [124, 0]
+
+    def run():
+        return [create_run(return_code=return_codes.pop(0))]
+
+    assert cache.get_or_run("a", run, timeout=5)[0].return_code == 124
+    # The timed out runs are reused with the same or smaller timeouts
+    assert cache.get_or_run("a", run, timeout=5)[0].return_code == 124
+    assert cache.get_or_run("a", run, timeout=3)[0].return_code == 124
+    # A larger timeout runs them again
+    assert cache.get_or_run("a", run, timeout=10)[0].return_code == 0
+    assert cache.get_or_run("a", run, timeout=20)[0].return_code == 0
+    assert cache.misses == 2
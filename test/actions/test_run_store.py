@@ -0,0 +1,145 @@
+import os
+from unittest.mock import Mock
+
+from junitparser import Failure, Skipped, TestCase
+
+from gitbugactions.actions.actions import ActTestsRun
+from gitbugactions.actions.run_store import RunStore
+from gitbugactions.utils.blob_store import BlobStore
+
+
+def create_workflow():
+    workflow = Mock()
+    workflow.path = "/tmp/repo/.github/workflows/tests-gitbugactions-crawler.yml"
+    workflow.get_build_tool.return_value = "pytest"
+    return workflow
+
+
+def create_run(workflow, failed_test: bool = True) -> ActTestsRun:
+    passed = TestCase("test_passed", "tests.test_main", 0.1)
+    skipped = TestCase("test_skipped", "tests.test_main", 0.0)
+    skipped.result = [Skipped("skip", "pytest.skip")]
+    failed = TestCase("test_failed", "tests.test_main", 0.2)
+    if failed_test:
+        failed.result = [Failure("assert 1 == 2", "AssertionError")]
+    return ActTestsRun(
+        failed=False,
+        tests=[passed, skipped, failed],
+        stdout="out",
+        stderr="err",
+        workflow=workflow,
+        workflow_name="tests-1234",
+        build_tool="pytest",
+        elapsed_time=12.5,
+        default_actions=False,
+        return_code=1,
+    )
+
+
+def test_from_dict():
+    workflow = create_workflow()
+    act_run = create_run(workflow)
+    new_act_run = ActTestsRun.from_dict(act_run.asdict(), workflow)
+
+    assert new_act_run.asdict() == act_run.asdict()
+    assert [t.name for t in new_act_run.failed_tests] == ["test_failed"]
+    assert new_act_run.workflow is workflow
+
+
+def test_category_timings():
+    act_run = create_run(create_workflow())
+    assert act_run.get_category_timings() == {}
+    act_run.step_timings = [
+        {"job": "Tests/a", "category": "dependencies", "elapsed_time": 10},
+        {"job": "Tests/a", "category": "test", "elapsed_time": 5},
+        {"job": "Tests/b", "category": "test", "elapsed_time": 2.5},
+    ]
+    assert act_run.get_category_timings() == {"dependencies": 10, "test": 7.5}
+    new_act_run = ActTestsRun.from_dict(act_run.asdict(), act_run.workflow)
+    assert new_act_run.step_timings == act_run.step_timings
+
+
+def test_run_store(tmp_path):
+    workflow = create_workflow()
+    store = RunStore(str(tmp_path), "collect")
+    assert store.get("key", 0, [workflow]) is None
+
+    assert store.add("key", [create_run(workflow)], commit="a1b2") == 0
+    assert store.add("key", [create_run(workflow, False)], commit="a1b2") == 1
+    assert store.count("key") == 2
+
+    # The workflows are matched by the name of their files
+    other_workflow = create_workflow()
+    other_workflow.path = "/tmp/copy/.github/workflows/tests-gitbugactions-crawler.yml"
+    act_runs = store.get("key", 1, [other_workflow])
+    assert len(act_runs) == 1
+    assert act_runs[0].workflow is other_workflow
+    assert len(act_runs[0].failed_tests) == 0
+    assert store.get("key", 2, [workflow]) is None
+
+    # The ledger is shared between stages
+    store = RunStore(str(tmp_path), "filter")
+    store.add("other", [create_run(workflow)], commit="c3d4")
+    assert len(store.query()) == 3
+    assert [entry["execution"] for entry in store.query(commit="a1b2")] == [0, 1]
+    assert store.query(stage="filter")[0]["key"] == "other"
+    assert store.query(stage="filter")[0]["tests"] == 3
+
+
+def test_run_store_key():
+    workflow = create_workflow()
+    workflow.doc = {"jobs": {"test": {"steps": [{"run": "pytest"}]}}}
+    workflow.tokens = []
+    key = RunStore.get_key("tree", [workflow])
+
+    # The key does not depend on the path of the repository
+    other_workflow = create_workflow()
+    other_workflow.path = "/tmp/copy/.github/workflows/tests-gitbugactions-crawler.yml"
+    other_workflow.doc = {"jobs": {"test": {"steps": [{"run": "pytest"}]}}}
+    other_workflow.tokens = []
+    assert RunStore.get_key("tree", [other_workflow]) == key
+
+    assert RunStore.get_key("other", [workflow]) != key
+    other_workflow.doc["jobs"]["test"]["steps"][0]["run"] = "pytest -x"
+    assert RunStore.get_key("tree", [other_workflow]) != key
+
+
+def test_blob_store(tmp_path):
+    workflow = create_workflow()
+    act_run = create_run(workflow)
+    act_run.stdout = "a" * 4096
+    act_run.tests[0].system_out = "b" * 4096
+    blob_store = BlobStore(str(tmp_path))
+
+    data = act_run.asdict(blob_store)
+    assert data["stdout"]["size"] == 4096
+    assert data["stdout"]["preview"] == "a" * 256
+    assert data["tests"][0]["stdout"]["blob"] == BlobStore(str(tmp_path)).put(
+        "b" * 4096
+    )
+    # Short outputs are kept inline
+    assert data["stderr"] == "err"
+
+    # Identical outputs are stored once
+    act_run.asdict(blob_store)
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 2
+
+    new_act_run = ActTestsRun.from_dict(data, workflow, blob_store)
+    assert new_act_run.asdict() == act_run.asdict()
+    assert blob_store.resolve_all(data) == act_run.asdict()
+
+
+def test_run_store_timed_out(tmp_path):
+    workflow = create_workflow()
+    store = RunStore(str(tmp_path), "collect")
+    act_run = create_run(workflow)
+    act_run.return_code = 124
+    store.add("key", [act_run], timeout=5)
+
+    assert store.get("key", 0, [workflow], timeout=5) is not None
+    # The execution timed out with a smaller timeout, so it is run again
+    assert store.get("key", 0, [workflow], timeout=10) is None
+    assert store.add("key", [create_run(workflow)], timeout=10, execution=0) == 0
+    assert store.count("key") == 1
+    assert store.get("key", 0, [workflow], timeout=10)[0].return_code == 1
+    assert [entry["timeout"] for entry in store.query()] == [5, 10]
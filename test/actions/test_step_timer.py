@@ -0,0 +1,90 @@
+from unittest.mock import Mock
+
+from gitbugactions.actions.step_timer import StepTimer
+
+
+def create_workflow():
+    workflow = Mock()
+    workflow.doc = {
+        "name": "Tests",
+        "jobs": {
+            "build": {
+                "steps": [
+                    {"uses": "actions/checkout@v4"},
+                    {"name": "Set up Python", "uses": "actions/setup-python@v5"},
+                    {"run": "pip install -r requirements.txt\npip install ."},
+                    {"name": "Build", "run": "python -m build"},
+                    {"name": "Run tests", "run": "pytest tests"},
+                ]
+            }
+        },
+    }
+    workflow._is_test_command.side_effect = lambda command: "pytest" in command
+    return workflow
+
+
+def test_step_timings(mocker):
+    time = mocker.patch("gitbugactions.actions.step_timer.time.time")
+    timer = StepTimer(create_workflow())
+    for now, line in [
+        (0, "[Tests/build] 🚀  Start image=gitbugactions:latest\n"),
+        (1, "[Tests/build] ⭐ Run Set up job\n"),
+        (3, "[Tests/build]   ✅  Success - Set up job\n"),
+        (3, "[Tests/build] ⭐ Run Main actions/checkout@v4\n"),
+        (4, "[Tests/build]   ✅  Success - Main actions/checkout@v4 [1.02s]\n"),
+        (4, "[Tests/build] ⭐ Run Main Set up Python\n"),
+        (10, "[Tests/build]   ✅  Success - Main Set up Python [5.9s]\n"),
+        (10, "[Tests/build] ⭐ Run Main pip install -r requirements.txt\n"),
+        (30, "[Tests/build]   | Collecting pytest\n"),
+        (40, "[Tests/build]   ✅  Success - Main pip install -r requirements.txt\n"),
+        (40, "[Tests/build] ⭐ Run Main Build\n"),
+        (45, "[Tests/build]   ✅  Success - Main Build\n"),
+        (45, "[Tests/build] ⭐ Run Main Run tests\n"),
+        (60, "[Tests/build]   ❌  Failure - Main Run tests [15s]\n"),
+        (61, "[Tests/build] 🏁  Job failed\n"),
+        (62, "[Tests/build] Cleaning up container\n"),
+    ]:
+        time.return_value = now
+        timer.hook("stdout", line)
+    time.return_value = 100
+    timer.finish()
+
+    assert [(step["step"], step["category"]) for step in timer.steps] == [
+        ("Set up job", "runner"),
+        ("actions/checkout@v4", "setup"),
+        ("Set up Python", "setup"),
+        ("pip install -r requirements.txt", "dependencies"),
+        ("Build", "build"),
+        ("Run tests", "test"),
+    ]
+    assert [step["elapsed_time"] for step in timer.steps] == [2, 1, 6, 30, 5, 15]
+    assert timer.steps[0]["stage"] is None
+    assert timer.steps[1]["stage"] == "Main"
+    assert timer.steps[-1]["status"] == "failure"
+    assert timer.jobs == {"Tests/build": 61}
+
+
+def test_unfinished_steps(mocker):
+    time = mocker.patch("gitbugactions.actions.step_timer.time.time")
+    timer = StepTimer(create_workflow())
+    for now, line in [
+        (0, "[Tests/build] ⭐ Run Main Run tests\n"),
+        (5, "[Tests/build]   | test_main.py::test_hang\n"),
+        (5, "Error: context deadline exceeded\n"),
+    ]:
+        time.return_value = now
+        timer.hook("stdout", line)
+    time.return_value = 600
+    timer.finish()
+
+    assert timer.steps == [
+        {
+            "job": "Tests/build",
+            "step": "Run tests",
+            "stage": "Main",
+            "category": "test",
+            "status": None,
+            "elapsed_time": 600,
+        }
+    ]
+    assert timer.jobs == {"Tests/build": 600}
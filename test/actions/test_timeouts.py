@@ -0,0 +1,80 @@
+import threading
+import time
+
+from gitbugactions.actions.timeouts import IdleWatchdog, TimeoutEstimator
+
+
+def test_default_timeout():
+    estimator = TimeoutEstimator(default_timeout=10, min_samples=2)
+    assert estimator.get_timeout("repo") == 10
+    estimator.record("repo", 60)
+    assert estimator.get_timeout("repo") == 10
+
+
+def test_timeout_from_durations():
+    estimator = TimeoutEstimator(percentile=50, margin=2, min_timeout=1)
+    for elapsed_time in (60, 120, 600):
+        estimator.record("repo", elapsed_time)
+    # The median (2 minutes) with the margin
+    assert estimator.get_percentile("repo") == 120
+    assert estimator.get_timeout("repo") == 4
+
+
+def test_timeout_limits():
+    estimator = TimeoutEstimator(min_timeout=2, max_timeout=30)
+    estimator.record("fast", 5)
+    estimator.record("slow", 3600)
+    assert estimator.get_timeout("fast") == 2
+    assert estimator.get_timeout("slow") == 30
+
+
+def test_timeout_percentile_interpolation():
+    estimator = TimeoutEstimator(percentile=95, margin=1, min_timeout=1)
+    for elapsed_time in range(60, 660, 60):
+        estimator.record("repo", elapsed_time)
+    assert estimator.get_percentile("repo") == 600 - 60 * 0.45
+    assert estimator.get_timeout("repo") == 10
+
+
+def test_max_samples():
+    estimator = TimeoutEstimator(max_samples=2, percentile=100, margin=1)
+    for elapsed_time in (3000, 120, 180):
+        estimator.record("repo", elapsed_time)
+    assert estimator.get_timeout("repo") == 3
+
+
+def test_load_history():
+    estimator = TimeoutEstimator(percentile=100, margin=1)
+    estimator.load_history(
+        [
+            {"repo": "repo", "elapsed_time": 600, "max_elapsed_time": 300},
+            {"repo": "repo", "elapsed_time": 180},
+            {"repo": "repo", "elapsed_time": 3600, "timed_out": True},
+            {"key": "x", "elapsed_time": 3600},
+        ]
+    )
+    assert estimator.get_timeout("repo") == 5
+
+
+def test_idle_watchdog():
+    idle = threading.Event()
+    watchdog = IdleWatchdog(0.2, idle.set)
+    watchdog.start()
+    # The output keeps the run alive
+    for _ in range(5):
+        time.sleep(0.1)
+        watchdog.hook("stdout", "line")
+    assert not idle.is_set()
+    assert idle.wait(2)
+    watchdog.stop()
+    assert watchdog.idle
+
+
+def test_idle_watchdog_stopped():
+    idle = threading.Event()
+    watchdog = IdleWatchdog(0.2, idle.set)
+    watchdog.start()
+    watchdog.stop()
+    time.sleep(0.3)
+    assert not idle.is_set()
+    assert not watchdog.idle
@@ -1,4 +1,5 @@
 import os
+import subprocess
 
 import pytest
 
@@ -10,6 +11,7 @@ from gitbugactions.actions.npm.npm_mocha_workflow import NpmMochaWorkflow
 from gitbugactions.actions.npm.npm_vitest_workflow import NpmVitestWorkflow
 from gitbugactions.actions.python.pytest_workflow import PytestWorkflow
 from gitbugactions.actions.rust.cargo_workflow import CargoWorkflow
+from gitbugactions.actions.test_selection import TestSelection
 from gitbugactions.actions.csharp.dotnet_workflow import DotNetWorkflow
 from gitbugactions.actions.workflow_factory import GitHubWorkflowFactory
 
@@ -91,6 +93,226 @@ def test_instrument_cache_steps(yml_file):
     assert "cache" not in workflow.doc["jobs"]["build"]["steps"][1]["with"]
 
 
+@pytest.mark.parametrize(
+    "yml_file",
+    ["test/resources/test_workflows/java/maven_cache.yml"],
+)
+def test_instrument_clean_workspace(yml_file):
+    workflow = create_workflow(yml_file, "java")
+    n_steps = len(workflow.doc["jobs"]["build"]["steps"])
+    workflow.instrument_clean_workspace()
+    # Instrumenting twice does not add the step again
+    workflow.instrument_clean_workspace()
+    steps = workflow.doc["jobs"]["build"]["steps"]
+    assert len(steps) == n_steps + 1
+    assert steps[0]["name"] == "gitbug-actions clean workspace"
+    assert steps[0]["run"].startswith("git clean -ffdx")
+
+
+@pytest.mark.parametrize(
+    "yml_file, language, expected",
+    [
+        (
+            "test/resources/test_workflows/cpp/cmake_without_output_junit.yml",
+            "c++",
+            "CMAKE_CXX_COMPILER_LAUNCHER",
+        ),
+        ("test/resources/test_workflows/rust/tests.yml", "rust", "RUSTC_WRAPPER"),
+        ("test/resources/test_workflows/go/go_vendor.yml", "go", "GOCACHE"),
+    ],
+)
+def test_instrument_build_cache(yml_file, language, expected):
+    workflow = create_workflow(yml_file, language)
+    assert workflow.instrument_build_cache("/cache/build")
+    # Instrumenting twice does not add the step again
+    assert workflow.instrument_build_cache("/cache/build")
+    for job in workflow.doc["jobs"].values():
+        steps = [
+            step
+            for step in job["steps"]
+            if step.get("name") == "gitbug-actions enable build cache"
+        ]
+        assert len(steps) == 1
+        assert job["steps"][0] is steps[0]
+        assert expected in steps[0]["run"]
+        assert "/cache/build" in steps[0]["run"]
+        assert subprocess.run(["bash", "-n", "-c", steps[0]["run"]]).returncode == 0
+
+
+def test_instrument_build_cache_gradle(tmp_path):
+    yml_file = os.path.join(tmp_path, "gradle.yml")
+    with open(yml_file, "w") as f:
+        f.write(
+            "name: Tests\n"
+            "on: push\n"
+            "jobs:\n"
+            "  build:\n"
+            "    runs-on: ubuntu-latest\n"
+            "    steps:\n"
+            "      - uses: actions/checkout@v4\n"
+            "      - run: ./gradlew test\n"
+        )
+    workflow = create_workflow(yml_file, "java")
+    cache_dir = os.path.join(tmp_path, "cache")
+    assert workflow.instrument_build_cache(cache_dir)
+
+    # The step writes an init script that enables the build cache
+    step = workflow.doc["jobs"]["build"]["steps"][0]
+    env = {"PATH": os.environ["PATH"], "GRADLE_USER_HOME": str(tmp_path)}
+    subprocess.run(["bash", "-c", step["run"]], env=env, check=True)
+    with open(
+        os.path.join(tmp_path, "init.d", "gitbugactions-build-cache.gradle")
+    ) as f:
+        init_script = f.read()
+    assert "buildCacheEnabled = true" in init_script
+    assert f"new File('{cache_dir}/gradle')" in init_script
+    assert os.path.isdir(os.path.join(cache_dir, "gradle"))
+
+
+def test_instrument_build_cache_unsupported():
+    workflow = create_workflow(
+        "test/resources/test_workflows/java/maven_cache.yml", "java"
+    )
+    steps = list(workflow.doc["jobs"]["build"]["steps"])
+    assert not workflow.instrument_build_cache("/cache/build")
+    assert workflow.doc["jobs"]["build"]["steps"] == steps
+
+
+def get_test_commands(workflow):
+    return [
+        step["run"]
+        for job in workflow.doc["jobs"].values()
+        for step in job["steps"]
+        if "run" in step and workflow._is_test_command(step["run"])
+    ]
+
+
+@pytest.mark.parametrize(
+    "yml_file, language, files, expected",
+    [
+        (
+            "test/resources/test_workflows/python/pytest_gitbugactions.yml",
+            "python",
+            ["test/test_main.py", "test/resources/data.json"],
+            "pytest test/test_main.py --junitxml=report.xml",
+        ),
+        (
+            "test/resources/test_workflows/java/maven_test_repo.yml",
+            "java",
+            ["src/test/java/org/example/MainTest.java"],
+            "mvn -Dtest=MainTest -Dsurefire.failIfNoSpecifiedTests=false",
+        ),
+        (
+            "test/resources/test_workflows/rust/tests.yml",
+            "rust",
+            ["tests/parser.rs"],
+            "cargo test --test parser --verbose",
+        ),
+        (
+            "test/resources/test_workflows/typescript/npm/jest/.github/workflows/tests.yml",
+            "typescript",
+            ["src/index.test.ts"],
+            "npm test -- 'src/index\\.test\\.ts$' --reporters=default",
+        ),
+    ],
+)
+def test_instrument_test_selection(yml_file, language, files, expected):
+    workflow = create_workflow(yml_file, language)
+    workflow.instrument_test_steps()
+    assert workflow.instrument_test_selection(TestSelection(files), ".")
+    assert workflow.test_selection_applied
+    assert any(expected in command for command in get_test_commands(workflow))
+
+
+def test_instrument_test_selection_go(tmp_path):
+    os.makedirs(tmp_path / "parser")
+    with open(tmp_path / "parser" / "parser_test.go", "w") as f:
+        f.write(
+            "package parser\n\n"
+            + "func TestParse(t *testing.T) {}\n\n"
+            + "func TestEmpty(t *testing.T) {}\n\n"
+            + "func helper(t *testing.T) {}\n"
+        )
+    workflow = create_workflow("test/resources/test_workflows/go/go_vendor.yml", "go")
+    workflow.instrument_test_steps()
+    assert workflow.instrument_test_selection(
+        TestSelection(["parser/parser_test.go"]), str(tmp_path)
+    )
+    for command in get_test_commands(workflow):
+        assert command.startswith("go test -run '^(TestEmpty|TestParse)$' -v")
+
+
+def test_instrument_test_selection_maven(tmp_path):
+    yml_file = os.path.join(tmp_path, "maven.yml")
+    with open(yml_file, "w") as f:
+        f.write(
+            "name: Tests\n"
+            "on: push\n"
+            "jobs:\n"
+            "  build:\n"
+            "    runs-on: ubuntu-latest\n"
+            "    steps:\n"
+            "      - uses: actions/checkout@v4\n"
+            "      - run: mvn install -DskipTests && mvn test\n"
+            "      - run: mvn package -Dmaven.test.skip=true\n"
+        )
+    workflow = create_workflow(yml_file, "java")
+    selection = TestSelection(["src/test/java/org/example/MainTest.java"])
+    assert workflow.instrument_test_selection(selection, ".")
+    steps = workflow.doc["jobs"]["build"]["steps"]
+    # Only the commands that run the tests get the selection
+    assert steps[1]["run"] == (
+        "mvn install -DskipTests && mvn -Dtest=MainTest "
+        "-Dsurefire.failIfNoSpecifiedTests=false -DfailIfNoTests=false test"
+    )
+    assert steps[2]["run"] == "mvn package -Dmaven.test.skip=true"
+
+    # The selection is not applied if no command runs the tests
+    workflow = create_workflow(yml_file, "java")
+    workflow.doc["jobs"]["build"]["steps"].pop(1)
+    assert not workflow.instrument_test_selection(selection, ".")
+    assert not workflow.test_selection_applied
+
+
+def test_instrument_test_selection_unsupported():
+    workflow = create_workflow("test/resources/test_workflows/rust/tests.yml", "rust")
+    workflow.instrument_test_steps()
+    commands = get_test_commands(workflow)
+    # Unit tests are in the modules of the crate
+    assert not workflow.instrument_test_selection(
+        TestSelection(["src/parser.rs", "tests/parser.rs"]), "."
+    )
+    assert not workflow.test_selection_applied
+    assert get_test_commands(workflow) == commands
+
+
+@pytest.mark.parametrize(
+    "yml_file, language, output",
+    [
+        (
+            "test/resources/test_workflows/python/pytest_gitbugactions.yml",
+            "python",
+            "============ no tests ran in 0.01s ============",
+        ),
+        (
+            "test/resources/test_workflows/java/maven_test_repo.yml",
+            "java",
+            "[INFO] No tests to run.",
+        ),
+        (
+            "test/resources/test_workflows/go/go_vendor.yml",
+            "go",
+            "testing: warning: no tests to run",
+        ),
+    ],
+)
+def test_has_no_selected_tests(yml_file, language, output):
+    workflow = create_workflow(yml_file, language)
+    assert workflow.has_no_selected_tests(f"[Tests/test] | {output}\n")
+    # e.g. compilation errors
+    assert not workflow.has_no_selected_tests("[Tests/test] | error: build failed\n")
+
+
 @pytest.mark.parametrize(
     "yml_file",
     ["test/resources/test_workflows/go/go_on_pull_request.yml"],
@@ -0,0 +1,89 @@
+import os
+from unittest.mock import Mock
+
+from unidiff import PatchSet
+
+from gitbugactions.collect_bugs.bug_patch import BugPatch
+from gitbugactions.collect_bugs.fingerprint_index import FingerprintIndex
+
+PATCH = """diff --git a/src/main.py b/src/main.py
+index {index}..0d1f2a3 100644
+--- a/src/main.py
++++ b/src/main.py
+@@ -1,2 +1,2 @@
+ def main():
+-    return 1
++    return 2
+"""
+
+
+def create_bug_patch(full_name: str, commit: str, index: str) -> BugPatch:
+    repo = Mock()
+    repo.full_name = full_name
+    repo.language = "Python"
+
+    def create_commit(sha):
+        c = Mock()
+        c.id = sha
+        c.message = "fix bug"
+        c.commit_time = 1700000000
+        return c
+
+    return BugPatch(
+        repo,
+        create_commit(commit),
+        create_commit(commit[::-1]),
+        PatchSet(PATCH.format(index=index)),
+        PatchSet(""),
+        PatchSet(""),
+        set(),
+    )
+
+
+def test_fingerprint_ignores_index():
+    patch = create_bug_patch("owner/repo", "a1b2", "1111111")
+    fork_patch = create_bug_patch("fork/repo", "c3d4", "2222222")
+
+    assert len(patch.fingerprint) == 64
+    assert patch.fingerprint == fork_patch.fingerprint
+    assert patch == fork_patch
+    assert len({patch, fork_patch}) == 1
+    assert patch.get_data()["fingerprint"] == patch.fingerprint
+
+
+def test_fingerprint_index(tmp_path):
+    index_path = os.path.join(tmp_path, "fingerprints.jsonl")
+    patch = create_bug_patch("owner/repo", "a1b2", "1111111")
+    fork_patch = create_bug_patch("fork/repo", "c3d4", "2222222")
+
+    index = FingerprintIndex(index_path)
+    assert index.claim(patch)
+    assert not index.claim(fork_patch)
+    assert index.get(fork_patch)["repository"] == "owner/repo"
+    # The claims are not indexed until the patches are tested
+    assert fork_patch not in index
+    assert index.add(patch)
+    assert not index.add(fork_patch)
+
+    # The index is persisted across runs
+    index = FingerprintIndex(index_path)
+    assert fork_patch in index
+    assert len(index) == 1
+
+
+def test_fingerprint_index_release(tmp_path):
+    index_path = os.path.join(tmp_path, "fingerprints.jsonl")
+    patch = create_bug_patch("owner/repo", "a1b2", "1111111")
+    fork_patch = create_bug_patch("fork/repo", "c3d4", "2222222")
+
+    index = FingerprintIndex(index_path)
+    assert index.claim(patch)
+    # Only the patch that claimed the fingerprint releases it
+    index.release(fork_patch)
+    assert not index.claim(fork_patch)
+    # The test of the patch did not finish (e.g. it crashed)
+    index.release(patch)
+    assert index.claim(fork_patch)
+
+    # Claims are not persisted
+    assert len(FingerprintIndex(index_path)) == 0
@@ -0,0 +1,122 @@
+from unittest.mock import Mock
+
+from junitparser import Failure, TestCase
+from unidiff import PatchSet
+
+from gitbugactions.collect_bugs.bug_patch import BugPatch
+from gitbugactions.collect_bugs.collection_strategies import (
+    FailFailStrategy,
+    FailPassStrategy,
+    PassPassStrategy,
+    Phase,
+)
+from gitbugactions.collect_bugs.phase_planner import PhasePlanner
+
+SOURCE_PATCH = """diff --git a/src/main.py b/src/main.py
+--- a/src/main.py
++++ b/src/main.py
+@@ -1,2 +1,2 @@
+ def main():
+-    return 1
++    return 2
+"""
+
+TEST_PATCH = """diff --git a/tests/test_main.py b/tests/test_main.py
+--- a/tests/test_main.py
++++ b/tests/test_main.py
+@@ -1,2 +1,2 @@
+ def test_main():
+-    assert main() == 1
++    assert main() == 2
+"""
+
+
+def create_bug_patch(test_patch: str = "") -> BugPatch:
+    repo = Mock()
+    repo.full_name = "owner/repo"
+    repo.language = "Python"
+    commit = Mock(id="a1b2", message="fix bug", commit_time=1700000000)
+    return BugPatch(
+        repo,
+        commit,
+        commit,
+        PatchSet(SOURCE_PATCH),
+        PatchSet(test_patch),
+        PatchSet(""),
+        set(),
+    )
+
+
+def create_runs(*failed: bool):
+    tests = []
+    for i, test_failed in enumerate(failed):
+        test = TestCase(f"test_{i}", "tests.test_main", 0.1)
+        if test_failed:
+            test.result = [Failure("assert 1 == 2", "AssertionError")]
+        tests.append(test)
+    act_run = Mock(failed=False, tests=tests)
+    act_run.failed_tests = [test for test in tests if not test.is_passed]
+    return [act_run]
+
+
+def run_phases(planner: PhasePlanner, results):
+    phases = []
+    phase = planner.next_phase()
+    while phase is not None:
+        phases.append(phase)
+        planner.add_runs(phase, results[phase])
+        phase = planner.next_phase()
+    return phases
+
+
+def test_current_commit_failed():
+    bug_patch = create_bug_patch(TEST_PATCH)
+    planner = PhasePlanner(bug_patch, [PassPassStrategy(), FailPassStrategy()])
+    phases = run_phases(planner, {Phase.CURRENT_COMMIT: create_runs(True)})
+
+    # No strategy accepts a failing current commit
+    assert phases == [Phase.CURRENT_COMMIT]
+    assert len(planner.skipped_phases) == 2
+
+
+def test_fail_pass_skips_diff_phase():
+    bug_patch = create_bug_patch()
+    planner = PhasePlanner(bug_patch, [PassPassStrategy(), FailPassStrategy()])
+    phases = run_phases(
+        planner,
+        {
+            Phase.CURRENT_COMMIT: create_runs(False),
+            Phase.PREVIOUS_COMMIT: create_runs(True),
+        },
+    )
+
+    assert phases == [Phase.CURRENT_COMMIT, Phase.PREVIOUS_COMMIT]
+    assert FailPassStrategy().check(bug_patch)
+
+
+def test_stops_when_strategy_is_known():
+    bug_patch = create_bug_patch(TEST_PATCH)
+    planner = PhasePlanner(bug_patch, [PassPassStrategy(), FailFailStrategy()])
+    phases = run_phases(
+        planner,
+        {
+            Phase.CURRENT_COMMIT: create_runs(True, False),
+            Phase.PREVIOUS_COMMIT_WITH_DIFF: create_runs(True, True),
+        },
+    )
+
+    # FAIL_FAIL already accepts the bug-fix with the previous commit w/ diff
+    assert phases == [Phase.CURRENT_COMMIT, Phase.PREVIOUS_COMMIT_WITH_DIFF]
+    assert FailFailStrategy().check(bug_patch)
+    # The skipped phase has no runs (filter_bugs does not run it either)
+    assert bug_patch.actions_runs[Phase.PREVIOUS_COMMIT] is None
+
+
+def test_crashed_phase():
+    bug_patch = create_bug_patch(TEST_PATCH)
+    planner = PhasePlanner(bug_patch, [PassPassStrategy()])
+    crashed = [Mock(failed=True, tests=[], failed_tests=[])]
+    phases = run_phases(planner, {Phase.CURRENT_COMMIT: crashed})
+
+    assert phases == [Phase.CURRENT_COMMIT]
+    assert bug_patch.actions_runs == [None, None, None]
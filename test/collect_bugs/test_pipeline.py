@@ -0,0 +1,49 @@
+import threading
+
+from gitbugactions.collect_bugs.pipeline import Pipeline, PipelineStage
+
+
+def test_pipeline():
+    results = []
+    lock = threading.Lock()
+
+    def double(item):
+        return [item * 2]
+
+    def split(item):
+        # Items can be dropped or expanded by a stage
+        if item % 4 == 0:
+            return None
+        return [item, item + 1]
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    Pipeline(
+        [
+            PipelineStage("double", double, n_workers=3),
+            PipelineStage("split", split, n_workers=2),
+            PipelineStage("collect", collect),
+        ]
+    ).run(range(5))
+
+    assert sorted(results) == [2, 3, 6, 7]
+
+
+def test_pipeline_handler_error():
+    results = []
+
+    def fail_on_odd(item):
+        if item % 2 == 1:
+            raise ValueError(item)
+        return [item]
+
+    Pipeline(
+        [
+            PipelineStage("fail", fail_on_odd, n_workers=2),
+            PipelineStage("collect", results.append),
+        ]
+    ).run(range(4))
+
+    assert sorted(results) == [0, 2]
@@ -0,0 +1,113 @@
+from unittest.mock import Mock
+
+from unidiff import PatchSet
+
+from gitbugactions.collect_bugs.scheduler import CandidateScheduler
+
+SOURCE_PATCH = """diff --git a/src/main.py b/src/main.py
+--- a/src/main.py
++++ b/src/main.py
+@@ -1,2 +1,2 @@
+ def main():
+-    return 1
++    return 2
+"""
+
+TEST_PATCH = """diff --git a/tests/test_main.py b/tests/test_main.py
+--- a/tests/test_main.py
++++ b/tests/test_main.py
+@@ -1,2 +1,2 @@
+ def test_main():
+-    assert main() == 1
++    assert main() == 2
+"""
+
+
+def create_bug_patch(full_name: str, test_patch: str = "", timestamp: str = ""):
+    bug_patch = Mock()
+    bug_patch.repo.full_name = full_name
+    bug_patch.bug_patch = PatchSet(SOURCE_PATCH)
+    bug_patch.test_patch = PatchSet(test_patch)
+    bug_patch.non_code_patch = PatchSet("")
+    bug_patch.commit_timestamp = timestamp
+    return bug_patch
+
+
+def test_score():
+    with_tests = create_bug_patch("owner/repo", TEST_PATCH)
+    without_tests = create_bug_patch("owner/repo")
+    assert CandidateScheduler.score(with_tests) > CandidateScheduler.score(
+        without_tests
+    )
+
+    old = create_bug_patch("owner/repo", timestamp="2018-01-01T00:00:00+00:00Z")
+    new = create_bug_patch("owner/repo", timestamp="2022-01-01T00:00:00+00:00Z")
+    workflows_since = "2020-01-01T00:00:00+00:00Z"
+    assert CandidateScheduler.score(new, workflows_since) > CandidateScheduler.score(
+        old, workflows_since
+    )
+
+
+def test_highest_score_first():
+    scheduler = CandidateScheduler()
+    without_tests = create_bug_patch("owner/repo")
+    with_tests = create_bug_patch("owner/repo", TEST_PATCH)
+    scheduler.put("without_tests", without_tests)
+    scheduler.put("with_tests", with_tests)
+    scheduler.close()
+
+    assert scheduler.pending() == 2
+    assert scheduler.get() == "with_tests"
+    assert scheduler.get() == "without_tests"
+    assert scheduler.get() is None
+
+
+def test_repo_yield():
+    scheduler = CandidateScheduler()
+    productive = create_bug_patch("owner/productive")
+    unproductive = create_bug_patch("owner/unproductive")
+    for i in range(2):
+        scheduler.put(f"productive-{i}", productive)
+        scheduler.put(f"unproductive-{i}", unproductive)
+
+    scheduler.done(productive, True, 60)
+    scheduler.done(unproductive, False, 60)
+    assert scheduler.get().startswith("productive")
+    assert scheduler.get().startswith("productive")
+
+
+def test_budgets():
+    scheduler = CandidateScheduler(max_candidates_per_repo=1)
+    bug_patch = create_bug_patch("owner/repo")
+    scheduler.put("first", bug_patch)
+    scheduler.put("second", bug_patch)
+    scheduler.close()
+    assert scheduler.get() == "first"
+    assert scheduler.get() is None
+    assert scheduler.pending() == 0
+
+    scheduler = CandidateScheduler(max_minutes_per_repo=1)
+    scheduler.put("first", bug_patch)
+    scheduler.put("second", bug_patch)
+    assert scheduler.get() == "first"
+    scheduler.done(bug_patch, False, 61)
+    assert scheduler.get(block=False) is None
+
+
+def test_time_budget_reserves_running_candidates():
+    scheduler = CandidateScheduler(max_minutes_per_repo=1)
+    bug_patch = create_bug_patch("owner/repo")
+    for i in range(3):
+        scheduler.put(f"candidate-{i}", bug_patch)
+    scheduler.close()
+
+    assert scheduler.get() == "candidate-0"
+    # Without tested candidates, the time of the running one is unknown
+    assert scheduler.get(block=False) is None
+    scheduler.done(bug_patch, False, 40)
+    assert scheduler.get() == "candidate-1"
+    # The running candidate may take 40s more, which uses up the budget
+    assert scheduler.get(block=False) is None
+    assert scheduler.pending() == 1
+    scheduler.done(bug_patch, False, 10)
+    assert scheduler.get() == "candidate-2"
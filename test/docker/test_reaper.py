@@ -0,0 +1,71 @@
+import threading
+from unittest.mock import Mock
+
+from gitbugactions.docker.reaper import ContainerReaper
+
+
+class EventStream:
+    def __init__(self, events):
+        self.events = events
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield from self.events
+        self.closed.wait()
+        raise ConnectionError("Stream closed")
+
+    def close(self):
+        self.closed.set()
+
+
+def create_event(name: str, image: str = "node:16", **labels):
+    return {
+        "Type": "container",
+        "Action": "die",
+        "Actor": {"ID": name, "Attributes": {"name": name, "image": image, **labels}},
+        "time": 1700000000,
+    }
+
+
+def test_is_reaped():
+    reaper = ContainerReaper()
+    reaper.add_image("gitbugactions:latest")
+    assert reaper.is_reaped("/act-Tests-build", "node:16", {ContainerReaper.LABEL})
+    assert reaper.is_reaped("act-Tests-build", "gitbugactions:latest", set())
+    assert not reaper.is_reaped("act-Tests-build", "node:16", set())
+    # Only the containers created by act are removed
+    assert not reaper.is_reaped("exporter", "gitbugactions:latest", set())
+
+    reaper.protect("act-gba-1234")
+    assert not reaper.is_reaped("act-gba-1234-Tests", "gitbugactions:latest", set())
+    reaper.unprotect("act-gba-1234")
+    assert reaper.is_reaped("act-gba-1234-Tests", "gitbugactions:latest", set())
+
+
+def test_reaper(mocker):
+    client = Mock()
+    mocker.patch(
+        "gitbugactions.docker.client.DockerClient.getInstance", return_value=client
+    )
+    client.api.containers.return_value = [
+        {"Id": "act-old", "Names": ["/act-old"], "Image": "gitbugactions:latest"}
+    ]
+    stream = EventStream(
+        [
+            create_event("act-run", **{ContainerReaper.LABEL: "true"}),
+            create_event("act-other"),
+            create_event("act-warm", image="gitbugactions:latest"),
+        ]
+    )
+    client.api.events.return_value = stream
+
+    reaper = ContainerReaper()
+    reaper.add_image("gitbugactions:latest")
+    reaper.protect("act-warm")
+    reaper.start()
+    stream.closed.wait(0.2)
+    reaper.stop()
+
+    removed = {call.args[0] for call in client.api.remove_container.call_args_list}
+    assert removed == {"act-run", "act-old"}
+    assert stream.closed.is_set()
@@ -0,0 +1,91 @@
+import tarfile
+import uuid
+from unittest.mock import Mock
+
+import pytest
+
+from gitbugactions.docker.runner_images import RunnerImageBuilder
+
+
+@pytest.fixture
+def client(mocker):
+    client = Mock()
+    client.images.list.return_value = []
+    built = {}
+
+    def build(fileobj, custom_context, tag, **kwargs):
+        assert custom_context
+        with tarfile.open(fileobj=fileobj) as tar:
+            built[tag] = tar.extractfile("Dockerfile").read().decode("utf-8")
+
+    client.images.build.side_effect = build
+    client.built = built
+    mocker.patch(
+        "gitbugactions.docker.client.DockerClient.getInstance", return_value=client
+    )
+    return client
+
+
+def test_build(client):
+    dockerfile = f"FROM ubuntu:22.04\nLABEL test={uuid.uuid4()}\n"
+    tag = RunnerImageBuilder.build(dockerfile)
+    assert tag == RunnerImageBuilder.get_tag(dockerfile)
+    assert tag.startswith("gitbugactions-runner:")
+    assert client.built == {tag: dockerfile}
+
+    # The images are only built once
+    assert RunnerImageBuilder.build(dockerfile) == tag
+    assert client.images.build.call_count == 1
+
+
+def test_build_existing_image(client):
+    client.images.list.return_value = [Mock()]
+    dockerfile = f"FROM ubuntu:22.04\nLABEL test={uuid.uuid4()}\n"
+    assert RunnerImageBuilder.build(dockerfile) == RunnerImageBuilder.get_tag(
+        dockerfile
+    )
+    client.images.build.assert_not_called()
+
+
+def test_get_tag():
+    assert RunnerImageBuilder.get_tag("FROM a\n") == RunnerImageBuilder.get_tag(
+        "FROM a\n"
+    )
+    assert RunnerImageBuilder.get_tag("FROM a\n") != RunnerImageBuilder.get_tag(
+        "FROM b\n"
+    )
+
+
+def test_get_image(client):
+    default_image = "gitbugactions:latest"
+    image = RunnerImageBuilder.get_image(["maven", "gradle"], default_image)
+    assert image != default_image
+
+    # The toolchain images are built on the common image
+    common_image = RunnerImageBuilder.get_tag(
+        RunnerImageBuilder.get_common_dockerfile()
+    )
+    dockerfile = RunnerImageBuilder.get_toolchain_dockerfile("java")
+    assert dockerfile.startswith(f"FROM {common_image}\n")
+    assert "maven" in dockerfile
+    assert image == RunnerImageBuilder.get_tag(dockerfile)
+
+    # Runs with several or unknown toolchains use the default image
+    assert RunnerImageBuilder.get_image(["maven", "cargo"], default_image) == (
+        default_image
+    )
+    assert RunnerImageBuilder.get_image(["unknown"], default_image) == default_image
+    assert RunnerImageBuilder.get_image([], default_image) == default_image
+
+
+def test_get_toolchain():
+    assert RunnerImageBuilder.get_toolchain("npm-jest") == "node"
+    assert RunnerImageBuilder.get_toolchain("cmake") == "cpp"
+    assert RunnerImageBuilder.get_toolchain("unknown") is None
+
+
+def test_toolchain_architecture(client):
+    # The downloaded toolchains match the architecture of the host
+    dockerfile = RunnerImageBuilder.get_toolchain_dockerfile("go")
+    assert "$(dpkg --print-architecture)" in dockerfile
+    assert "amd64" not in dockerfile
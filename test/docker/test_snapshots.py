@@ -0,0 +1,96 @@
+import os
+import subprocess
+from unittest.mock import Mock
+
+import pygit2
+
+from gitbugactions.actions.python.pytest_workflow import PytestWorkflow
+from gitbugactions.docker.snapshots import RunnerSnapshotManager
+
+WORKFLOW = """name: Tests
+on: push
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v3
+      - uses: actions/setup-python@v4
+        with:
+          python-version: "3.11"
+      - run: pip install -r requirements.txt
+      - run: pytest {args}
+"""
+
+
+def create_repo(path: str) -> pygit2.Repository:
+    os.makedirs(path)
+    subprocess.run(["git", "init", "-q"], cwd=path, check=True)
+    subprocess.run(
+        ["git", "remote", "add", "origin", "https://github.com/owner/repo"],
+        cwd=path,
+        check=True,
+    )
+    with open(os.path.join(path, "requirements.txt"), "w") as f:
+        f.write("pytest==8.0.0\n")
+    return pygit2.Repository(path)
+
+
+def create_workflow(args: str = "") -> PytestWorkflow:
+    return PytestWorkflow("tests.yml", WORKFLOW.format(args=args))
+
+
+def test_get_setup_steps():
+    workflow = create_workflow()
+    workflow.doc["jobs"]["test"]["steps"][1]["with"]["token"] = "ghp_secret"
+    setup_steps = RunnerSnapshotManager.get_setup_steps(workflow)
+
+    assert len(setup_steps["test"]) == 3
+    assert setup_steps["test"][1]["with"] == {"python-version": "3.11"}
+    # The workflow is not changed
+    assert "token" in workflow.doc["jobs"]["test"]["steps"][1]["with"]
+
+
+def test_get_key(tmp_path):
+    manager = RunnerSnapshotManager()
+    repo = create_repo(os.path.join(tmp_path, "repo"))
+    key = manager.get_key(repo, [create_workflow()])
+
+    # The test steps and the working tree are not part of the key
+    with open(os.path.join(repo.workdir, "main.py"), "w") as f:
+        f.write("print('hello')\n")
+    assert manager.get_key(repo, [create_workflow("-x")]) == key
+
+    with open(os.path.join(repo.workdir, "requirements.txt"), "w") as f:
+        f.write("pytest==8.1.0\n")
+    assert manager.get_key(repo, [create_workflow()]) != key
+
+
+def test_acquire():
+    manager = RunnerSnapshotManager(max_attempts=2)
+    assert manager.acquire("key")
+    # Only one run of each key is snapshotted at a time
+    assert not manager.acquire("key")
+    manager.release("key")
+    assert manager.acquire("key")
+    manager.release("key")
+    assert not manager.acquire("key")
+
+
+def test_create_from_run_containers(mocker):
+    client = Mock()
+    mocker.patch(
+        "gitbugactions.docker.client.DockerClient.getInstance", return_value=client
+    )
+    extract_diff = mocker.patch("gitbugactions.docker.snapshots.extract_diff")
+    create_diff_image = mocker.patch("gitbugactions.docker.snapshots.create_diff_image")
+    client.containers.list.return_value = [Mock(id="container")]
+    act_run = Mock(tests=[Mock()], run_id="run")
+
+    image = RunnerSnapshotManager().create("key", [act_run], "/repo")
+
+    # Only the containers labeled with the id of the run are snapshotted
+    client.containers.list.assert_called_once_with(
+        all=True, filters={"label": "gitbugactions.run=run"}
+    )
+    assert extract_diff.call_args[0][0] == "container"
+    assert image == create_diff_image.call_args[0][1]
@@ -0,0 +1,65 @@
+from unittest.mock import Mock
+
+from gitbugactions.docker.stats import ContainerStatsSampler, ImagePullTimer
+
+
+def create_stats(memory: int, cpu: int, block_io: int, network: int):
+    return {
+        "memory_stats": {"usage": memory + 100, "stats": {"inactive_file": 100}},
+        "cpu_stats": {"cpu_usage": {"total_usage": cpu}},
+        "blkio_stats": {
+            "io_service_bytes_recursive": [
+                {"major": 8, "minor": 0, "op": "read", "value": block_io},
+                {"major": 8, "minor": 0, "op": "write", "value": 0},
+            ]
+        },
+        "networks": {"eth0": {"rx_bytes": network, "tx_bytes": 0}},
+    }
+
+
+def test_parse_stats():
+    assert ContainerStatsSampler.parse_stats(create_stats(1, 2, 3, 4)) == (1, 2, 3, 4)
+    # Stats of stopped containers have no values
+    assert ContainerStatsSampler.parse_stats({"memory_stats": {}}) == (0, 0, 0, 0)
+
+
+def test_sampler(mocker):
+    client = Mock()
+    mocker.patch(
+        "gitbugactions.docker.client.DockerClient.getInstance", return_value=client
+    )
+    warm, new = Mock(id="warm"), Mock(id="new")
+    samples = {
+        "warm": [create_stats(10, 1e9, 10, 10), create_stats(30, 3e9, 20, 30)],
+        "new": [create_stats(50, 2e9, 5, 5)],
+    }
+    client.api.stats.side_effect = lambda id, **kwargs: samples[id].pop(0)
+
+    sampler = ContainerStatsSampler({"label": "gitbugactions.run=run"})
+    # The warm container existed before the run
+    client.containers.list.return_value = [warm]
+    sampler.sample(baseline=True)
+    client.containers.list.return_value = [warm, new]
+    sampler.sample()
+
+    client.containers.list.assert_called_with(
+        filters={"label": "gitbugactions.run=run"}
+    )
+    assert sampler.peak_memory == 80
+    assert sampler.cpu_seconds == 4
+    assert sampler.block_io_bytes == 15
+    assert sampler.network_bytes == 25
+
+
+def test_image_pull_timer(mocker):
+    time = mocker.patch("gitbugactions.docker.stats.time.time")
+    timer = ImagePullTimer()
+    for now, line in [
+        (0, "[Tests/build] 🚀  Start image=gitbugactions:latest\n"),
+        (1, "[Tests/build] 🐳  docker pull image=node:16 platform= forcePull=false\n"),
+        (2, "[Tests/lint] ⭐ Run Main npm run lint\n"),
+        (4, "[Tests/build] 🐳  docker create image=node:16\n"),
+    ]:
+        time.return_value = now
+        timer.hook("stdout", line)
+    assert timer.pull_time == 3
@@ -0,0 +1,66 @@
+import os
+import subprocess
+
+import pygit2
+
+from gitbugactions.docker.volumes import DependencyVolumeManager
+
+
+def create_repo(path: str, origin: str) -> pygit2.Repository:
+    os.makedirs(path)
+    subprocess.run(["git", "init", "-q"], cwd=path, check=True)
+    subprocess.run(["git", "remote", "add", "origin", origin], cwd=path, check=True)
+    return pygit2.Repository(path)
+
+
+def write(repo: pygit2.Repository, file: str, content: str):
+    with open(os.path.join(repo.workdir, file), "w") as f:
+        f.write(content)
+
+
+def test_get_volumes(tmp_path):
+    repo = create_repo(
+        os.path.join(tmp_path, "repo"), "https://github.com/owner/repo.git"
+    )
+    assert DependencyVolumeManager.get_volumes(repo) == ({}, {})
+
+    write(repo, "requirements.txt", "pytest==8.0.0\n")
+    volumes, env = DependencyVolumeManager.get_volumes(repo)
+    assert len(volumes) == 1
+    assert list(volumes.values()) == [env["PIP_CACHE_DIR"]]
+
+    # Clones of the same repository with the same lockfiles share the volumes
+    clone = create_repo(
+        os.path.join(tmp_path, "clone"), "https://github.com/owner/repo"
+    )
+    write(clone, "requirements.txt", "pytest==8.0.0\n")
+    assert DependencyVolumeManager.get_volumes(clone) == (volumes, env)
+
+    # Other lockfiles or repositories use other volumes
+    write(clone, "requirements.txt", "pytest==8.1.0\n")
+    assert DependencyVolumeManager.get_volumes(clone)[0].keys() != volumes.keys()
+    fork = create_repo(os.path.join(tmp_path, "fork"), "https://github.com/fork/repo")
+    write(fork, "requirements.txt", "pytest==8.0.0\n")
+    assert DependencyVolumeManager.get_volumes(fork)[0].keys() != volumes.keys()
+
+
+def test_get_build_cache_volume(tmp_path):
+    repo = create_repo(
+        os.path.join(tmp_path, "repo"), "https://github.com/owner/repo.git"
+    )
+    volumes, env = DependencyVolumeManager.get_volumes(
+        repo, dependencies=False, build_cache=True
+    )
+    assert list(volumes.values()) == [DependencyVolumeManager.BUILD_CACHE_PATH]
+    assert env == {}
+
+    # Every state of the repository shares the build cache
+    write(repo, "requirements.txt", "pytest==8.0.0\n")
+    all_volumes, _ = DependencyVolumeManager.get_volumes(repo, build_cache=True)
+    assert len(all_volumes) == 2
+    assert volumes.items() <= all_volumes.items()
+    write(repo, "requirements.txt", "pytest==8.1.0\n")
+    assert (
+        volumes.items()
+        <= DependencyVolumeManager.get_volumes(repo, build_cache=True)[0].items()
+    )
@@ -0,0 +1,33 @@
+from unittest.mock import Mock
+
+from junitparser import TestCase
+
+from filter_bugs import filter_bug
+
+
+def create_run(*names: str):
+    return [Mock(tests=[TestCase(name, classname="test") for name in names])]
+
+
+def test_filter_bug_skipped_phases(mocker):
+    for name in ("Act", "create_diff_image", "get_diff_path", "DockerClient"):
+        mocker.patch(f"filter_bugs.{name}")
+    bug_patch = Mock(commit="a1b2", test_patch=[Mock()])
+    mocker.patch("filter_bugs.BugPatch.from_dict", return_value=bug_patch)
+    run_commit = mocker.patch("filter_bugs.run_commit", return_value=create_run("a"))
+    tests = [{"classname": "test", "name": "a", "results": [{"result": "Passed"}]}]
+    # The previous commit was skipped by the phase planner (e.g. FAIL_FAIL)
+    bug = {
+        "repository": "owner/repo",
+        "actions_runs": [None, [{"tests": tests}], [{"tests": tests}]],
+    }
+
+    assert filter_bug(bug, Mock(), "export", False, 2) == "NON-FLAKY"
+    assert [call.args[4] for call in run_commit.call_args_list] == [
+        bug_patch.test_previous_commit_with_diff,
+        bug_patch.test_current_commit,
+    ] * 2
+
+    # The runs of the phases that were run are still compared
+    run_commit.return_value = create_run("b")
+    assert filter_bug(bug, Mock(), "export", False, 1) == "FLAKY"
@@ -1,5 +1,7 @@
 import pytest
-from gitbugactions.utils.file_utils import get_file_type, FileType
+from unidiff import PatchSet
+
+from gitbugactions.utils.file_utils import FileClassifier, FileType, get_file_type
 
 
 @pytest.mark.parametrize(
@@ -31,3 +33,56 @@ from gitbugactions.utils.file_utils import get_file_type, FileType
 )
 def test_get_file_type(language, file_path, expected):
     assert get_file_type(language, file_path) == expected
+
+
+@pytest.mark.parametrize(
+    "build_file, file_path, expected",
+    [
+        ("pom.xml", "a/src/test/kotlin/MainTest.kt", FileType.TESTS),
+        ("pom.xml", "a/src/main/java/Main.java", FileType.SOURCE),
+        ("build.gradle", "a/src/test/resources/input.json", FileType.TESTS),
+        ("pyproject.toml", "a/src/pkg/test_main.py", FileType.TESTS),
+        ("pyproject.toml", "a/src/pkg/main.py", FileType.SOURCE),
+        ("Cargo.toml", "a/benches/bench.rs", FileType.TESTS),
+    ],
+)
+def test_file_classifier_repo_rules(tmp_path, build_file, file_path, expected):
+    (tmp_path / build_file).write_text("")
+    language = {
+        "pom.xml": "java",
+        "build.gradle": "java",
+        "pyproject.toml": "python",
+        "Cargo.toml": "rust",
+    }[build_file]
+    classifier = FileClassifier.for_repo(language, str(tmp_path))
+    assert classifier.classify(file_path) == expected
+
+
+def test_file_classifier_classify_patch():
+    patch = PatchSet(
+        """diff --git a/src/main.py b/src/main.py
+--- a/src/main.py
++++ b/src/main.py
+@@ -1 +1 @@
+-a = 1
++a = 2
+diff --git a/tests/test_main.py b/tests/test_main.py
+--- a/tests/test_main.py
++++ b/tests/test_main.py
+@@ -1 +1 @@
+-assert a == 1
++assert a == 2
+diff --git a/README.md b/README.md
+--- a/README.md
++++ b/README.md
+@@ -1 +1 @@
+-Old
++New
+"""
+    )
+    bug_patch, test_patch, non_code_patch = FileClassifier.for_language(
+        "python"
+    ).classify_patch(patch)
+    assert [p.path for p in bug_patch] == ["src/main.py"]
+    assert [p.path for p in test_patch] == ["tests/test_main.py"]
+    assert [p.path for p in non_code_patch] == ["README.md"]